@@ -26,7 +26,8 @@ RUN pip install --no-cache-dir \
     matplotlib \
     seaborn \
     statsmodels \
-    tabulate
+    tabulate \
+    pyarrow
 
 # Create a non-root user for security
 RUN useradd -m sandbox
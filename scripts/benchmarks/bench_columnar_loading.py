@@ -0,0 +1,92 @@
+"""
+Compares loading each CSV in `datasets/` with `pd.read_csv` against loading its memory-mapped
+Arrow IPC copy (what the sandbox's patched `pd.read_csv` does when columnar staging is enabled).
+
+Each measurement runs in a fresh interpreter so RSS reflects a single load. `--scale` repeats
+each dataset's rows to approximate larger course datasets.
+
+Requires pandas and pyarrow.
+
+    python scripts/benchmarks/bench_columnar_loading.py --scale 1 100
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.utils.resource_staging import DatasetInfo, build_columnar_copy
+
+# Runs in a child interpreter: python -c LOADER <mode> <path> <repeats>
+LOADER = """
+import json, sys, time
+import pandas as pd
+import pyarrow as pa
+
+def rss_kb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * 4
+
+mode, path, repeats = sys.argv[1], sys.argv[2], int(sys.argv[3])
+before = rss_kb()
+timings = []
+frames = []
+for _ in range(repeats):
+    start = time.perf_counter()
+    if mode == "csv":
+        frame = pd.read_csv(path)
+    else:
+        with pa.memory_map(path) as source:
+            frame = pa.ipc.open_file(source).read_all().to_pandas()
+    timings.append(time.perf_counter() - start)
+    frames.append(frame)
+print(json.dumps({"timings": timings, "rss_kb": (rss_kb() - before) / repeats}))
+"""
+
+
+def _measure(mode: str, path: Path, repeats: int) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", LOADER, mode, str(path), str(repeats)],
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--datasets", type=Path, default=ROOT_DIR / "datasets")
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'dataset':<28}{'scale':>6}{'rows':>9}{'format':>8}{'size (KB)':>11}{'load (ms)':>11}{'RSS (KB)':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for csv_path in sorted(args.datasets.glob("*.csv")):
+            for scale in args.scale:
+                frame = pd.concat([pd.read_csv(csv_path)] * scale, ignore_index=True)
+                scaled_csv = Path(tmp) / f"{csv_path.stem}-{scale}.csv"
+                frame.to_csv(scaled_csv, index=False)
+                copy = build_columnar_copy(DatasetInfo(scaled_csv.name, "", scaled_csv.read_bytes()))
+                arrow_path = Path(tmp) / copy.filename
+                arrow_path.write_bytes(copy.data)
+
+                for mode, path in [("csv", scaled_csv), ("arrow", arrow_path)]:
+                    measured = _measure(mode, path, args.repeats)
+                    print(
+                        f"{csv_path.name:<28}{scale:>6}{len(frame):>9}{mode:>8}"
+                        f"{path.stat().st_size / 1024:>11.1f}"
+                        f"{statistics.median(measured['timings']) * 1000:>11.2f}"
+                        f"{measured['rss_kb']:>10.0f}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
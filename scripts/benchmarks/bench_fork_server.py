@@ -0,0 +1,68 @@
+"""
+Compares cold `python3 -c` execution latency against fork-server execution latency.
+
+Requires a running Docker daemon and the sandbox image.
+
+    python scripts/benchmarks/bench_fork_server.py --runs 20
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.utils.python_exec_container import PythonExecContainer
+
+SNIPPETS = {
+    "print": "print(1 + 1)",
+    "pandas": "df = pd.DataFrame({'x': range(100)})\nprint(df['x'].mean())",
+    "plot": "fig, ax = plt.subplots()\nax.plot([1, 2, 3])\nax.set_title('t')\nfig.savefig('plot.png')",
+}
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def _measure(container: PythonExecContainer, code: str, runs: int) -> list[float]:
+    # one warm-up run so the fork server is listening and the image layers are hot
+    await container.run_code(code)
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = await container.run_code(code)
+        latencies.append(time.perf_counter() - start)
+        if result["exit_code"] != 0:
+            raise RuntimeError(f"Benchmark snippet failed: {result['stderr']}")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image", default="byucscourseops/python-tools-sandbox:latest")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'mode':<12}{'snippet':<10}{'p50 (ms)':>10}{'p95 (ms)':>10}{'mean (ms)':>11}")
+    for mode in ["cold", "fork_server"]:
+        settings = {"working_dir": "/home/sandbox/out", "execution_mode": mode}
+        with PythonExecContainer(args.image, f"bench-fork-{mode}", [], settings) as container:
+            for name, code in SNIPPETS.items():
+                latencies = asyncio.run(_measure(container, code, args.runs))
+                print(
+                    f"{mode:<12}{name:<10}"
+                    f"{_percentile(latencies, 50) * 1000:>10.1f}"
+                    f"{_percentile(latencies, 95) * 1000:>10.1f}"
+                    f"{statistics.mean(latencies) * 1000:>11.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Measures Docker API round trips and latency for retrieving a run's output directory
+as the number of output files grows.
+
+Compares the previous per-file retrieval (`ls` + one `get_archive` per output and per
+plot JSON sidecar) with the single-archive retrieval used by `PythonExecContainer`
+(`_fetch_archive`), over each `DockerTransport`: `threaded` (docker-py in the default
+executor) and `async` (`AsyncDockerTransport` on the Docker Unix socket).
+
+Requires a running Docker daemon on a Unix socket and the sandbox image.
+
+    python scripts/benchmarks/bench_output_retrieval.py --files 1 4 16 64
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import tarfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.utils.docker_transport import AsyncDockerTransport, DockerTransport, ThreadedDockerTransport, docker_socket_path
+from src.utils.python_exec_container import PythonExecContainer
+
+
+class _CountingTransport:
+    """Wraps a `DockerTransport` and counts the API calls made through it."""
+
+    def __init__(self, transport: DockerTransport):
+        self._transport = transport
+        self.round_trips = 0
+
+    async def exec(self, cmd: list[str], workdir: str | None = None, detach: bool = False) -> tuple[int, bytes, bytes]:
+        self.round_trips += 1
+        return await self._transport.exec(cmd, workdir=workdir, detach=detach)
+
+    async def get_archive(self, path: str) -> bytes:
+        self.round_trips += 1
+        return await self._transport.get_archive(path)
+
+    async def put_archive(self, path: str, data: bytes):
+        self.round_trips += 1
+        await self._transport.put_archive(path, data)
+
+
+async def _per_file_read(transport: DockerTransport, path: str) -> dict[str, bytes]:
+    async def read_file(file_path: str) -> bytes:
+        data = await transport.get_archive(file_path)
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as tar:
+            for member in tar.getmembers():
+                if file := tar.extractfile(member):
+                    return file.read()
+        return b""
+
+    _, listing, _ = await transport.exec(["ls", "-1", path])
+    filenames = listing.decode().splitlines()
+    json_files = {name for name in filenames if name.endswith(".json")}
+    out = {}
+    for filename in filenames:
+        if filename.endswith(".json"):
+            continue
+        out[filename] = await read_file(os.path.join(path, filename))
+        base = filename.rsplit(".", 1)[0]
+        for json_name in json_files:
+            if json_name.startswith(base + "_ax") or json_name == base + ".json":
+                await read_file(os.path.join(path, json_name))
+    return out
+
+
+async def _single_archive_read(sandbox: PythonExecContainer, transport: DockerTransport, path: str):
+    original = sandbox._transport
+    sandbox._transport = transport
+    try:
+        return sandbox._describe_files(await sandbox._fetch_archive(path))
+    finally:
+        sandbox._transport = original
+
+
+async def _write_outputs(transport: DockerTransport, path: str, count: int):
+    # each "figure" is a PNG with a JSON sidecar, like the savefig patch produces
+    code = (
+        "import json\n"
+        f"for i in range({count}):\n"
+        "    open(f'plot_{i}.png', 'wb').write(b'0' * 20000)\n"
+        "    json.dump({'title': str(i)}, open(f'plot_{i}.json', 'w'))\n"
+    )
+    await transport.exec(["mkdir", "-p", path])
+    await transport.exec(["python3", "-c", code], workdir=path)
+
+
+def _build_transport(sandbox: PythonExecContainer, name: str) -> DockerTransport:
+    if name == "threaded":
+        return ThreadedDockerTransport(sandbox._container)
+    socket_path = docker_socket_path()
+    if socket_path is None:
+        raise SystemExit("The async transport needs DOCKER_HOST to be a Unix socket")
+    return AsyncDockerTransport(sandbox._container.id, socket_path)
+
+
+async def _measure(sandbox: PythonExecContainer, transports: list[str], counts: list[int], repeats: int):
+    print(f"{'transport':>10}{'files':>6}{'strategy':>16}{'round trips':>13}{'median (ms)':>13}")
+    for count in counts:
+        path = f"/tmp/out/bench-{count}"
+        await _write_outputs(sandbox._transport, path, count)
+
+        for name in transports:
+            transport = _build_transport(sandbox, name)
+            for strategy in ["per-file", "single-archive"]:
+                await _time_strategy(sandbox, transport, name, strategy, path, count, repeats)
+
+
+async def _time_strategy(
+        sandbox: PythonExecContainer,
+        transport: DockerTransport,
+        name: str,
+        strategy: str,
+        path: str,
+        count: int,
+        repeats: int
+):
+    timings = []
+    trips = 0
+    for _ in range(repeats):
+        counting = _CountingTransport(transport)
+        start = time.perf_counter()
+        if strategy == "per-file":
+            await _per_file_read(counting, path)
+        else:
+            await _single_archive_read(sandbox, counting, path)
+        timings.append(time.perf_counter() - start)
+        trips = counting.round_trips
+    print(f"{name:>10}{count:>6}{strategy:>16}{trips:>13}{statistics.median(timings) * 1000:>13.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--image", default="byucscourseops/python-tools-sandbox:latest")
+    parser.add_argument("--files", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--transports", nargs="+", choices=["threaded", "async"], default=["threaded", "async"])
+    args = parser.parse_args()
+
+    with PythonExecContainer(args.image, "bench-output-retrieval", [], {"working_dir": "/tmp/out"}) as sandbox:
+        asyncio.run(_measure(sandbox, args.transports, args.files, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
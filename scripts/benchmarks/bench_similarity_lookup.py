@@ -0,0 +1,82 @@
+"""
+Measures `SimilarityIndex` insert throughput, lookup latency, and matrix memory as the number
+of indexed tool requests grows.
+
+Entries are synthetic (intent, code) pairs built from combinations of statistics, columns,
+datasets, and phrasings, so most queries have near neighbours as real traffic does.
+Runs fully offline; requires numpy.
+
+    python scripts/benchmarks/bench_similarity_lookup.py --sizes 1000 10000 100000
+"""
+import argparse
+import itertools
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.armory.similarity_index import SimilarityIndex, DEFAULT_DIMENSIONS
+
+OPERATIONS = ["mean", "median", "std", "min", "max", "count", "sum", "var", "skew", "nunique"]
+PHRASINGS = [
+    "What is the {op} of {col} in {ds}?",
+    "compute {op} {col} for the {ds} data",
+    "Can you show me the {op} of {col}",
+    "{op} of {col} grouped by {group} in {ds}",
+]
+
+
+def _request(rng: random.Random, i: int) -> tuple[str, str]:
+    op = rng.choice(OPERATIONS)
+    col = f"column_{rng.randrange(200)}"
+    group = f"group_{rng.randrange(20)}"
+    ds = f"dataset_{i % 500}"
+    intent = rng.choice(PHRASINGS).format(op=op, col=col, group=group, ds=ds)
+    code = (
+        "import pandas as pd\n"
+        f"df = pd.read_csv('/home/sandbox/datasets/{ds}.csv')\n"
+        f"print(df.groupby('{group}')['{col}'].{op}())\n"
+    )
+    return intent, code
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dimensions", type=int, default=DEFAULT_DIMENSIONS)
+    args = parser.parse_args()
+
+    print(f"{'entries':>9}{'insert/s':>11}{'p50 (ms)':>10}{'p95 (ms)':>10}{'matrix (MB)':>13}")
+    for size in args.sizes:
+        rng = random.Random(size)
+        index = SimilarityIndex(dimensions=args.dimensions)
+        start = time.perf_counter()
+        for i in range(size):
+            intent, code = _request(rng, i)
+            index.add(intent, code, f"key-{i}")
+        insert_rate = size / (time.perf_counter() - start)
+
+        timings = []
+        for i in itertools.islice(itertools.count(), args.queries):
+            intent, code = _request(rng, rng.randrange(size))
+            start = time.perf_counter()
+            index.search(intent, code)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+
+        print(
+            f"{size:>9}{insert_rate:>11.0f}"
+            f"{statistics.median(timings) * 1000:>10.2f}"
+            f"{timings[int(len(timings) * 0.95)] * 1000:>10.2f}"
+            f"{index._matrix.nbytes / 1_000_000:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
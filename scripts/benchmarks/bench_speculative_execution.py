@@ -0,0 +1,120 @@
+"""
+Compares `PythonTools.run_code` latency with and without speculative execution.
+
+Serial: the semantic key is built, looked up, and only a miss starts the container run.
+Speculative: the run starts alongside key building and is cancelled if the key is a hit.
+
+The key model and the sandbox are simulated with log-normal delays around `--key-ms` and
+`--run-ms`; a `--hit-rate` share of requests resolve to keys already in the cache. Every request
+has distinct code, so the exact tier never short-circuits. `--scale` shrinks all delays to keep
+runs short; reported latencies are scaled back up. Runs fully offline.
+
+    python scripts/benchmarks/bench_speculative_execution.py --requests 200 --hit-rate 0.3
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import types
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.armory.python_tools import PythonTools
+from src.armory.tool_cache import CacheEntryBuilder, CacheKey, InMemoryToolCache
+
+
+class _SimulatedKeyBuilder:
+    def __init__(self, delays: dict[str, float]):
+        self._delays = delays
+
+    async def build_cache_key(self, user_intent: str, code: str) -> CacheKey:
+        await asyncio.sleep(self._delays[user_intent])
+        return CacheKey(dataset=["grades.csv"], analysis=[user_intent])
+
+
+class _SimulatedPool:
+    name = "sandbox"
+
+    def __init__(self, delays: dict[str, float]):
+        self._delays = delays
+        self.runs = 0
+        self.cancelled = 0
+
+    def get_dataset_versions(self):
+        return {}
+
+    def has_free_slot(self):
+        return True
+
+    async def run_code(self, code, flow=None, on_queued=None):
+        try:
+            await asyncio.sleep(self._delays[code])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        self.runs += 1
+        return {"exit_code": 0, "stdout": "85.5", "stderr": "", "files": {}}
+
+
+async def _noop_send(channel_id, content=None, file=None):
+    pass
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def _measure(args, speculative: bool) -> tuple[list[float], _SimulatedPool]:
+    rng = random.Random(args.seed)
+    key_delays, run_delays = {}, {}
+    cache = InMemoryToolCache()
+    requests = []
+    for i in range(args.requests):
+        intent, code = f"request {i}", f"print({i})"
+        key_delays[intent] = rng.lognormvariate(0, args.sigma) * args.key_ms / 1000 * args.scale
+        run_delays[code] = rng.lognormvariate(0, args.sigma) * args.run_ms / 1000 * args.scale
+        if rng.random() < args.hit_rate:
+            cached = CacheEntryBuilder()
+            cached.set_stdout("85.5")
+            cache.write_entry(cache.get_key(CacheKey(dataset=["grades.csv"], analysis=[intent])), cached)
+        requests.append((intent, code))
+
+    pool = _SimulatedPool(run_delays)
+    tools = PythonTools(pool, _noop_send, cache, _SimulatedKeyBuilder(key_delays), speculative=speculative)
+    ctx = types.SimpleNamespace(thread_id=1, author_id=1, guild_id=0, parent_channel_id=0)
+    latencies = []
+    for intent, code in requests:
+        start = time.perf_counter()
+        await tools.run_code(ctx, code, intent)
+        latencies.append((time.perf_counter() - start) / args.scale * 1000)
+    return latencies, pool
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--hit-rate", type=float, default=0.3)
+    parser.add_argument("--key-ms", type=float, default=800, help="median key-building latency")
+    parser.add_argument("--run-ms", type=float, default=1500, help="median container run latency")
+    parser.add_argument("--sigma", type=float, default=0.4, help="log-normal spread of both latencies")
+    parser.add_argument("--scale", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, {args.hit_rate:.0%} semantic hits, key ~{args.key_ms:g} ms, run ~{args.run_ms:g} ms")
+    print(f"{'mode':<13}{'p50 (ms)':>10}{'p95 (ms)':>10}{'runs':>7}{'cancelled':>11}")
+    for mode, speculative in [("serial", False), ("speculative", True)]:
+        latencies, pool = asyncio.run(_measure(args, speculative))
+        print(
+            f"{mode:<13}{_percentile(latencies, 0.5):>10.0f}{_percentile(latencies, 0.95):>10.0f}"
+            f"{pool.runs:>7}{pool.cancelled:>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
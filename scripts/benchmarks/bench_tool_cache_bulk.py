@@ -0,0 +1,125 @@
+"""
+Measures `SqlToolCache` listing, cleanup, and clear at a realistic table size, next to the
+row-by-row ORM approach they replaced (load every matching record, delete each one).
+
+Rows are bulk-inserted into a temporary SQLite file: short stdout, one small table, and one file
+referencing a shared blob, as real entries do. Half of the rows are expired before cleanup.
+
+    python scripts/benchmarks/bench_tool_cache_bulk.py --entries 50000
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from src.armory.tool_cache import SqlToolCache, ToolCacheBlob, ToolCacheRecord, _format_cache_report
+
+BLOBS = 200
+
+
+def _populate(engine, entries: int):
+    rng = random.Random(entries)
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        session.execute(insert(ToolCacheBlob), [
+            {"sha256": f"{i:064x}", "data": b"\x89PNG" + bytes(20_000), "size": 20_004, "ref_count": 0}
+            for i in range(BLOBS)
+        ])
+        rows = []
+        ref_counts = [0] * BLOBS
+        for i in range(entries):
+            blob = rng.randrange(BLOBS)
+            ref_counts[blob] += 1
+            rows.append({
+                "key": f"key-{i}",
+                "stdout": f"mean: {rng.random():.4f}\n" * 5,
+                "tables": [{"filename": "summary.csv", "description": "", "chunks": ["| a | b |\n|---|---|\n| 1 | 2 |"]}],
+                "files": {"plot.png": {"blob": f"{blob:064x}", "size": 20_004, "description": "plot"}},
+                "created_at": now,
+                "last_access": now,
+                "hit_count": rng.randrange(50),
+                # even rows are expired
+                "expires_at": now + timedelta(days=-1 if i % 2 == 0 else 1),
+                "size_bytes": 20_100,
+                "cost_seconds": rng.random() * 5,
+                "priority": rng.random(),
+            })
+        session.execute(insert(ToolCacheRecord), rows)
+        for i, count in enumerate(ref_counts):
+            session.query(ToolCacheBlob).filter(ToolCacheBlob.sha256 == f"{i:064x}").update({"ref_count": count})
+        session.commit()
+
+
+def _row_by_row_delete(engine, *criteria):
+    with Session(engine) as session:
+        records = session.query(ToolCacheRecord).filter(*criteria).all()
+        SqlToolCache._release_blobs(session, SqlToolCache._all_files(records))
+        for record in records:
+            session.delete(record)
+        session.commit()
+
+
+def _row_by_row_list(engine, offset: int = 0, limit: int | None = None):
+    """Every listing loaded and formatted all rows, then the caller sliced out what it showed"""
+    with Session(engine) as session:
+        records = session.query(ToolCacheRecord).all()
+    rows = _format_cache_report([(record.key, record) for record in records])
+    return rows[offset:None if limit is None else offset + limit]
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=50_000)
+    parser.add_argument("--page-size", type=int, default=500)
+    args = parser.parse_args()
+
+    results = []
+    for approach in ["row-by-row", "bulk"]:
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_engine(f"sqlite:///{tmp}/cache.db")
+            cache = SqlToolCache(Session(engine))
+            _populate(engine, args.entries)
+
+            if approach == "bulk":
+                timings = {
+                    "list (all)": _timed(cache.list_entries),
+                    "list (page)": _timed(lambda: cache.list_entries(args.entries // 2, args.page_size)),
+                    "cleanup": _timed(cache.cleanup),
+                    "clear": _timed(cache.clear_entries),
+                }
+            else:
+                timings = {
+                    "list (all)": _timed(lambda: _row_by_row_list(engine)),
+                    "list (page)": _timed(lambda: _row_by_row_list(engine, args.entries // 2, args.page_size)),
+                    "cleanup": _timed(lambda: _row_by_row_delete(
+                        engine, ToolCacheRecord.expires_at < datetime.now(timezone.utc)
+                    )),
+                    "clear": _timed(lambda: _row_by_row_delete(engine)),
+                }
+            results.append((approach, timings))
+            engine.dispose()
+
+    print(f"{args.entries} entries, half expired")
+    print(f"{'approach':<12}" + "".join(f"{name + ' (ms)':>18}" for name in results[0][1]))
+    for approach, timings in results:
+        print(f"{approach:<12}" + "".join(f"{value:>18.1f}" for value in timings.values()))
+
+
+if __name__ == "__main__":
+    main()
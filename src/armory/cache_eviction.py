@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Protocol
+
+# keeps zero-cost or empty entries comparable instead of dividing by zero
+MIN_COST_SECONDS = 0.01
+
+
+class EvictionPolicy(Protocol):
+    """
+    Orders cache entries for eviction. Backends store each entry's priority, recompute it on
+    insert and on every hit, and evict the lowest priorities first when over budget.
+    """
+
+    def priority(self, hit_count: int, size_bytes: int, cost_seconds: float, now: datetime) -> float:
+        ...
+
+    def evicted(self, priority: float):
+        ...
+
+
+class LruPolicy:
+    """Least recently used first"""
+
+    def priority(self, hit_count: int, size_bytes: int, cost_seconds: float, now: datetime) -> float:
+        return now.timestamp()
+
+    def evicted(self, priority: float):
+        pass
+
+
+class GreedyDualSizePolicy:
+    """
+    GreedyDual-Size-Frequency: H = L + requests * cost / size, where cost is the execution time
+    a hit saves. Cheap, large, rarely requested entries go first. L rises to the priority of each
+    evicted entry, so entries that have not been touched in a while age out even if they were
+    once valuable.
+    """
+
+    def __init__(self, clock: float = 0.0):
+        self._clock = clock
+
+    @property
+    def clock(self) -> float:
+        return self._clock
+
+    def priority(self, hit_count: int, size_bytes: int, cost_seconds: float, now: datetime) -> float:
+        # the original request counts as one
+        return self._clock + (hit_count + 1) * max(cost_seconds, MIN_COST_SECONDS) / max(size_bytes, 1)
+
+    def evicted(self, priority: float):
+        self._clock = max(self._clock, priority)
+
+
+def build_eviction_policy(name: str) -> EvictionPolicy:
+    if name == "lru":
+        return LruPolicy()
+    if name == "gds":
+        return GreedyDualSizePolicy()
+    raise NotImplementedError(f"Unsupported cache eviction policy: {name}")
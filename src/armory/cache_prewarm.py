@@ -0,0 +1,204 @@
+import asyncio
+import hashlib
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Any, Iterable, Literal, TypedDict
+
+from .python_tools import PythonTools
+from .similarity_index import SimilarityIndex
+from .tool_cache import CacheEntry, CacheEntryBuilder, CacheLookupStats, canonical_code
+from ..utils.config_types import DuckContext
+from ..utils.logger import duck_logger
+from ..utils.protocols import CacheKeyBuilder, ConcludesResponse, ToolCache
+from ..utils.python_exec_container import ContainerPool
+
+
+class PrewarmItem(TypedDict):
+    user_intent: str
+    code: str
+
+
+class PrewarmReport(TypedDict):
+    items: int
+    # finished by an earlier, interrupted run
+    resumed: int
+    created: int
+    already_cached: int
+    failed: int
+    errors: int
+    entries_created: int
+    bytes_stored: int
+
+
+PrewarmStatus = Literal["created", "cached", "failed"]
+
+
+def prewarm_item_id(item: PrewarmItem) -> str:
+    code = canonical_code(item["code"]) or item["code"]
+    return hashlib.sha256(json.dumps([item["user_intent"].strip().lower(), code]).encode()).hexdigest()
+
+
+def _progress_id(item_id: str, dataset_versions: dict[str, str]) -> str:
+    """Progress is per dataset version: once data is restaged, every item is warmed again"""
+    return hashlib.sha256(json.dumps([item_id, sorted(dataset_versions.items())]).encode()).hexdigest()
+
+
+def load_prewarm_items(path: Path) -> list[PrewarmItem]:
+    """A curated list: one JSON object per line with `user_intent` and `code`"""
+    items = []
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                record = json.loads(line)
+                items.append({"user_intent": record["user_intent"], "code": record["code"]})
+    return items
+
+
+def mine_prewarm_items(tool_calls: Iterable[dict[str, Any]], tool_name: str, min_count: int = 2) -> list[PrewarmItem]:
+    """Recorded calls of `tool_name` asked at least `min_count` times, most frequent first"""
+    counts: Counter[str] = Counter()
+    items: dict[str, PrewarmItem] = {}
+    # a resumed conversation can record a call again; its call id identifies the repeat
+    seen_calls: set[str] = set()
+    for call in tool_calls:
+        arguments = call.get("arguments") or {}
+        if call.get("name") != tool_name or "code" not in arguments or "user_intent" not in arguments:
+            continue
+        if (call_id := call.get("call_id")) is not None:
+            if call_id in seen_calls:
+                continue
+            seen_calls.add(call_id)
+        item: PrewarmItem = {"user_intent": arguments["user_intent"], "code": arguments["code"]}
+        item_id = prewarm_item_id(item)
+        counts[item_id] += 1
+        items.setdefault(item_id, item)
+    return [items[item_id] for item_id, count in counts.most_common() if count >= min_count]
+
+
+class _RecordingCache:
+    """
+    Passes writes through to the cache and tallies the entries written. Lookups are peeks counted
+    in the prewarmer's own stats, so prewarming neither shows in `!cache` hit rates nor counts as an
+    access that would favour prewarmed entries under eviction.
+    """
+
+    def __init__(self, cache: ToolCache):
+        self._cache = cache
+        self.written: dict[str, int] = {}
+        self.lookup_stats = CacheLookupStats()
+
+    def __getattr__(self, name: str):
+        return getattr(self._cache, name)
+
+    def get_or_none(self, key: str) -> CacheEntry | None:
+        return self._cache.load_entry(key)
+
+    def write_entry(self, key: str, builder: CacheEntryBuilder) -> list[str]:
+        evicted = self._cache.write_entry(key, builder)
+        self.written[key] = builder.size_bytes()
+        return evicted
+
+
+async def _discard(channel_id: int, content: str | None = None, file=None):
+    pass
+
+
+class CachePrewarmer:
+    """
+    Replays `(user_intent, code)` pairs through `PythonTools` so their outputs are cached before
+    anyone asks. Nothing is sent to Discord and no executions are recorded. Runs are bounded to
+    `max_concurrency` and share one admission flow, so live requests keep their fair share of the
+    sandbox. Finished items are appended to `progress_path`, and a later run on the same dataset
+    versions skips them.
+    """
+
+    def __init__(
+            self,
+            container: ContainerPool,
+            tool_cache: ToolCache,
+            cache_key_builder: CacheKeyBuilder,
+            progress_path: Path,
+            similarity_index: SimilarityIndex | None = None,
+            max_concurrency: int = 2
+    ):
+        self._container = container
+        self._tool_cache = tool_cache
+        self._cache_key_builder = cache_key_builder
+        self._progress_path = progress_path
+        self._similarity_index = similarity_index
+        self._max_concurrency = max_concurrency
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def _read_progress(self) -> dict[str, dict[str, Any]]:
+        if not self._progress_path.exists():
+            return {}
+        with open(self._progress_path) as file:
+            return {record["id"]: record for record in map(json.loads, filter(str.strip, file))}
+
+    def _write_progress(self, record: dict[str, Any]):
+        with open(self._progress_path, "a") as file:
+            file.write(json.dumps(record) + "\n")
+
+    async def _prewarm(self, item: PrewarmItem) -> tuple[PrewarmStatus, dict[str, int]]:
+        cache = _RecordingCache(self._tool_cache)
+        tools = PythonTools(self._container, _discard, cache, self._cache_key_builder,
+                            similarity_index=self._similarity_index)
+        ctx = DuckContext(
+            guild_id=0, parent_channel_id=0, author_id=0, author_mention="", content="",
+            message_id=0, thread_id=0, timeout=0
+        )
+        result = await tools.run_code(ctx, item["code"], item["user_intent"])
+        # hits conclude the response too; only a failed run does not, though its output is still cached
+        if not isinstance(result, ConcludesResponse):
+            return "failed", cache.written
+        return ("created" if cache.written else "cached"), cache.written
+
+    async def run(self, items: list[PrewarmItem]) -> PrewarmReport:
+        async with self._lock:
+            return await self._run(items)
+
+    async def _run(self, items: list[PrewarmItem]) -> PrewarmReport:
+        done = self._read_progress()
+        report: PrewarmReport = {
+            "items": len(items), "resumed": 0, "created": 0, "already_cached": 0, "failed": 0, "errors": 0,
+            "entries_created": 0, "bytes_stored": 0,
+        }
+
+        def tally(record: dict[str, Any]):
+            report[{"created": "created", "cached": "already_cached", "failed": "failed"}[record["status"]]] += 1
+            report["entries_created"] += record["entries"]
+            report["bytes_stored"] += record["bytes"]
+
+        versions = self._container.get_dataset_versions()
+        pending = []
+        for item in items:
+            item_id = _progress_id(prewarm_item_id(item), versions)
+            if item_id in done:
+                report["resumed"] += 1
+                tally(done[item_id])
+            else:
+                pending.append((item_id, item))
+
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def prewarm(item_id: str, item: PrewarmItem):
+            async with semaphore:
+                try:
+                    status, written = await self._prewarm(item)
+                except Exception:
+                    # not recorded as done, so a later run retries it
+                    duck_logger.exception(f"Prewarming failed for: {item['user_intent']}")
+                    report["errors"] += 1
+                    return
+            record = {"id": item_id, "status": status, "entries": len(written), "bytes": sum(written.values())}
+            self._write_progress(record)
+            tally(record)
+
+        await asyncio.gather(*(prewarm(item_id, item) for item_id, item in pending))
+        duck_logger.info(f"Cache prewarm finished: {report}")
+        return report
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from typing import TypedDict
+
+from ..utils.config_types import FileData
+from ..utils.logger import duck_logger
+from ..utils.protocols import SendMessage
+
+# Discord accepts up to 10 attachments per message
+MAX_ATTACHMENTS = 10
+# text up to this length is sent as one message (`discord_bot._parse_blocks` splits longer text)
+MAX_MESSAGE_CHARS = 1990
+
+
+class SendStats(TypedDict):
+    # what sending every output on its own would have cost
+    outputs: int
+    messages: int
+
+
+class OutputBundler:
+    """
+    Collects a run's images and text (table chunks, stdout) and sends them in as few messages as
+    possible: text pieces are merged up to `MAX_MESSAGE_CHARS`, and attachments ride along in
+    groups of `MAX_ATTACHMENTS`. Text keeps its order; a piece longer than the limit goes alone.
+    """
+
+    def __init__(self):
+        self._files: list[FileData] = []
+        self._texts: list[str] = []
+
+    @property
+    def outputs(self) -> int:
+        return len(self._files) + len(self._texts)
+
+    def add_file(self, filename: str, data: bytes):
+        self._files.append({"filename": filename, "bytes": data})
+
+    def add_text(self, text: str):
+        if text:
+            self._texts.append(text)
+
+    def _merged_texts(self) -> list[str]:
+        merged: list[str] = []
+        for text in self._texts:
+            if merged and len(merged[-1]) + 1 + len(text) <= MAX_MESSAGE_CHARS:
+                merged[-1] += "\n" + text
+            else:
+                merged.append(text)
+        return merged
+
+    def messages(self) -> list[tuple[str | None, list[FileData]]]:
+        texts = self._merged_texts()
+        groups = [self._files[i:i + MAX_ATTACHMENTS] for i in range(0, len(self._files), MAX_ATTACHMENTS)]
+        return [
+            (texts[i] if i < len(texts) else None, groups[i] if i < len(groups) else [])
+            for i in range(max(len(texts), len(groups)))
+        ]
+
+    async def send(self, send_message: SendMessage, channel_id: int, tally: "SendTally | None" = None) -> SendStats:
+        messages = self.messages()
+        for text, files in messages:
+            if not files:
+                await send_message(channel_id, text)
+            else:
+                await send_message(channel_id, text, file=files[0] if len(files) == 1 else files)
+        stats: SendStats = {"outputs": self.outputs, "messages": len(messages)}
+        if tally is not None:
+            tally.record(channel_id, stats)
+        return stats
+
+
+class SendTally:
+    """Outputs and messages sent per conversation (thread), kept for the most recent conversations"""
+
+    def __init__(self, max_conversations: int = 1024):
+        self._max_conversations = max_conversations
+        self._conversations: OrderedDict[int, SendStats] = OrderedDict()
+
+    def record(self, channel_id: int, stats: SendStats):
+        totals = self._conversations.pop(channel_id, {"outputs": 0, "messages": 0})
+        totals["outputs"] += stats["outputs"]
+        totals["messages"] += stats["messages"]
+        self._conversations[channel_id] = totals
+        while len(self._conversations) > self._max_conversations:
+            self._conversations.popitem(last=False)
+        duck_logger.info(
+            f"Conversation {channel_id}: {totals['outputs']} tool outputs sent in {totals['messages']} messages, "
+            f"{self.saved(channel_id)} Discord calls saved"
+        )
+
+    def get(self, channel_id: int) -> SendStats:
+        return dict(self._conversations.get(channel_id, {"outputs": 0, "messages": 0}))
+
+    def saved(self, channel_id: int) -> int:
+        stats = self.get(channel_id)
+        return stats["outputs"] - stats["messages"]
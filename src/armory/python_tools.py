@@ -1,15 +1,20 @@
+import asyncio
 import io
+import json
 import re
 from pathlib import Path
 from decimal import Decimal, InvalidOperation
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
 
+from .output_bundler import OutputBundler, SendTally
+from .similarity_index import SimilarityIndex
+from .tool_cache import CacheEntry, CacheEntryBuilder, exact_cache_key, send_cache_entry
 from ..utils.protocols import ToolCache, CacheKeyBuilder
 from ..utils.config_types import DuckContext
 from ..utils.logger import duck_logger
-from ..utils.protocols import SendMessage, ConcludesResponse
-from ..utils.python_exec_container import PythonExecContainer, is_image, is_table, FileResult
+from ..utils.protocols import SendMessage, ConcludesResponse, RecordExecution
+from ..utils.python_exec_container import ContainerPool, is_image, is_table, FileResult, ExecutionResult
 
 
 _SCI_NOTATION_PATTERN = re.compile(
@@ -111,37 +116,48 @@ def _clean_stdout(stdout: str, files: dict[str, FileResult]) -> str:
     return _remove_scientific_notation(stdout)
 
 
-async def send_table(
-        send_message: SendMessage,
-        channel_id: int,
-        table: pd.DataFrame,
-        max_rows: int = 100,
-) -> list[str]:
+def format_table(table: pd.DataFrame, max_rows: int = 100) -> list[str]:
+    """Markdown code blocks of at most `max_rows` rows, split by columns to fit a Discord message"""
     table = _format_table_values(table.head(max_rows))
     col_chunk = _determine_col_chunk(table)
     table_chunks = []
 
     for i in range(0, table.shape[1], col_chunk):
         md_table = table.iloc[:, i:i + col_chunk].to_markdown(disable_numparse=True)
-        table_chunk = f"```\n{md_table}\n```"
-        table_chunks.append(table_chunk)
-        await send_message(channel_id, table_chunk)
+        table_chunks.append(f"```\n{md_table}\n```")
 
     return table_chunks
 
 
+def _retrieve_exception(task: asyncio.Task):
+    # a discarded speculative run may fail; that should not be logged as an unretrieved exception
+    if not task.cancelled():
+        task.exception()
+
+
 class PythonTools:
     def __init__(
             self,
-            container: PythonExecContainer,
+            container: ContainerPool,
             send_message: SendMessage,
             tool_cache: ToolCache | None,
-            cache_key_builder: CacheKeyBuilder | None
+            cache_key_builder: CacheKeyBuilder | None,
+            record_execution: RecordExecution | None = None,
+            similarity_index: SimilarityIndex | None = None,
+            speculative: bool = False,
+            send_tally: SendTally | None = None
     ):
         self._container = container
         self._send_message = send_message
         self._tool_cache = tool_cache
         self._cache_key_builder = cache_key_builder
+        self._record_execution = record_execution
+        self._similarity_index = similarity_index
+        self._speculative = speculative
+        # outputs vs messages per conversation; shared between tools so totals cover a whole thread
+        self._send_tally = send_tally if send_tally is not None else SendTally()
+        # cache key -> resolves to the key holding the output once that key's execution finishes
+        self._in_flight: dict[str, asyncio.Future[str | None]] = {}
 
     async def run_code(self, ctx: DuckContext, code: str, user_intent: str) -> dict[str, str | dict[str, str]]:
         """
@@ -158,26 +174,94 @@ class PythonTools:
                 filename: description
             }
         """
-        key = None
-        if self._tool_cache and self._cache_key_builder:
-            cache_key = self._cache_key_builder.build_cache_key(user_intent, code)
+        if not (self._tool_cache and self._cache_key_builder):
+            duck_logger.debug(f" Cache DISABLED ".center(21, '-'))
+            return await self._execute(ctx, code, [])
+
+        # requests that miss on a key this call has claimed wait for its result instead of running again
+        flight = asyncio.get_running_loop().create_future()
+        claimed: list[str] = []
+        speculation: asyncio.Task[ExecutionResult] | None = None
+        try:
+            # outputs of a miss are cached under the key of every tier that missed
+            keys: list[str] = []
+
+            # exact tier: structurally identical code on the same datasets, no model call
+            exact_key = exact_cache_key(code, self._container.get_dataset_versions())
+            if exact_key is not None:
+                if hit := await self._lookup("exact", exact_key, flight, claimed):
+                    return await self._send_cached(ctx, flight, *hit)
+                keys.append(exact_key)
+
+            # similar tier: a near-duplicate request on the same datasets, still no model call
+            if self._similarity_index is not None:
+                scope = self._dataset_scope(code)
+                if hit := await self._find_similar(user_intent, code, scope):
+                    return await self._send_cached(ctx, flight, *hit)
+
+            if self._speculative and self._container.has_free_slot():
+                # run while the key is built; the run is cancelled if the key turns out to be a hit
+                speculation = asyncio.create_task(self._run_container(ctx, code))
+                speculation.add_done_callback(_retrieve_exception)
+
+            cache_key = await self._cache_key_builder.build_cache_key(user_intent, code)
+            # the same analysis on restaged data is a different key
+            cache_key = cache_key.model_copy(update={"dataset_versions": self._dataset_versions(code)})
             key = self._tool_cache.get_key(cache_key)
             duck_logger.debug(f"Cache key: {key}")
-
-            if self._tool_cache.check_if_cached(key):
-                duck_logger.debug(f" Cache HIT ".center(20, '-'))
-                output = await self._tool_cache.send_from_cache(
-                    key,
-                    self._send_message,
-                    ctx.thread_id
-                )
-                return ConcludesResponse(output)
+            if self._similarity_index is not None:
+                self._similarity_index.add(user_intent, code, key, scope)
+            if hit := await self._lookup("semantic", key, flight, claimed):
+                return await self._send_cached(ctx, flight, *hit)
+            keys.append(key)
 
             duck_logger.debug(f" Cache MISS ".center(19, '-'))
-        else:
-            duck_logger.debug(f" Cache DISABLED ".center(21, '-'))
-        results = await self._container.run_code(code)
+            if speculation is not None:
+                # cleared first, so a run that raises is counted as failed rather than cancelled below
+                running, speculation = speculation, None
+                try:
+                    results = await running
+                except Exception:
+                    self._tool_cache.lookup_stats.record_failure("speculative")
+                    raise
+                self._tool_cache.lookup_stats.record("speculative", True)
+                output = await self._deliver(ctx, results, keys, self._indexed_datasets(code))
+            else:
+                output = await self._execute(ctx, code, keys)
+            # waiters read the entry just written, or find none and run the code themselves
+            flight.set_result(keys[0])
+            return output
+        finally:
+            if speculation is not None:
+                # the key was a hit (or building it failed), so the run's output is not needed
+                self._tool_cache.lookup_stats.record("speculative", False)
+                speculation.cancel()
+            for key in claimed:
+                if self._in_flight.get(key) is flight:
+                    del self._in_flight[key]
+            if not flight.done():
+                flight.set_result(None)
+
+    async def _run_container(self, ctx: DuckContext, code: str) -> ExecutionResult:
+        results = await self._container.run_code(
+            code,
+            (ctx.author_id, ctx.thread_id),
+            lambda position: self._send_queue_position(ctx, position)
+        )
+        await self._record_usage(ctx, code, results)
+        return results
+
+    async def _execute(self, ctx: DuckContext, code: str, keys: list[str]) -> dict[str, str | dict[str, str]]:
+        return await self._deliver(ctx, await self._run_container(ctx, code), keys, self._indexed_datasets(code))
 
+    async def _deliver(
+            self,
+            ctx: DuckContext,
+            results: ExecutionResult,
+            keys: list[str],
+            datasets: dict[str, str]
+    ) -> dict[str, str | dict[str, str]]:
+        """Sends a run's outputs and caches them under `keys`, indexed by the `datasets` they read"""
         stdout = results.get('stdout').strip()
         stderr = _remove_scientific_notation(results.get('stderr').strip())
         files = results.get('files', {})
@@ -188,34 +272,36 @@ class PythonTools:
             for filename, file in files.items():
                 duck_logger.debug(f" {filename}: {file['description']}")
 
-        # send files directly
+        # outputs are collected and written under each key in one transaction once sent
+        cached = CacheEntryBuilder()
+        cached.set_datasets(datasets)
+        # and sent in as few messages as possible
+        bundler = OutputBundler()
+
         for filename, file in files.items():
             if is_image(filename):
-                if self._tool_cache and key is not None:
-                    self._tool_cache.cache_file(key, filename, file)
-                await self._send_message(
-                    ctx.thread_id,
-                    file={
-                        "filename": filename,
-                        "bytes": file["bytes"],
-                    }
-                )
+                cached.add_file(filename, file)
+                bundler.add_file(filename, file["bytes"])
             elif is_table(filename):
                 table = pd.read_csv(io.StringIO(file['bytes'].decode()))
-                table_chunks = await send_table(
-                    self._send_message,
-                    ctx.thread_id,
-                    table,
-                )
-                if self._tool_cache and key is not None:
-                    self._tool_cache.cache_table(key, filename, table_chunks, file.get("description", ""))
-
-        # send cleaned stdout directly
+                table_chunks = format_table(table)
+                for table_chunk in table_chunks:
+                    bundler.add_text(table_chunk)
+                cached.add_table(filename, table_chunks, file.get("description", ""))
+
         stdout = _clean_stdout(stdout, files)
         if stdout:
-            if self._tool_cache and key is not None:
-                self._tool_cache.cache_msg(key, stdout)
-            await self._send_message(ctx.thread_id, stdout)
+            cached.set_stdout(stdout)
+            bundler.add_text(stdout)
+        await bundler.send(self._send_message, ctx.thread_id, self._send_tally)
+
+        # the execution time a future hit saves weighs into cost-aware eviction
+        usage = results.get('usage')
+        if usage is not None:
+            cached.set_cost(usage['wall_seconds'])
+        if cached.stdout is not None or cached.files or cached.tables:
+            for key in keys:
+                self._forget_keys(self._tool_cache.write_entry(key, cached))
 
         output = {
             'stdout': stdout,
@@ -229,8 +315,120 @@ class PythonTools:
         return output
 
 
+    async def _lookup(
+            self,
+            tier: str,
+            key: str,
+            flight: asyncio.Future,
+            claimed: list[str]
+    ) -> tuple[str, CacheEntry] | None:
+        """The key holding the entry and the entry, waiting for an in-flight execution of `key` if there is one"""
+        hit = None
+        if (entry := self._tool_cache.get_or_none(key)) is not None:
+            hit = key, entry
+        elif (leader := self._in_flight.get(key)) is not None:
+            hit = await self._join(leader)
+        self._tool_cache.lookup_stats.record(tier, hit is not None)
+        if hit is None and key not in self._in_flight:
+            self._in_flight[key] = flight
+            claimed.append(key)
+        return hit
+
+    async def _join(self, leader: asyncio.Future) -> tuple[str, CacheEntry] | None:
+        duck_logger.debug("Waiting for an identical in-flight execution")
+        # shielded so a cancelled waiter does not cancel the future other waiters share
+        served_key = await asyncio.shield(leader)
+        entry = self._tool_cache.get_or_none(served_key) if served_key is not None else None
+        # a coalesced hit is a duplicate container execution avoided
+        self._tool_cache.lookup_stats.record("coalesced", entry is not None)
+        return (served_key, entry) if entry is not None else None
+
+    def _dataset_versions(self, code: str) -> dict[str, str]:
+        """The staged datasets (and versions) whose filenames the code mentions, or all of them if it names none"""
+        versions = self._container.get_dataset_versions()
+        referenced = {path: version for path, version in versions.items() if Path(path).name in code}
+        return referenced or versions
+
+    def _dataset_scope(self, code: str) -> str:
+        return json.dumps(sorted(self._dataset_versions(code).items()))
+
+    def _qualified(self, versions: dict[str, str]) -> dict[str, str]:
+        # caches can be shared between tools, and staged paths only identify data within a container
+        return {f"{self._container.name}:{path}": version for path, version in versions.items()}
+
+    def _indexed_datasets(self, code: str) -> dict[str, str]:
+        return self._qualified(self._dataset_versions(code))
+
+    def invalidate_stale_entries(self) -> int:
+        """Removes cached outputs computed from earlier versions of the datasets staged now"""
+        if self._tool_cache is None:
+            return 0
+        removed = self._tool_cache.invalidate_datasets(self._qualified(self._container.get_dataset_versions()))
+        self._forget_keys(removed)
+        if removed:
+            duck_logger.info(f"Invalidated {len(removed)} cache entries built from restaged {self._container.name} datasets")
+        return len(removed)
+
+    def _forget_keys(self, keys: list[str]):
+        """Drops keys the cache no longer holds from the similarity index"""
+        if self._similarity_index is not None:
+            for key in keys:
+                self._similarity_index.remove(key)
+
+    async def _find_similar(self, user_intent: str, code: str, scope: str) -> tuple[str, CacheEntry] | None:
+        # searched on the event loop: `add`/`remove` reuse rows in place, so a search in a worker thread
+        # could pair a freed row's score with the key that took it over. One matrix-vector product is cheap.
+        matches = self._similarity_index.search(user_intent, code, scope)
+        for candidate, score in matches:
+            if (entry := self._tool_cache.get_or_none(candidate)) is not None:
+                duck_logger.debug(f"Similar cache key ({score:.2f}): {candidate}")
+                self._similarity_index.touch(candidate)
+                self._tool_cache.lookup_stats.record("similar", True)
+                return candidate, entry
+            # the entry expired or was removed since it was indexed
+            self._similarity_index.remove(candidate)
+        self._tool_cache.lookup_stats.record("similar", False)
+        return None
+
+    async def _send_cached(
+            self,
+            ctx: DuckContext,
+            flight: asyncio.Future,
+            key: str,
+            entry: CacheEntry
+    ) -> ConcludesResponse:
+        duck_logger.debug(f" Cache HIT ".center(20, '-'))
+        flight.set_result(key)
+        output = await send_cache_entry(entry, self._send_message, ctx.thread_id, self._send_tally)
+        return ConcludesResponse(output)
+
+    async def _send_queue_position(self, ctx: DuckContext, position: int):
+        await self._send_message(
+            ctx.thread_id,
+            f"The sandbox is busy, so your code is #{position} in the queue. It will run shortly."
+        )
+
+    async def _record_usage(self, ctx: DuckContext, code: str, results: ExecutionResult):
+        usage = results.get('usage')
+        if self._record_execution is None or usage is None:
+            return
+        await self._record_execution(
+            ctx.guild_id,
+            ctx.parent_channel_id,
+            ctx.thread_id,
+            ctx.author_id,
+            self._container.name,
+            results['exit_code'],
+            usage['wall_seconds'],
+            usage['cpu_seconds'],
+            usage['max_rss_kb'],
+            usage['bytes_written'],
+            code
+        )
+
+
 class DatasetTools:
-    def __init__(self, containers: list[PythonExecContainer], send_message: SendMessage):
+    def __init__(self, containers: list[ContainerPool], send_message: SendMessage):
         self._containers = containers
         self._send_message = send_message
 
@@ -0,0 +1,179 @@
+import ast
+import posixpath
+import re
+import zlib
+from collections import OrderedDict
+from textwrap import dedent
+
+import numpy as np
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_CODE_TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+# calls present in nearly every snippet; they say nothing about the analysis
+_BOILERPLATE_CALLS = frozenset({"read_csv", "print", "show", "tight_layout", "close", "savefig"})
+_STOPWORDS = frozenset(
+    "a an and are as at be by can could for from i in is it me my of on or please s show "
+    "that the this to what which with would you".split()
+)
+
+DEFAULT_DIMENSIONS = 512
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_TOP_K = 5
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def _hash_feature(feature: str, dimensions: int) -> tuple[int, float]:
+    digest = zlib.crc32(feature.encode())
+    # the top bit picks the sign so colliding features tend to cancel rather than add up
+    return digest % dimensions, 1.0 if digest & 0x80000000 else -1.0
+
+
+def _intent_features(user_intent: str) -> list[tuple[str, float]]:
+    words = [word for word in _WORD_PATTERN.findall(user_intent.lower()) if word not in _STOPWORDS]
+    features = [(f"w:{word}", 1.0) for word in words]
+    features += [(f"b:{first} {second}", 1.0) for first, second in zip(words, words[1:])]
+    # character 4-grams match inflections ("averages" ~ "average")
+    for word in words:
+        padded = f"#{word}#"
+        features += [(f"c:{padded[i:i + 4]}", 0.25) for i in range(max(len(padded) - 3, 1))]
+    return features
+
+
+def _code_features(code: str) -> list[tuple[str, float]]:
+    """Called functions, attributes, keyword names, and constants; variable names are ignored"""
+    try:
+        tree = ast.parse(dedent(code))
+    except (SyntaxError, ValueError):
+        return [(f"t:{token.lower()}", 1.0) for token in _CODE_TOKEN_PATTERN.findall(code)]
+
+    features = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Attribute):
+            features.append(f"a:{node.attr}")
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            features.append(f"a:{node.func.id}")
+        elif isinstance(node, ast.keyword) and node.arg:
+            features.append(f"k:{node.arg}")
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str):
+            # dataset paths differ in directory spelling, not in the file they name
+            features.append(f"s:{posixpath.basename(node.value).lower()}")
+        elif isinstance(node, ast.Constant) and node.value is not None:
+            features.append(f"n:{node.value!r}")
+    return [(feature, 1.0) for feature in features if feature[2:] not in _BOILERPLATE_CALLS]
+
+
+class SimilarityIndex:
+    """
+    In-memory nearest-neighbour index from (user_intent, code) to cache keys.
+
+    Requests are embedded locally as signed feature-hashed vectors: intent words, bigrams, and
+    character 4-grams fill one half of the dimensions and code features the other, each half
+    L2-normalised, so the cosine of two requests is the mean of their intent and code cosines.
+    Rows live in one float32 matrix, making a lookup a single matrix-vector product followed by
+    a top-k selection. No network access is needed.
+
+    Each row carries a scope (e.g. the staged datasets the code reads); only rows with the
+    query's scope can match, however similar the text.
+
+    At most `max_entries` rows are kept; adding past the bound replaces the least recently
+    added or matched row.
+    """
+
+    def __init__(
+            self,
+            dimensions: int = DEFAULT_DIMENSIONS,
+            threshold: float = DEFAULT_THRESHOLD,
+            top_k: int = DEFAULT_TOP_K,
+            initial_capacity: int = 1024,
+            max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self._dimensions = dimensions
+        self._threshold = threshold
+        self._top_k = top_k
+        self._max_entries = max(max_entries, 1)
+        self._matrix = np.zeros((min(max(initial_capacity, 1), self._max_entries), dimensions), dtype=np.float32)
+        self._row_scopes = np.full(len(self._matrix), -1, dtype=np.int32)
+        self._scope_ids: dict[str, int] = {}
+        self._keys: list[str | None] = []
+        # least recently added or matched first
+        self._rows: OrderedDict[str, int] = OrderedDict()
+        self._free_rows: list[int] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _embed(self, features: list[tuple[str, float]], dimensions: int) -> np.ndarray:
+        vector = np.zeros(dimensions, dtype=np.float32)
+        for feature, weight in features:
+            index, sign = _hash_feature(feature, dimensions)
+            vector[index] += sign * weight
+        norm = np.linalg.norm(vector)
+        # each half carries half the squared norm, so the full vector has unit length
+        return vector * np.float32(np.sqrt(0.5) / norm) if norm else vector
+
+    def vectorize(self, user_intent: str, code: str) -> np.ndarray:
+        half = self._dimensions // 2
+        return np.concatenate([
+            self._embed(_intent_features(user_intent), half),
+            self._embed(_code_features(code), self._dimensions - half),
+        ])
+
+    def _grow(self):
+        rows = len(self._matrix)
+        added = min(rows * 2, self._max_entries) - rows
+        grown = np.zeros((rows + added, self._dimensions), dtype=np.float32)
+        grown[:rows] = self._matrix
+        self._matrix = grown
+        self._row_scopes = np.concatenate([self._row_scopes, np.full(added, -1, dtype=np.int32)])
+
+    def add(self, user_intent: str, code: str, key: str, scope: str = ""):
+        row = self._rows.get(key)
+        if row is None and len(self._rows) >= self._max_entries:
+            self.remove(next(iter(self._rows)))
+        if row is None and self._free_rows:
+            row = self._free_rows.pop()
+            self._keys[row] = key
+        elif row is None:
+            row = len(self._keys)
+            if row == len(self._matrix):
+                self._grow()
+            self._keys.append(key)
+        self._matrix[row] = self.vectorize(user_intent, code)
+        self._row_scopes[row] = self._scope_ids.setdefault(scope, len(self._scope_ids))
+        self._rows[key] = row
+        self._rows.move_to_end(key)
+
+    def touch(self, key: str):
+        """Marks `key` as recently matched so the bound replaces other rows first"""
+        if key in self._rows:
+            self._rows.move_to_end(key)
+
+    def remove(self, key: str) -> bool:
+        row = self._rows.pop(key, None)
+        if row is None:
+            return False
+        self._matrix[row] = 0
+        self._row_scopes[row] = -1
+        self._keys[row] = None
+        self._free_rows.append(row)
+        return True
+
+    def search(self, user_intent: str, code: str, scope: str = "", top_k: int | None = None) -> list[tuple[str, float]]:
+        """Keys of the most similar indexed requests in `scope` at or above the threshold, best first"""
+        used = len(self._keys)
+        scope_id = self._scope_ids.get(scope)
+        if not self._rows or scope_id is None:
+            return []
+        top_k = min(top_k or self._top_k, used)
+        scores = self._matrix[:used] @ self.vectorize(user_intent, code)
+        scores[self._row_scopes[:used] != scope_id] = -1
+        if top_k < used:
+            candidates = np.argpartition(scores, -top_k)[-top_k:]
+        else:
+            candidates = np.arange(used)
+        candidates = candidates[np.argsort(scores[candidates])[::-1]]
+        return [
+            (self._keys[row], float(scores[row]))
+            for row in candidates
+            if scores[row] >= self._threshold and self._keys[row] is not None
+        ]
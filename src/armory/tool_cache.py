@@ -1,14 +1,23 @@
-import json
+import ast
+import asyncio
 import base64
+import hashlib
+import heapq
+import itertools
+import json
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from textwrap import dedent
 from typing import Any
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, DateTime, Integer, JSON, Text
+from sqlalchemy import Column, DateTime, Float, Index, Integer, JSON, LargeBinary, String, Text, func, inspect, text
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import Session, declarative_base, sessionmaker
 
+from .cache_eviction import EvictionPolicy, LruPolicy
+from .output_bundler import OutputBundler, SendTally
 from ..utils.logger import duck_logger
 from ..utils.protocols import SendMessage, ToolCache
 from ..utils.python_exec_container import FileResult
@@ -18,6 +27,8 @@ class CacheKey(BaseModel):
     dataset: list[str]
     analysis: list[str] | None = None
     parameters: dict[str, Any] = Field(default_factory=dict)
+    # staged path -> content hash of the data the code reads; set by the caller, not the key model
+    dataset_versions: dict[str, str] = Field(default_factory=dict)
 
 
 class CacheEntry(BaseModel):
@@ -28,13 +39,29 @@ class CacheEntry(BaseModel):
     last_access: datetime
     hit_count: int
     expires_at: datetime
+    # execution time a hit saves, and the entry's eviction priority under the cache's policy
+    cost_seconds: float = 0.0
+    priority: float = 0.0
+    # dataset -> content hash of the data the outputs were computed from
+    datasets: dict[str, str] = Field(default_factory=dict)
 
 
 ToolCacheRecordBase = declarative_base()
 
+# rows read per query while choosing which to evict
+EVICTION_BATCH_SIZE = 64
+# keys per IN (...) list in bulk statements
+BULK_BATCH_SIZE = 500
+# stdout characters shown per entry in cache reports
+REPORT_STDOUT_CHARS = 500
+
 
 class ToolCacheRecord(ToolCacheRecordBase):
     __tablename__ = "tool_cache"
+    __table_args__ = (
+        # `list_entries` order
+        Index("ix_tool_cache_hit_count_last_access", "hit_count", "last_access"),
+    )
 
     key = Column("key_hash", Text, primary_key=True)
     stdout = Column(Text, nullable=True)
@@ -43,7 +70,42 @@ class ToolCacheRecord(ToolCacheRecordBase):
     created_at = Column(DateTime(timezone=True), nullable=False)
     last_access = Column(DateTime(timezone=True), nullable=False)
     hit_count = Column(Integer, nullable=False, default=0)
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    # maintained on every write and hit for the eviction policy
+    size_bytes = Column(Integer, nullable=True)
+    cost_seconds = Column(Float, nullable=True)
+    priority = Column(Float, nullable=True, index=True)
+    # lets listings skip the `tables` JSON
+    table_count = Column(Integer, nullable=True)
+
+
+class ToolCacheDataset(ToolCacheRecordBase):
+    """Reverse index: the cache keys computed from each version of a dataset"""
+    __tablename__ = "tool_cache_datasets"
+
+    dataset = Column(String(255), primary_key=True)
+    dataset_hash = Column(String(64), primary_key=True)
+    # keys are unbounded text (semantic keys list every dataset path), so rows are keyed on their SHA-256
+    key_digest = Column(String(64), primary_key=True, index=True)
+    key = Column("key_hash", Text, nullable=False)
+
+
+class ToolCacheDatasetVersion(ToolCacheRecordBase):
+    """Every dataset version with indexed keys; a handful of rows, read to find superseded versions"""
+    __tablename__ = "tool_cache_dataset_versions"
+
+    dataset = Column(String(255), primary_key=True)
+    dataset_hash = Column(String(64), primary_key=True)
+
+
+class ToolCacheBlob(ToolCacheRecordBase):
+    """Cached file bytes, stored once per content hash and shared by every record that references them"""
+    __tablename__ = "tool_cache_blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    data = Column(LargeBinary().with_variant(mysql.LONGBLOB(), "mysql"), nullable=False)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
 
 
 def _canonical_cache_key(cache_key: CacheKey) -> str:
@@ -54,6 +116,97 @@ def _canonical_cache_key(cache_key: CacheKey) -> str:
     )
 
 
+def _key_digest(key: str) -> str:
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def canonical_code(code: str) -> str | None:
+    """
+    Round-trips code through the AST, which drops comments and formatting and normalises
+    literal spelling (quotes, numeric bases, underscores). Returns None for unparsable code.
+    """
+    try:
+        return ast.unparse(ast.parse(dedent(code)))
+    except (SyntaxError, ValueError):
+        return None
+
+
+def exact_cache_key(code: str, dataset_versions: dict[str, str]) -> str | None:
+    """Key for the exact tier: structurally identical code run against the same staged datasets"""
+    canonical = canonical_code(code)
+    if canonical is None:
+        return None
+    payload = json.dumps({"code": canonical, "datasets": dataset_versions}, sort_keys=True)
+    return "exact:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CacheEntryBuilder:
+    """Collects a run's outputs so a cache can write them as one entry in a single transaction"""
+
+    def __init__(self):
+        self.stdout: str | None = None
+        self.tables: list[dict[str, Any]] = []
+        self.files: dict[str, FileResult] = {}
+        self.cost_seconds = 0.0
+        self.datasets: dict[str, str] = {}
+
+    def add_file(self, filename: str, file: FileResult):
+        self.files[filename] = {"bytes": file["bytes"], "description": file.get("description", "")}
+
+    def add_table(self, filename: str, table_chunks: list[str], description: str = ""):
+        if table_chunks:
+            self.tables.append({"filename": filename, "description": description, "chunks": table_chunks})
+
+    def set_stdout(self, msg: str):
+        self.stdout = msg
+
+    def set_cost(self, cost_seconds: float):
+        self.cost_seconds = cost_seconds
+
+    def set_datasets(self, datasets: dict[str, str]):
+        """Dataset -> content hash of the data the outputs were computed from, indexed for invalidation"""
+        self.datasets = dict(datasets)
+
+    def size_bytes(self) -> int:
+        return (
+            len(self.stdout or "")
+            + sum(len(file["bytes"]) for file in self.files.values())
+            + sum(len(chunk) for table in self.tables for chunk in table["chunks"])
+        )
+
+    def build(self, now: datetime) -> CacheEntry:
+        return CacheEntry(
+            stdout=self.stdout,
+            tables=[dict(table) for table in self.tables],
+            files={filename: dict(file) for filename, file in self.files.items()},
+            created_at=now,
+            last_access=now,
+            hit_count=0,
+            expires_at=now + timedelta(days=1),
+            cost_seconds=self.cost_seconds,
+            datasets=dict(self.datasets),
+        )
+
+
+class CacheLookupStats:
+    """Hit/miss counts per lookup tier (e.g. `exact`, `semantic`)"""
+
+    def __init__(self):
+        self._counts: dict[str, dict[str, int]] = {}
+
+    def record(self, tier: str, hit: bool):
+        counts = self._counts.setdefault(tier, {"hits": 0, "misses": 0})
+        counts["hits" if hit else "misses"] += 1
+
+    def record_failure(self, tier: str):
+        """A lookup that neither hit nor missed, e.g. a speculative run that raised"""
+        counts = self._counts.setdefault(tier, {"hits": 0, "misses": 0})
+        counts["failed"] = counts.get("failed", 0) + 1
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        return {tier: dict(counts) for tier, counts in self._counts.items()}
+
+
 def _format_cache_report(records: list[tuple[str, Any]]) -> list[dict[str, Any]]:
     rows = []
     min_dt = datetime.min.replace(tzinfo=timezone.utc)
@@ -67,15 +220,17 @@ def _format_cache_report(records: list[tuple[str, Any]]) -> list[dict[str, Any]]
     )
 
     for key, record in sorted_records:
-        tables = list(getattr(record, "tables", None) or [])
+        table_count = getattr(record, "table_count", None)
+        if table_count is None:
+            table_count = len(getattr(record, "tables", None) or [])
         files = dict(getattr(record, "files", None) or {})
         stdout = getattr(record, "stdout", None) or ""
         rows.append({
             "key": key,
             "hits": getattr(record, "hit_count"),
             "stdout_preview": stdout[:7],
-            "stdout": stdout,
-            "tables": len(tables),
+            "stdout": stdout[:REPORT_STDOUT_CHARS],
+            "tables": table_count,
             "files": len(files),
             "created": getattr(record, "created_at").strftime("%m/%d/%y"),
             "expires": getattr(record, "expires_at").strftime("%m/%d/%y"),
@@ -84,10 +239,163 @@ def _format_cache_report(records: list[tuple[str, Any]]) -> list[dict[str, Any]]
     return rows
 
 
+def _expiry_after_hit(hit_count: int, now: datetime) -> datetime:
+    if hit_count >= 10:
+        return now + timedelta(days=548)
+    return now + timedelta(days=hit_count + 1)
+
+
+def _expiry_after_rewrite(expires_at: datetime, now: datetime) -> datetime:
+    """A rewritten entry keeps the lifetime its hits earned, and lives at least as long as a new one"""
+    if expires_at.tzinfo is None:
+        # SQLite returns naive datetimes
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return max(expires_at, now + timedelta(days=1))
+
+
+async def send_cache_entry(
+        entry: CacheEntry,
+        send_message: SendMessage,
+        channel_id: int,
+        tally: SendTally | None = None
+) -> dict[str, Any]:
+    bundler = OutputBundler()
+    for filename, file_data in entry.files.items():
+        bundler.add_file(filename, file_data["bytes"])
+
+    for table in entry.tables:
+        for table_chunk in table["chunks"]:
+            bundler.add_text(table_chunk)
+
+    if entry.stdout:
+        bundler.add_text(entry.stdout)
+    await bundler.send(send_message, channel_id, tally)
+
+    files = {
+        filename: file_data["description"]
+        for filename, file_data in entry.files.items()
+    }
+
+    for table in entry.tables:
+        files[table["filename"]] = table.get("description", "")
+
+    return {
+        "stdout": entry.stdout or "",
+        "stderr": "",
+        "files": files,
+    }
+
+
+def _add_missing_columns(bind, table):
+    """`create_all` skips existing tables, so columns added since a table was created are added here"""
+    existing = {column["name"] for column in inspect(bind).get_columns(table.name)}
+    with bind.begin() as connection:
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def _batched(items: list[str], size: int = BULK_BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _entry_size(entry: CacheEntry) -> int:
+    return (
+        len(entry.stdout or "")
+        + sum(len(file["bytes"]) for file in entry.files.values())
+        + sum(len(chunk) for table in entry.tables for chunk in table["chunks"])
+    )
+
+
 class InMemoryToolCache(ToolCache):
-    def __init__(self, cache_store: dict[str, CacheEntry] | None = None):
+    def __init__(
+            self,
+            cache_store: dict[str, CacheEntry] | None = None,
+            policy: EvictionPolicy | None = None,
+            max_bytes: int | None = None,
+            max_entries: int | None = None
+    ):
         self._cache_store = cache_store if cache_store is not None else {}
         self._last_cleanup_at: datetime | None = None
+        self.lookup_stats = CacheLookupStats()
+        self._policy = policy or LruPolicy()
+        self._max_bytes = max_bytes
+        self._max_entries = max_entries
+        # (priority, sequence, key); stale pairs are skipped when popped
+        self._eviction_heap: list[tuple[float, int, str]] = []
+        self._eviction_seq = itertools.count()
+        self._sizes: dict[str, int] = {}
+        self._used_bytes = 0
+        # (dataset, content hash) -> keys computed from that version
+        self._dataset_keys: dict[tuple[str, str], set[str]] = {}
+        for key in self._cache_store:
+            self._reprioritise(key)
+            self._index_datasets(key)
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used_bytes
+
+    def _reprioritise(self, key: str):
+        entry = self._cache_store[key]
+        size = _entry_size(entry)
+        self._used_bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        entry.priority = self._policy.priority(entry.hit_count, size, entry.cost_seconds, self._utc_now())
+        heapq.heappush(self._eviction_heap, (entry.priority, next(self._eviction_seq), key))
+        if len(self._eviction_heap) > 2 * len(self._cache_store) + 64:
+            self._eviction_heap = [
+                (entry.priority, next(self._eviction_seq), key) for key, entry in self._cache_store.items()
+            ]
+            heapq.heapify(self._eviction_heap)
+
+    def _index_datasets(self, key: str):
+        for version in self._cache_store[key].datasets.items():
+            self._dataset_keys.setdefault(version, set()).add(key)
+
+    def _forget(self, key: str, entry: CacheEntry):
+        self._used_bytes -= self._sizes.pop(key, 0)
+        for version in entry.datasets.items():
+            keys = self._dataset_keys.get(version)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._dataset_keys[version]
+
+    def _over_budget(self) -> bool:
+        return (
+            (self._max_bytes is not None and self._used_bytes > self._max_bytes)
+            or (self._max_entries is not None and len(self._cache_store) > self._max_entries)
+        )
+
+    def _enforce_budget(self, protected_key: str) -> list[str]:
+        """Evicts lowest-priority entries, never the one just written, until within budget; returns their keys"""
+        evicted, deferred = [], []
+        while self._over_budget() and self._eviction_heap:
+            priority, seq, key = heapq.heappop(self._eviction_heap)
+            entry = self._cache_store.get(key)
+            if entry is None or entry.priority != priority:
+                continue
+            if key == protected_key:
+                deferred.append((priority, seq, key))
+                continue
+            del self._cache_store[key]
+            self._forget(key, entry)
+            self._policy.evicted(priority)
+            evicted.append(key)
+            duck_logger.debug(f"Evicted cache entry {key}")
+        for item in deferred:
+            heapq.heappush(self._eviction_heap, item)
+        return evicted
+
+    def _written(self, key: str) -> list[str]:
+        self._reprioritise(key)
+        return self._enforce_budget(key)
 
     @staticmethod
     def _utc_now() -> datetime:
@@ -96,253 +404,388 @@ class InMemoryToolCache(ToolCache):
     def get_key(self, cache_key: CacheKey) -> str:
         return _canonical_cache_key(cache_key)
 
-    def check_if_cached(self, key: str) -> bool:
-        result = key in self._cache_store
-        return result
-
-    async def send_from_cache(self, key: str, send_message: SendMessage, channel_id: int) -> dict[str, Any]:
+    def get_or_none(self, key: str) -> CacheEntry | None:
         entry = self._cache_store.get(key)
-
         if entry is None:
-            duck_logger.error(f"Key {key} not in cache")
-            return {}
+            return None
 
         now = self._utc_now()
         entry.hit_count += 1
         entry.last_access = now
-        if entry.hit_count >= 10:
-            entry.expires_at = now + timedelta(days=548)
-        else:
-            entry.expires_at = now + timedelta(days=entry.hit_count + 1)
-
-        for filename, file_data in entry.files.items():
-            await send_message(
-                channel_id,
-                file={
-                    "filename": filename,
-                    "bytes": file_data["bytes"],
-                }
-            )
-
-        for table in entry.tables:
-            for table_chunk in table["chunks"]:
-                await send_message(channel_id, table_chunk)
-
-        if entry.stdout:
-            await send_message(channel_id, entry.stdout)
-
-        files = {
-            filename: file_data["description"]
-            for filename, file_data in entry.files.items()
-        }
+        entry.expires_at = _expiry_after_hit(entry.hit_count, now)
+        self._reprioritise(key)
+        return entry
 
-        for table in entry.tables:
-            files[table["filename"]] = table.get("description", "")
-
-        output = {
-            "stdout": entry.stdout or "",
-            "stderr": "",
-            "files": files,
-        }
-
-        return output
-
-    def _get_or_create(self, key: str) -> CacheEntry:
-        if key not in self._cache_store:
-            now = self._utc_now()
-            self._cache_store[key] = CacheEntry(
-                hit_count=0,
-                created_at=now,
-                last_access=now,
-                expires_at=now + timedelta(days=1),
-            )
-        return self._cache_store[key]
+    def load_entry(self, key: str) -> CacheEntry | None:
+        return self._cache_store.get(key)
 
     def cleanup(self):
         now = self._utc_now()
         if self._last_cleanup_at is not None and (now - self._last_cleanup_at) < timedelta(days=1):
             return
 
-        self._cache_store = {
-            key: entry
-            for key, entry in self._cache_store.items()
-            if entry.expires_at >= now
-        }
+        expired = [key for key, entry in self._cache_store.items() if entry.expires_at < now]
+        for key in expired:
+            self._forget(key, self._cache_store.pop(key))
         self._last_cleanup_at = now
 
-    def cache_file(self, key: str, filename: str, file: FileResult):
-        duck_logger.debug(f"Caching file: {filename}")
-        entry = self._get_or_create(key)
-        entry.files[filename] = {
-            "bytes": file["bytes"],
-            "description": file.get("description", ""),
-        }
-
-    def cache_table(self, key: str, filename: str, table_chunks: list[str], description: str = ""):
-        if not table_chunks:
+    def write_entry(self, key: str, builder: CacheEntryBuilder) -> list[str]:
+        now = self._utc_now()
+        entry = builder.build(now)
+        if (existing := self._cache_store.get(key)) is not None:
+            entry.hit_count = existing.hit_count
+            entry.created_at = existing.created_at
+            entry.expires_at = _expiry_after_rewrite(existing.expires_at, now)
+            self._forget(key, existing)
+        self._cache_store[key] = entry
+        self._index_datasets(key)
+        return self._written(key)
+
+    def set_cost(self, key: str, cost_seconds: float):
+        if key not in self._cache_store:
             return
-        duck_logger.debug(f"Caching table: {filename}")
-        entry = self._get_or_create(key)
-        entry.tables.append({
-            "filename": filename,
-            "description": description,
-            "chunks": table_chunks,
-        })
+        self._cache_store[key].cost_seconds = cost_seconds
+        self._reprioritise(key)
 
-    def cache_msg(self, key: str, msg: str):
-        duck_logger.debug(f"Caching message: {msg}")
-        entry = self._get_or_create(key)
-        entry.stdout = msg
+    def list_entries(self, offset: int = 0, limit: int | None = None) -> list[dict[str, Any]]:
+        rows = _format_cache_report(list(self._cache_store.items()))
+        return rows[offset:None if limit is None else offset + limit]
 
-    def list_entries(self) -> list[dict[str, Any]]:
-        return _format_cache_report(list(self._cache_store.items()))
+    def count_entries(self) -> int:
+        return len(self._cache_store)
 
     def remove_entry(self, key: str) -> bool:
         if key not in self._cache_store:
             return False
-        del self._cache_store[key]
+        self._forget(key, self._cache_store.pop(key))
         return True
 
     def clear_entries(self) -> int:
         removed_count = len(self._cache_store)
         self._cache_store.clear()
+        self._eviction_heap.clear()
+        self._sizes.clear()
+        self._dataset_keys.clear()
+        self._used_bytes = 0
         return removed_count
 
+    def invalidate_datasets(self, versions: dict[str, str]) -> list[str]:
+        superseded = [
+            (dataset, content_hash) for dataset, content_hash in self._dataset_keys
+            if dataset in versions and versions[dataset] != content_hash
+        ]
+        stale_keys = {key for version in superseded for key in self._dataset_keys.get(version, ())}
+        for key in stale_keys:
+            self.remove_entry(key)
+        return list(stale_keys)
+
 
 class SqlToolCache(ToolCache):
-    def __init__(self, session: Session):
+    def __init__(
+            self,
+            session: Session,
+            policy: EvictionPolicy | None = None,
+            max_bytes: int | None = None,
+            max_entries: int | None = None
+    ):
         bind = session.get_bind()
         if bind is None:
             raise ValueError("Cannot initialize SqlToolCache without a SQLAlchemy bind")
         self._session_factory = sessionmaker(bind=bind)
         ToolCacheRecordBase.metadata.create_all(bind)
+        _add_missing_columns(bind, ToolCacheRecord.__table__)
         self._last_cleanup_at: datetime | None = None
+        self.lookup_stats = CacheLookupStats()
+        self._policy = policy or LruPolicy()
+        self._max_bytes = max_bytes
+        self._max_entries = max_entries
+        # kept up to date on every write and removal so budget checks need no aggregate query
+        self._entry_count = 0
+        self._used_bytes = 0
+        with self._session_factory() as session:
+            lowest = session.query(func.min(ToolCacheRecord.priority)).scalar()
+        if lowest is not None:
+            # resume aging from the stored priorities rather than from zero
+            self._policy.evicted(lowest)
+        self._backfill_derived_columns()
+        with self._session_factory() as session:
+            self._recount(session)
+
+    def _backfill_derived_columns(self):
+        """Rows written before the size, priority, and table count columns existed get them, a batch at a time"""
+        unset = (
+            ToolCacheRecord.size_bytes.is_(None)
+            | ToolCacheRecord.priority.is_(None)
+            | ToolCacheRecord.table_count.is_(None)
+        )
+        with self._session_factory() as session:
+            while records := session.query(ToolCacheRecord).filter(unset).limit(EVICTION_BATCH_SIZE).all():
+                for record in records:
+                    record.table_count = len(record.tables or [])
+                    self._reprioritise(record, record.last_access)
+                session.commit()
+
+    def _recount(self, session: Session):
+        self._entry_count, self._used_bytes = session.query(
+            func.count(ToolCacheRecord.key),
+            func.coalesce(func.sum(ToolCacheRecord.size_bytes), 0)
+        ).one()
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used_bytes
 
     @staticmethod
     def _utc_now() -> datetime:
         return datetime.now(timezone.utc)
 
     @staticmethod
-    def _encode_file(file: FileResult) -> dict[str, str]:
+    def _store_blob(session: Session, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        updated = (
+            session.query(ToolCacheBlob)
+            .filter(ToolCacheBlob.sha256 == digest)
+            .update({ToolCacheBlob.ref_count: ToolCacheBlob.ref_count + 1}, synchronize_session=False)
+        )
+        if not updated:
+            session.add(ToolCacheBlob(sha256=digest, data=data, size=len(data), ref_count=1))
+            session.flush()
+        return digest
+
+    @staticmethod
+    def _release_blobs(session: Session, files: list[dict[str, Any]]):
+        """Drops one reference per file entry and deletes blobs that are no longer referenced"""
+        releases: dict[str, int] = {}
+        for file_data in files:
+            if digest := file_data.get("blob"):
+                releases[digest] = releases.get(digest, 0) + 1
+        if not releases:
+            return
+        # one UPDATE per distinct release count (almost always just 1) rather than per blob
+        by_count: dict[int, list[str]] = {}
+        for digest, count in releases.items():
+            by_count.setdefault(count, []).append(digest)
+        for count, digests in by_count.items():
+            for batch in _batched(digests):
+                session.query(ToolCacheBlob).filter(ToolCacheBlob.sha256.in_(batch)).update(
+                    {ToolCacheBlob.ref_count: ToolCacheBlob.ref_count - count}, synchronize_session=False
+                )
+        for batch in _batched(list(releases)):
+            session.query(ToolCacheBlob).filter(
+                ToolCacheBlob.sha256.in_(batch),
+                ToolCacheBlob.ref_count <= 0
+            ).delete(synchronize_session=False)
+
+    @classmethod
+    def _encode_file(cls, session: Session, file: FileResult) -> dict[str, Any]:
         return {
-            "bytes_b64": base64.b64encode(file["bytes"]).decode("ascii"),
+            "blob": cls._store_blob(session, file["bytes"]),
+            "size": len(file["bytes"]),
             "description": file.get("description", ""),
         }
 
     @staticmethod
-    def _decode_file(file_data: dict[str, str]) -> FileResult:
-        return {
-            "bytes": base64.b64decode(file_data["bytes_b64"]),
-            "description": file_data.get("description", ""),
-        }
+    def _decode_files(session: Session, files: dict[str, dict[str, Any]]) -> dict[str, FileResult]:
+        digests = {file_data["blob"] for file_data in files.values() if "blob" in file_data}
+        blobs = dict(
+            session.query(ToolCacheBlob.sha256, ToolCacheBlob.data)
+            .filter(ToolCacheBlob.sha256.in_(digests))
+            .all()
+        ) if digests else {}
+
+        decoded = {}
+        for filename, file_data in files.items():
+            if "blob" in file_data:
+                data = blobs.get(file_data["blob"])
+                if data is None:
+                    duck_logger.warning(f"Cached file {filename} is missing blob {file_data['blob']}")
+                    continue
+            else:
+                # entries written before the blob table kept base64 bytes inline
+                data = base64.b64decode(file_data["bytes_b64"])
+            decoded[filename] = {"bytes": data, "description": file_data.get("description", "")}
+        return decoded
 
-    def get_key(self, cache_key: CacheKey) -> str:
-        return _canonical_cache_key(cache_key)
+    @staticmethod
+    def _all_files(records: list[ToolCacheRecord]) -> list[dict[str, Any]]:
+        return [file_data for record in records for file_data in (record.files or {}).values()]
 
-    def _get_or_create(self, session: Session, key: str) -> ToolCacheRecord:
-        record = session.get(ToolCacheRecord, key)
-        if record is None:
-            now = self._utc_now()
-            record = ToolCacheRecord(
-                key=key,
-                stdout=None,
-                tables=[],
-                files={},
-                hit_count=0,
-                created_at=now,
-                last_access=now,
-                expires_at=now + timedelta(days=1),
+    @staticmethod
+    def _record_size(record: ToolCacheRecord) -> int:
+        return (
+            len(record.stdout or "")
+            + sum(
+                file_data.get("size", len(file_data.get("bytes_b64", "")) * 3 // 4)
+                for file_data in (record.files or {}).values()
             )
-            session.add(record)
-            session.flush()
-        return record
+            + sum(len(chunk) for table in (record.tables or []) for chunk in table["chunks"])
+        )
 
-    def check_if_cached(self, key: str) -> bool:
-        with self._session_factory() as session:
-            return session.get(ToolCacheRecord, key) is not None
+    def _reprioritise(self, record: ToolCacheRecord, now: datetime):
+        size_bytes = self._record_size(record)
+        self._used_bytes += size_bytes - (record.size_bytes or 0)
+        record.size_bytes = size_bytes
+        record.priority = self._policy.priority(record.hit_count, record.size_bytes, record.cost_seconds or 0.0, now)
+
+    def _enforce_budget(self, session: Session, protected_key: str) -> list[str]:
+        """Deletes lowest-priority rows, never the one just written, until within budget; returns their keys"""
+        if self._max_bytes is None and self._max_entries is None:
+            return []
+        excess_entries = self._entry_count - self._max_entries if self._max_entries is not None else 0
+        excess_bytes = self._used_bytes - self._max_bytes if self._max_bytes is not None else 0
+        if excess_entries <= 0 and excess_bytes <= 0:
+            return []
+
+        evicted_keys, evicted_files, evicted_bytes = [], [], 0
+        while excess_entries > 0 or excess_bytes > 0:
+            batch = (
+                session.query(ToolCacheRecord.key, ToolCacheRecord.size_bytes, ToolCacheRecord.priority, ToolCacheRecord.files)
+                .filter(ToolCacheRecord.key != protected_key)
+                .order_by(ToolCacheRecord.priority.asc())
+                .offset(len(evicted_keys))
+                .limit(EVICTION_BATCH_SIZE)
+                .all()
+            )
+            if not batch:
+                break
+            for key, size_bytes, priority, files in batch:
+                if excess_entries <= 0 and excess_bytes <= 0:
+                    break
+                evicted_keys.append(key)
+                evicted_files.extend((files or {}).values())
+                excess_entries -= 1
+                excess_bytes -= size_bytes or 0
+                evicted_bytes += size_bytes or 0
+                self._policy.evicted(priority or 0.0)
+        if not evicted_keys:
+            return []
+        self._release_blobs(session, evicted_files)
+        session.query(ToolCacheRecord).filter(ToolCacheRecord.key.in_(evicted_keys)).delete(synchronize_session=False)
+        self._entry_count -= len(evicted_keys)
+        self._used_bytes -= evicted_bytes
+        duck_logger.debug(f"Evicted {len(evicted_keys)} cache entries")
+        return evicted_keys
+
+    def _written(self, session: Session, record: ToolCacheRecord) -> list[str]:
+        self._reprioritise(record, self._utc_now())
+        return self._enforce_budget(session, record.key)
 
-    async def send_from_cache(self, key: str, send_message: SendMessage, channel_id: int) -> dict[str, Any]:
+    def get_key(self, cache_key: CacheKey) -> str:
+        return _canonical_cache_key(cache_key)
+
+    def get_or_none(self, key: str) -> CacheEntry | None:
+        """Reads the entry and counts the hit in one transaction; no existence check is needed first"""
         with self._session_factory() as session:
             record = session.get(ToolCacheRecord, key)
             if record is None:
-                duck_logger.warning(f"Key {key} not in cache")
-                return {}
+                return None
 
             now = self._utc_now()
             record.hit_count += 1
             record.last_access = now
-            if record.hit_count >= 10:
-                record.expires_at = now + timedelta(days=548)
-            else:
-                record.expires_at = now + timedelta(days=record.hit_count + 1)
-
-            files = {
-                filename: self._decode_file(file_data)
-                for filename, file_data in (record.files or {}).items()
+            record.expires_at = _expiry_after_hit(record.hit_count, now)
+            entry = self._read_entry(session, record)
+            self._reprioritise(record, now)
+            session.commit()
+        return entry
+
+    def _read_entry(self, session: Session, record: ToolCacheRecord) -> CacheEntry:
+        files = self._decode_files(session, record.files or {})
+        if any("bytes_b64" in file_data for file_data in (record.files or {}).values()):
+            # move legacy inline bytes into the blob table on first read
+            record.files = {
+                filename: self._encode_file(session, file) for filename, file in files.items()
             }
-            tables = list(record.tables or [])
-            stdout = record.stdout
+        return CacheEntry(
+            stdout=record.stdout,
+            tables=list(record.tables or []),
+            files=files,
+            created_at=record.created_at,
+            last_access=record.last_access,
+            hit_count=record.hit_count,
+            expires_at=record.expires_at,
+            cost_seconds=record.cost_seconds or 0.0,
+            priority=record.priority or 0.0,
+        )
 
+    def load_entry(self, key: str) -> CacheEntry | None:
+        """Reads a whole entry, file bytes included, without counting it as a hit"""
+        with self._session_factory() as session:
+            record = session.get(ToolCacheRecord, key)
+            if record is None:
+                return None
+            entry = self._read_entry(session, record)
             session.commit()
+        return entry
 
-        for filename, file_data in files.items():
-            await send_message(
-                channel_id,
-                file={
-                    "filename": filename,
-                    "bytes": file_data["bytes"],
-                }
-            )
-
-        for table in tables:
-            for table_chunk in table["chunks"]:
-                await send_message(channel_id, table_chunk)
-
-        if stdout:
-            await send_message(channel_id, stdout)
-
-        output_files = {
-            filename: file_data["description"]
-            for filename, file_data in files.items()
-        }
-        for table in tables:
-            output_files[table["filename"]] = table.get("description", "")
-
-        return {
-            "stdout": stdout or "",
-            "stderr": "",
-            "files": output_files,
-        }
-
-    def cache_file(self, key: str, filename: str, file: FileResult):
-        duck_logger.debug(f"Caching file: {filename}")
+    def record_hits(self, hits: dict[str, tuple[int, datetime]]):
+        """Applies hits counted elsewhere: key -> (number of hits, time of the latest)"""
         with self._session_factory() as session:
-            record = self._get_or_create(session, key)
-            files = dict(record.files or {})
-            files[filename] = self._encode_file(file)
-            record.files = files
+            for key, (count, last_access) in hits.items():
+                record = session.get(ToolCacheRecord, key)
+                if record is None:
+                    continue
+                record.hit_count += count
+                record.last_access = last_access
+                record.expires_at = _expiry_after_hit(record.hit_count, last_access)
+                self._reprioritise(record, last_access)
             session.commit()
 
-    def cache_table(self, key: str, filename: str, table_chunks: list[str], description: str = ""):
-        if not table_chunks:
-            return
-        duck_logger.debug(f"Caching table: {filename}")
+    def top_keys(self, limit: int) -> list[str]:
         with self._session_factory() as session:
-            record = self._get_or_create(session, key)
-            tables = list(record.tables or [])
-            tables.append({
-                "filename": filename,
-                "description": description,
-                "chunks": table_chunks,
-            })
-            record.tables = tables
+            rows = (
+                session.query(ToolCacheRecord.key)
+                .order_by(ToolCacheRecord.hit_count.desc(), ToolCacheRecord.last_access.desc())
+                .limit(limit)
+                .all()
+            )
+        return [key for key, in rows]
+
+    def write_entry(self, key: str, builder: CacheEntryBuilder) -> list[str]:
+        """Writes (or replaces) a complete entry, blobs included, in one transaction; returns the keys evicted"""
+        with self._session_factory() as session:
+            record = session.get(ToolCacheRecord, key)
+            if record is None:
+                now = self._utc_now()
+                record = ToolCacheRecord(
+                    key=key,
+                    hit_count=0,
+                    created_at=now,
+                    last_access=now,
+                    expires_at=now + timedelta(days=1),
+                )
+                session.add(record)
+                self._entry_count += 1
+            else:
+                self._release_blobs(session, self._all_files([record]))
+                record.expires_at = _expiry_after_rewrite(record.expires_at, self._utc_now())
+            record.stdout = builder.stdout
+            record.tables = [dict(table) for table in builder.tables]
+            record.table_count = len(record.tables)
+            record.files = {
+                filename: self._encode_file(session, file) for filename, file in builder.files.items()
+            }
+            record.cost_seconds = builder.cost_seconds
+            self._index_datasets(session, key, builder.datasets)
+            evicted = self._written(session, record)
             session.commit()
+        return evicted
 
-    def cache_msg(self, key: str, msg: str):
-        duck_logger.debug(f"Caching message: {msg}")
+    @staticmethod
+    def _index_datasets(session: Session, key: str, datasets: dict[str, str]):
+        digest = _key_digest(key)
+        session.query(ToolCacheDataset).filter(ToolCacheDataset.key_digest == digest).delete(synchronize_session=False)
+        for dataset, content_hash in datasets.items():
+            session.add(ToolCacheDataset(dataset=dataset, dataset_hash=content_hash, key_digest=digest, key=key))
+            session.merge(ToolCacheDatasetVersion(dataset=dataset, dataset_hash=content_hash))
+
+    def set_cost(self, key: str, cost_seconds: float):
         with self._session_factory() as session:
-            record = self._get_or_create(session, key)
-            record.stdout = msg
+            record = session.get(ToolCacheRecord, key)
+            if record is None:
+                return
+            record.cost_seconds = cost_seconds
+            self._reprioritise(record, self._utc_now())
             session.commit()
 
     def cleanup(self):
@@ -351,54 +794,321 @@ class SqlToolCache(ToolCache):
             return
 
         with self._session_factory() as session:
-            expired_records = (
-                session.query(ToolCacheRecord)
-                .filter(ToolCacheRecord.expires_at < now)
-                .all()
-            )
-            for record in expired_records:
-                session.delete(record)
+            expired = ToolCacheRecord.expires_at < now
+            # only the small `files` JSON is read, to release blob references
+            expired_files = session.query(ToolCacheRecord.files).filter(expired).all()
+            self._release_blobs(session, [
+                file_data for files, in expired_files for file_data in (files or {}).values()
+            ])
+            removed_count = session.query(ToolCacheRecord).filter(expired).delete(synchronize_session=False)
+            # index rows of expired and evicted entries
+            session.query(ToolCacheDataset).filter(
+                ~session.query(ToolCacheRecord.key).filter(ToolCacheRecord.key == ToolCacheDataset.key).exists()
+            ).delete(synchronize_session=False)
             session.commit()
+            # once a day, also corrects any drift from writes that failed after counting
+            self._recount(session)
 
+        duck_logger.info(f"Removed {removed_count} expired cache entries")
         self._last_cleanup_at = now
 
-    def list_entries(self) -> list[dict[str, Any]]:
+    def list_entries(self, offset: int = 0, limit: int | None = None) -> list[dict[str, Any]]:
+        """Summary rows, most hit first; only a stdout prefix and the small `files` JSON are read"""
         with self._session_factory() as session:
-            records = session.query(ToolCacheRecord).all()
+            rows = (
+                session.query(
+                    ToolCacheRecord.key,
+                    func.substr(ToolCacheRecord.stdout, 1, REPORT_STDOUT_CHARS).label("stdout"),
+                    ToolCacheRecord.table_count,
+                    ToolCacheRecord.files,
+                    ToolCacheRecord.hit_count,
+                    ToolCacheRecord.created_at,
+                    ToolCacheRecord.last_access,
+                    ToolCacheRecord.expires_at,
+                )
+                .order_by(ToolCacheRecord.hit_count.desc(), ToolCacheRecord.last_access.desc())
+                .offset(offset)
+                .limit(limit)
+                .all()
+            )
+
+        return _format_cache_report([(row.key, row) for row in rows])
 
-        return _format_cache_report([(record.key, record) for record in records])
+    def count_entries(self) -> int:
+        with self._session_factory() as session:
+            return session.query(func.count(ToolCacheRecord.key)).scalar()
 
     def remove_entry(self, key: str) -> bool:
         with self._session_factory() as session:
             record = session.get(ToolCacheRecord, key)
             if record is None:
                 return False
+            size_bytes = record.size_bytes or 0
+            self._release_blobs(session, self._all_files([record]))
             session.delete(record)
+            session.query(ToolCacheDataset).filter(
+                ToolCacheDataset.key_digest == _key_digest(key)
+            ).delete(synchronize_session=False)
             session.commit()
+        self._entry_count -= 1
+        self._used_bytes -= size_bytes
         return True
 
     def clear_entries(self) -> int:
         with self._session_factory() as session:
-            records = session.query(ToolCacheRecord).all()
-            removed_count = len(records)
-            for record in records:
-                session.delete(record)
+            removed_count = session.query(ToolCacheRecord).delete(synchronize_session=False)
+            # with every record gone no blob is referenced
+            session.query(ToolCacheBlob).delete(synchronize_session=False)
+            session.query(ToolCacheDataset).delete(synchronize_session=False)
+            session.query(ToolCacheDatasetVersion).delete(synchronize_session=False)
             session.commit()
+        self._entry_count = 0
+        self._used_bytes = 0
         return removed_count
 
+    def invalidate_datasets(self, versions: dict[str, str]) -> list[str]:
+        """
+        Deletes the entries computed from a version of these datasets other than the given one and
+        returns their keys. Reads the few version rows, then only the index rows of superseded versions.
+        """
+        with self._session_factory() as session:
+            superseded = [
+                (dataset, content_hash)
+                for batch in _batched(list(versions))
+                for dataset, content_hash in session.query(
+                    ToolCacheDatasetVersion.dataset, ToolCacheDatasetVersion.dataset_hash
+                ).filter(ToolCacheDatasetVersion.dataset.in_(batch))
+                if versions[dataset] != content_hash
+            ]
+            stale_keys: set[str] = set()
+            for dataset, content_hash in superseded:
+                version = (ToolCacheDataset.dataset == dataset, ToolCacheDataset.dataset_hash == content_hash)
+                stale_keys.update(key for key, in session.query(ToolCacheDataset.key).filter(*version))
+                session.query(ToolCacheDataset).filter(*version).delete(synchronize_session=False)
+                session.query(ToolCacheDatasetVersion).filter(
+                    ToolCacheDatasetVersion.dataset == dataset,
+                    ToolCacheDatasetVersion.dataset_hash == content_hash
+                ).delete(synchronize_session=False)
+
+            keys = list(stale_keys)
+            removed_count = removed_bytes = 0
+            for batch in _batched(keys):
+                stale = ToolCacheRecord.key.in_(batch)
+                records = session.query(ToolCacheRecord.files, ToolCacheRecord.size_bytes).filter(stale).all()
+                self._release_blobs(session, [
+                    file_data for files, _ in records for file_data in (files or {}).values()
+                ])
+                removed_bytes += sum(size_bytes or 0 for _, size_bytes in records)
+                removed_count += session.query(ToolCacheRecord).filter(stale).delete(synchronize_session=False)
+                # the entries' index rows under other datasets
+                session.query(ToolCacheDataset).filter(
+                    ToolCacheDataset.key_digest.in_([_key_digest(key) for key in batch])
+                ).delete(synchronize_session=False)
+            session.commit()
+        self._entry_count -= removed_count
+        self._used_bytes -= removed_bytes
+        return keys
+
+
+class TieredToolCache(ToolCache):
+    """
+    A bounded in-process LRU of whole entries (byte budget) in front of a `SqlToolCache`.
+
+    New entries are written through to the database and kept hot. Hits on hot entries are served
+    from memory; their `hit_count`/`last_access` updates are batched and written back by `start()`
+    (and before listing, removing, or cleaning up). `start()` also warms the tier from the
+    most-hit database rows.
+    """
+
+    def __init__(
+            self,
+            backend: SqlToolCache,
+            max_bytes: int,
+            warm_entries: int = 50,
+            write_back_seconds: float = 30
+    ):
+        self._backend = backend
+        self._max_bytes = max_bytes
+        self._warm_entries = warm_entries
+        self._write_back_seconds = write_back_seconds
+        self._hot: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._used_bytes = 0
+        self._pending_hits: dict[str, tuple[int, datetime]] = {}
+        self.lookup_stats = backend.lookup_stats
+
+    @property
+    def used_bytes(self) -> int:
+        return self._used_bytes
+
+    def _drop(self, key: str):
+        self._hot.pop(key, None)
+        self._used_bytes -= self._sizes.pop(key, 0)
+
+    def _admit(self, key: str, entry: CacheEntry):
+        self._drop(key)
+        size = _entry_size(entry)
+        if size > self._max_bytes:
+            return
+        self._hot[key] = entry
+        self._sizes[key] = size
+        self._used_bytes += size
+        while self._used_bytes > self._max_bytes:
+            self._drop(next(iter(self._hot)))
+
+    def get_key(self, cache_key: CacheKey) -> str:
+        return self._backend.get_key(cache_key)
+
+    def get_or_none(self, key: str) -> CacheEntry | None:
+        entry = self._hot.get(key)
+        if entry is None:
+            entry = self._backend.load_entry(key)
+            if entry is None:
+                return None
+            self.lookup_stats.record("hot", False)
+            self._admit(key, entry)
+        else:
+            self.lookup_stats.record("hot", True)
+            self._hot.move_to_end(key)
+
+        now = datetime.now(timezone.utc)
+        entry.hit_count += 1
+        entry.last_access = now
+        entry.expires_at = _expiry_after_hit(entry.hit_count, now)
+        count, _ = self._pending_hits.get(key, (0, now))
+        self._pending_hits[key] = (count + 1, now)
+        return entry
+
+    def load_entry(self, key: str) -> CacheEntry | None:
+        """The entry, from memory if hot, without counting a hit or admitting it to the hot tier"""
+        entry = self._hot.get(key)
+        return entry if entry is not None else self._backend.load_entry(key)
+
+    def write_entry(self, key: str, builder: CacheEntryBuilder) -> list[str]:
+        evicted = self._backend.write_entry(key, builder)
+        # rows the backend evicted to stay within its budget must not be served (or written back) from memory
+        for evicted_key in evicted:
+            self._pending_hits.pop(evicted_key, None)
+            self._drop(evicted_key)
+        now = datetime.now(timezone.utc)
+        entry = builder.build(now)
+        if (existing := self._hot.get(key)) is not None:
+            entry.hit_count = existing.hit_count
+            entry.created_at = existing.created_at
+            entry.expires_at = _expiry_after_rewrite(existing.expires_at, now)
+        self._admit(key, entry)
+        return evicted
+
+    def set_cost(self, key: str, cost_seconds: float):
+        self._backend.set_cost(key, cost_seconds)
+        if key in self._hot:
+            self._hot[key].cost_seconds = cost_seconds
+
+    def flush(self):
+        """Writes batched hit counts back to the database"""
+        pending, self._pending_hits = self._pending_hits, {}
+        if pending:
+            self._backend.record_hits(pending)
+
+    def warm(self):
+        keys = self._backend.top_keys(self._warm_entries)
+        # admit the hottest last so it is the most recently used
+        for key in reversed(keys):
+            if (entry := self._backend.load_entry(key)) is not None:
+                self._admit(key, entry)
+        duck_logger.info(f"Warmed hot cache tier with {len(self._hot)} entries ({self.used_bytes} bytes)")
+
+    async def start(self):
+        await asyncio.to_thread(self.warm)
+        while True:
+            await asyncio.sleep(self._write_back_seconds)
+            pending, self._pending_hits = self._pending_hits, {}
+            if not pending:
+                continue
+            try:
+                await asyncio.to_thread(self._backend.record_hits, pending)
+            except Exception:
+                duck_logger.exception("Failed to write back cache hit counts")
+                for key, (count, last_access) in pending.items():
+                    newer, latest = self._pending_hits.get(key, (0, last_access))
+                    self._pending_hits[key] = (count + newer, max(last_access, latest))
+
+    def cleanup(self):
+        self.flush()
+        self._backend.cleanup()
+        now = datetime.now(timezone.utc)
+        expired = [
+            key for key, entry in self._hot.items()
+            # SQLite hands back naive UTC datetimes
+            if entry.expires_at.replace(tzinfo=entry.expires_at.tzinfo or timezone.utc) < now
+        ]
+        for key in expired:
+            self._drop(key)
+
+    def list_entries(self, offset: int = 0, limit: int | None = None) -> list[dict[str, Any]]:
+        self.flush()
+        return self._backend.list_entries(offset, limit)
+
+    def count_entries(self) -> int:
+        return self._backend.count_entries()
+
+    def remove_entry(self, key: str) -> bool:
+        self._pending_hits.pop(key, None)
+        self._drop(key)
+        return self._backend.remove_entry(key)
+
+    def clear_entries(self) -> int:
+        self._pending_hits.clear()
+        self._hot.clear()
+        self._sizes.clear()
+        self._used_bytes = 0
+        return self._backend.clear_entries()
+
+    def invalidate_datasets(self, versions: dict[str, str]) -> list[str]:
+        keys = self._backend.invalidate_datasets(versions)
+        for key in keys:
+            self._pending_hits.pop(key, None)
+            self._drop(key)
+        return keys
+
+
+DEFAULT_KEY_MEMO_SIZE = 1024
+
 
 class SemanticCacheKeyBuilder:
+    """
+    Builds cache keys by asking a model to describe the analysis the code performs.
+
+    Keys are memoised in a bounded LRU keyed on a hash of (user_intent, code), so retries
+    and repeated identical requests skip the model call.
+    """
+
     def __init__(
             self,
-            client: OpenAI,
+            client: AsyncOpenAI,
             prompt: str,
             model: str = "gpt-5-mini",
-            reasoning_effort: str = "minimal"
+            reasoning_effort: str = "minimal",
+            memo_size: int = DEFAULT_KEY_MEMO_SIZE
     ):
         self._client = client
         self._prompt = prompt
         self._model = model
         self._reasoning_effort = reasoning_effort
+        self._memo_size = memo_size
+        self._memo: OrderedDict[str, CacheKey] = OrderedDict()
+
+    @staticmethod
+    def _memo_key(user_intent: str, code: str) -> str:
+        return hashlib.sha256(json.dumps([user_intent, code]).encode()).hexdigest()
+
+    def _remember(self, memo_key: str, cache_key: CacheKey):
+        if self._memo_size <= 0:
+            return
+        self._memo[memo_key] = cache_key
+        self._memo.move_to_end(memo_key)
+        while len(self._memo) > self._memo_size:
+            self._memo.popitem(last=False)
 
     @staticmethod
     def _extract_text(response: Any) -> str:
@@ -414,7 +1124,12 @@ class SemanticCacheKeyBuilder:
 
         raise ValueError("No text content returned when building semantic cache key")
 
-    def build_cache_key(self, user_intent: str, code: str) -> CacheKey:
+    async def build_cache_key(self, user_intent: str, code: str) -> CacheKey:
+        memo_key = self._memo_key(user_intent, code)
+        if (cached := self._memo.get(memo_key)) is not None:
+            self._memo.move_to_end(memo_key)
+            return cached.model_copy(deep=True)
+
         user_prompt = dedent(
             f"""
             USER INTENT:
@@ -426,7 +1141,7 @@ class SemanticCacheKeyBuilder:
         )
 
         try:
-            response = self._client.responses.create(
+            response = await self._client.responses.create(
                 model=self._model,
                 input=[
                     {"role": "system", "content": self._prompt},
@@ -445,7 +1160,10 @@ class SemanticCacheKeyBuilder:
                 for k, v in data.get("parameters", {}).items()
             }
 
-            return CacheKey.model_validate(data)
+            cache_key = CacheKey.model_validate(data)
         except Exception:
             duck_logger.exception("Failed to build semantic cache key")
             raise
+
+        self._remember(memo_key, cache_key)
+        return cache_key.model_copy(deep=True)
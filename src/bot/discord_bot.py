@@ -145,7 +145,9 @@ class DiscordBot(discord.Client):
 
         raise NotImplementedError(f"Unsupported file type: {file}")
 
-    async def send_message(self, channel_id, message: str = None, file: FileData = None, view=None) -> int:
+    async def send_message(
+            self, channel_id, message: str = None, file: FileData | list[FileData] = None, view=None
+    ) -> int:
         channel = self.get_channel(channel_id)
         # try catch it and fetch the channel if it is not found
         if channel is None:
@@ -155,20 +157,18 @@ class DiscordBot(discord.Client):
                 duck_logger.exception(f'Tried to send message on {channel_id}, but no channel found.')
                 raise
 
-        if message:
-            for block in _parse_blocks(message):
-                curr_message = await channel.send(block)
-            # noinspection PyUnboundLocalVariable
-            return curr_message.id
-
+        file_to_send = None
         if file is not None:
-            files_to_send = []
-            if not isinstance(file, list):
-                files_to_send.append(file)
-            else:
-                files_to_send = file
-
+            files_to_send = file if isinstance(file, list) else [file]
             file_to_send = [self._make_discord_file(file) for file in files_to_send]
+
+        if message and (blocks := list(_parse_blocks(message))):
+            for block in blocks[:-1]:
+                await channel.send(block)
+            # attachments go with the last block, so text and files cost one call when they fit
+            return (await channel.send(blocks[-1], files=file_to_send)).id
+
+        if file_to_send is not None:
             curr_message = await channel.send(files=file_to_send)
             return curr_message.id
 
@@ -185,6 +185,14 @@ class DiscordBot(discord.Client):
         except Exception:
             duck_logger.exception(f"Could not edit message {message_id} in channel {channel_id}")
 
+    async def delete_message(self, channel_id: int, message_id: int):
+        channel = self.get_channel(channel_id)
+        try:
+            msg = await channel.fetch_message(message_id)
+            await msg.delete()
+        except Exception:
+            duck_logger.exception(f"Could not delete message {message_id} in channel {channel_id}")
+
     async def add_reaction(self, channel_id: int, message_id: int, reaction: str):
         message = await (await self.fetch_channel(channel_id)).fetch_message(message_id)
         await message.add_reaction(reaction)
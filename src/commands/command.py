@@ -11,8 +11,12 @@ import pytz
 from quest import step
 from quest.manager import find_workflow_manager
 
+from ..armory.cache_prewarm import CachePrewarmer, PrewarmReport, load_prewarm_items, mine_prewarm_items
+from ..utils.config_types import PrewarmSettings
 from ..utils.logger import duck_logger
 from ..utils.protocols import Message, ToolCache
+from ..utils.output_reaper import DISK_USAGE_WARNING_RATIO
+from ..utils.python_exec_container import ContainerPool
 from ..utils.zip_utils import zip_data_file
 
 
@@ -72,21 +76,58 @@ class FeedbackMetricsCommand(Command):
         await self.send_message(channel_id, "", file=discord_feedback_file)
 
 
+class ExecutionsMetricsCommand(Command):
+    name = "!executions"
+    help_msg = "get a zip of the code execution resource usage data"
+
+    def __init__(self, send_message, metrics_handler):
+        self.send_message = send_message
+        self.metrics_handler = metrics_handler
+
+    @step
+    async def execute(self, message: Message):
+        channel_id = message['channel_id']
+        executions_zip = zip_data_file(self.metrics_handler.get_executions())
+        discord_executions_file = discord.File(executions_zip, filename="executions.zip")
+        await self.send_message(channel_id, "", file=discord_executions_file)
+
+
+class LatencyMetricsCommand(Command):
+    name = "!latency"
+    help_msg = "get a zip of the response latency data (time to first token)"
+
+    def __init__(self, send_message, metrics_handler):
+        self.send_message = send_message
+        self.metrics_handler = metrics_handler
+
+    @step
+    async def execute(self, message: Message):
+        channel_id = message['channel_id']
+        latency_zip = zip_data_file(self.metrics_handler.get_latency())
+        discord_latency_file = discord.File(latency_zip, filename="latency.zip")
+        await self.send_message(channel_id, "", file=discord_latency_file)
+
+
 class MetricsCommand(Command):
     name = "!metrics"
     help_msg = "get the zips of the data tables"
 
     def __init__(self, messages_metrics: MessagesMetricsCommand, usage_metrics: UsageMetricsCommand,
-                 feedback_metrics: FeedbackMetricsCommand):
+                 feedback_metrics: FeedbackMetricsCommand, executions_metrics: ExecutionsMetricsCommand,
+                 latency_metrics: LatencyMetricsCommand):
         self.messages_metrics = messages_metrics
         self.usage_metrics = usage_metrics
         self.feedback_metrics = feedback_metrics
+        self.executions_metrics = executions_metrics
+        self.latency_metrics = latency_metrics
 
     @step
     async def execute(self, message: Message):
         await self.messages_metrics.execute(message)
         await self.usage_metrics.execute(message)
         await self.feedback_metrics.execute(message)
+        await self.executions_metrics.execute(message)
+        await self.latency_metrics.execute(message)
 
 
 class StatusCommand(Command):
@@ -282,8 +323,10 @@ class CacheCommand(Command):
     name = "!cache"
     help_msg = (
         "show current tool cache entries; "
-        "use `!cache cleanup`, `!cache remove <cache_tool> <entry_index>`, or `!cache clear`"
+        "use `!cache page <n>`, `!cache cleanup`, `!cache remove <cache_tool> <entry_index>`, or `!cache clear`"
     )
+    # entries per cache in each CSV report page
+    page_size = 500
 
     def __init__(self, send_message, tool_caches: list[ToolCache]):
         self.send_message = send_message
@@ -334,6 +377,19 @@ class CacheCommand(Command):
             return "null"
         return str(value)
 
+    @staticmethod
+    def _format_tier_hit_rate(tier: str, counts: dict[str, int]) -> str:
+        lookups = counts["hits"] + counts["misses"]
+        if tier == "coalesced":
+            return f"Duplicate runs avoided: {counts['hits']} of {lookups} waits on an in-flight run"
+        if tier == "speculative":
+            return (
+                f"Speculative runs used: {counts['hits']} of {lookups + counts.get('failed', 0)} "
+                f"({counts.get('failed', 0)} failed, the rest were cancelled on a cache hit)"
+            )
+        rate = counts["hits"] / lookups if lookups else 0
+        return f"{tier.capitalize()} tier: {counts['hits']}/{lookups} hits ({rate:.0%})"
+
     @step
     async def execute(self, message: Message):
         channel_id = message['channel_id']
@@ -346,9 +402,9 @@ class CacheCommand(Command):
         if len(cmd_parts) > 1 and cmd_parts[1].lower() == "cleanup":
             removed_entries = 0
             for cache in self.tool_caches:
-                before_count = len(cache.list_entries())
+                before_count = cache.count_entries()
                 cache.cleanup()
-                after_count = len(cache.list_entries())
+                after_count = cache.count_entries()
                 removed_entries += max(before_count - after_count, 0)
 
             await self.send_message(
@@ -406,16 +462,17 @@ class CacheCommand(Command):
                 return
 
             cache = matched_cache
-            entries = cache.list_entries()
-            if entry_index > len(entries):
+            entries = cache.list_entries(entry_index - 1, 1)
+            if not entries:
+                entry_count = cache.count_entries()
                 await self.send_message(
                     channel_id,
-                    f"Invalid entry index `{entry_index}`. Cache `{matched_cache_tool}` has {len(entries)} entr"
-                    f"{'y' if len(entries) == 1 else 'ies'}.",
+                    f"Invalid entry index `{entry_index}`. Cache `{matched_cache_tool}` has {entry_count} entr"
+                    f"{'y' if entry_count == 1 else 'ies'}.",
                 )
                 return
 
-            target_key = entries[entry_index - 1]["key"]
+            target_key = entries[0]["key"]
             removed = cache.remove_entry(target_key)
             if not removed:
                 await self.send_message(
@@ -450,21 +507,29 @@ class CacheCommand(Command):
             )
             return
 
-        found_entries = False
+        page = 1
+        if len(cmd_parts) > 1 and cmd_parts[1].lower() == "page":
+            if len(cmd_parts) != 3 or not cmd_parts[2].isdigit() or int(cmd_parts[2]) < 1:
+                await self.send_message(channel_id, "Usage: `!cache page <n>` (pages start at 1)")
+                return
+            page = int(cmd_parts[2])
+        offset = (page - 1) * self.page_size
+
         total_entries = 0
         all_rows: list[dict] = []
 
-        cache_reports: list[tuple[str, str, list[dict]]] = []
+        cache_reports: list[tuple[str, str, int, dict[str, dict[str, int]]]] = []
         for index, cache in enumerate(self.tool_caches, start=1):
             backend = type(cache).__name__
             cache_tool = self._cache_tool(index, cache)
-            entries = cache.list_entries()
-            total_entries += len(entries)
-            if not entries:
+            entry_count = cache.count_entries()
+            total_entries += entry_count
+            if not entry_count:
                 continue
 
-            found_entries = True
-            cache_reports.append((backend, cache_tool, entries))
+            lookup_stats = getattr(cache, "lookup_stats", None)
+            cache_reports.append((backend, cache_tool, entry_count, lookup_stats.snapshot() if lookup_stats else {}))
+            entries = cache.list_entries(offset, self.page_size)
             all_rows.extend(
                 [
                     {
@@ -473,25 +538,32 @@ class CacheCommand(Command):
                         "entry_index": entry_index,
                         **entry,
                     }
-                    for entry_index, entry in enumerate(entries, start=1)
+                    for entry_index, entry in enumerate(entries, start=offset + 1)
                 ]
             )
 
-        if not found_entries:
+        if not total_entries:
             await self.send_message(channel_id, "No cache entries found.")
             return
 
+        page_count = -(-max(entry_count for _, _, entry_count, _ in cache_reports) // self.page_size)
+        if page > page_count:
+            await self.send_message(channel_id, f"There {'is' if page_count == 1 else 'are'} only {page_count} page(s).")
+            return
+
         await self.send_message(
             channel_id,
             f"Found {total_entries} entr{'y' if total_entries == 1 else 'ies'} "
             f"across {len(self.tool_caches)} cache(s).",
         )
 
-        for backend, cache_tool, entries in cache_reports:
+        for backend, cache_tool, entry_count, lookup_stats in cache_reports:
             summary_message = (
                 f"## Cache: `{backend}#{cache_tool}`\n"
-                f"Total entries: {len(entries)}\n"
+                f"Total entries: {entry_count}\n"
             )
+            for tier, counts in lookup_stats.items():
+                summary_message += f"{self._format_tier_hit_rate(tier, counts)}\n"
             await self.send_message(channel_id, summary_message)
 
         csv_df = pd.DataFrame(all_rows)
@@ -503,11 +575,157 @@ class CacheCommand(Command):
             "filename": f"cache_report_{datetime.now().strftime('%Y_%m_%d_%H_%M_%S')}.csv",
             "bytes": csv_bytes,
         }
-        await self.send_message(channel_id, "### Full cache report (CSV):")
+        if page_count > 1:
+            more = f" Run `!cache page {page + 1}` for the next page." if page < page_count else ""
+            await self.send_message(
+                channel_id,
+                f"### Cache report, page {page} of {page_count} (CSV):{more}"
+            )
+        else:
+            await self.send_message(channel_id, "### Full cache report (CSV):")
         await self.send_message(channel_id, file=csv_file_data)
 
 
-def create_commands(send_message, metrics_handler, reporter, log_dir, tool_caches: list[ToolCache]) -> list[Command]:
+def _format_wait_histogram(histogram: list[tuple[float | None, int]]) -> str:
+    buckets = []
+    last_bound = 0
+    for bound, count in histogram:
+        if bound is None:
+            buckets.append(f">{last_bound:g}s: {count}")
+        else:
+            buckets.append(f"≤{bound:g}s: {count}")
+            last_bound = bound
+    return ", ".join(buckets)
+
+
+class ContainersCommand(Command):
+    name = "!containers"
+    help_msg = "show sandbox container pool load and utilisation"
+
+    def __init__(self, send_message, containers: dict[str, ContainerPool]):
+        self.send_message = send_message
+        self.containers = containers
+
+    @step
+    async def execute(self, message: Message):
+        channel_id = message['channel_id']
+
+        if not self.containers:
+            await self.send_message(channel_id, "No containers are configured.")
+            return
+
+        lines = []
+        for name in sorted(self.containers):
+            stats = self.containers[name].stats()
+            lines.append(
+                f"{name}: {stats['size']} member(s), "
+                f"{stats['in_flight']} running, queue depth {stats['queue_depth']}"
+            )
+            for member in stats['members']:
+                lines.append(
+                    f"  {member['name']}: {member['in_flight']} running, "
+                    f"{member['completed']} completed, {member['utilisation']:.0%} busy"
+                )
+                if usage := member['disk_usage']:
+                    line = f"    outputs: {usage['used_bytes'] / 1_000_000:.1f} MB in {usage['run_dirs']} dir(s)"
+                    if usage['quota_bytes']:
+                        ratio = usage['used_bytes'] / usage['quota_bytes']
+                        line += f", {ratio:.0%} of quota"
+                        if ratio >= DISK_USAGE_WARNING_RATIO:
+                            line += " ⚠️"
+                    lines.append(line)
+            if admission := stats['admission']:
+                lines.append(
+                    f"  admission: {admission['running']}/{admission['limit']} running, "
+                    f"{admission['waiting']} waiting, {admission['admitted']} admitted, "
+                    f"mean wait {admission['mean_wait_seconds']:.2f}s"
+                )
+                lines.append(f"    wait: {_format_wait_histogram(admission['wait_histogram'])}")
+
+        msg = "\n".join(lines)
+        await self.send_message(channel_id, f"```\n{msg}\n```")
+
+
+def _format_prewarm_report(tool_name: str, report: PrewarmReport) -> str:
+    lines = [
+        f"## Prewarm of `{tool_name}` finished",
+        f"Requests: {report['items']} ({report['resumed']} finished by an earlier run)",
+        f"New entries: {report['created']}, already cached: {report['already_cached']}, "
+        f"failed runs: {report['failed']}",
+        f"Cache keys written: {report['entries_created']} ({report['bytes_stored'] / 1_000_000:.1f} MB stored)",
+    ]
+    if report["errors"]:
+        lines.append(f"Errors: {report['errors']} (retried by the next `!prewarm`)")
+    return "\n".join(lines)
+
+
+class PrewarmCommand(Command):
+    name = "!prewarm"
+    help_msg = (
+        "replay requests through a tool cache ahead of demand; "
+        "`!prewarm <cache_tool>` uses the configured list, `!prewarm <cache_tool> mine` recurring recorded requests"
+    )
+
+    def __init__(self, send_message, prewarmers: dict[str, tuple[CachePrewarmer, PrewarmSettings]], get_tool_calls):
+        self.send_message = send_message
+        self.prewarmers = prewarmers
+        self.get_tool_calls = get_tool_calls
+
+    @step
+    async def execute(self, message: Message):
+        channel_id = message['channel_id']
+        cmd_parts = message['content'].strip().split()
+
+        if len(cmd_parts) < 2 or cmd_parts[1] not in self.prewarmers:
+            available = ", ".join(f"`{name}`" for name in self.prewarmers) or "none"
+            await self.send_message(channel_id, f"Usage: `!prewarm <cache_tool> [mine]`. Cache tools: {available}.")
+            return
+
+        tool_name = cmd_parts[1]
+        prewarmer, settings = self.prewarmers[tool_name]
+        if prewarmer.running:
+            await self.send_message(channel_id, f"A prewarm of `{tool_name}` is already running.")
+            return
+
+        if len(cmd_parts) > 2 and cmd_parts[2].lower() == "mine":
+            items = mine_prewarm_items(self.get_tool_calls(), tool_name, settings.get("min_count", 2))
+        elif "items_file" in settings:
+            items = load_prewarm_items(Path(settings["items_file"]))
+        else:
+            await self.send_message(
+                channel_id,
+                f"No `prewarm.items_file` is configured for `{tool_name}`; use `!prewarm {tool_name} mine`.",
+            )
+            return
+
+        if not items:
+            await self.send_message(channel_id, "There are no requests to prewarm.")
+            return
+
+        await self.send_message(
+            channel_id,
+            f"Prewarming `{tool_name}` with {len(items)} request(s); a report follows when it finishes.",
+        )
+        # run inside the step (each command is its own workflow): a run interrupted by a restart is resumed
+        # with the workflow, and the prewarmer skips the items its progress file records as finished
+        try:
+            report = await prewarmer.run(items)
+        except Exception as error:
+            duck_logger.exception(f"Prewarm of {tool_name} failed")
+            await self.send_message(channel_id, f"Prewarm of `{tool_name}` failed: {error}")
+            return
+        await self.send_message(channel_id, _format_prewarm_report(tool_name, report))
+
+
+def create_commands(
+        send_message,
+        metrics_handler,
+        reporter,
+        log_dir,
+        tool_caches: list[ToolCache],
+        containers: dict[str, ContainerPool],
+        prewarmers: dict[str, tuple[CachePrewarmer, PrewarmSettings]] | None = None,
+) -> list[Command]:
     # Create and return the list of commands
     def get_workflow_metrics():
         return find_workflow_manager().get_workflow_metrics()
@@ -516,10 +734,14 @@ def create_commands(send_message, metrics_handler, reporter, log_dir, tool_cache
         messages := MessagesMetricsCommand(send_message, metrics_handler),
         usage := UsageMetricsCommand(send_message, metrics_handler),
         feedback := FeedbackMetricsCommand(send_message, metrics_handler),
-        MetricsCommand(messages, usage, feedback),
+        executions := ExecutionsMetricsCommand(send_message, metrics_handler),
+        latency := LatencyMetricsCommand(send_message, metrics_handler),
+        MetricsCommand(messages, usage, feedback, executions, latency),
         StatusCommand(send_message),
         ReportCommand(send_message, reporter),
         LogCommand(send_message, log_dir),
         ActiveWorkflowsCommand(send_message, get_workflow_metrics),
         CacheCommand(send_message, tool_caches),
+        ContainersCommand(send_message, containers),
+        PrewarmCommand(send_message, prewarmers or {}, metrics_handler.get_tool_calls),
     ]
@@ -2,6 +2,7 @@ import asyncio
 import inspect
 import json
 import os
+import time
 from dataclasses import dataclass
 from typing import Protocol, Literal, Type, Optional, Callable
 
@@ -14,7 +15,7 @@ from quest import step
 
 from ..armory.armory import Armory
 from ..armory.talk_tool import ConversationComplete
-from ..utils.config_types import DuckContext, HistoryType, RetryProtocol
+from ..utils.config_types import DuckContext, HistoryType, RetryProtocol, StreamingSettings
 from ..utils.logger import duck_logger
 
 
@@ -35,10 +36,45 @@ class RecordUsage(Protocol):
                        output_tokens: int, cached_tokens: int, reasoning_tokens: int): ...
 
 
+class RecordLatency(Protocol):
+    async def __call__(self, guild_id: int, parent_channel_id: int, thread_id: int, user_id: int, engine: str,
+                       streamed: bool, first_token_seconds: float | None, total_seconds: float,
+                       message_edits: int): ...
+
+
 class SendMessage(Protocol):
     async def __call__(self, channel_id: int, message: str = None, file=None, view=None) -> int: ...
 
 
+class EditMessage(Protocol):
+    async def __call__(self, channel_id: int, message_id: int, new_content: str): ...
+
+
+class DeleteMessage(Protocol):
+    async def __call__(self, channel_id: int, message_id: int): ...
+
+
+# a streamed message is continued in a new one past this length (`send_message` splits at 1990)
+MAX_STREAMED_CHARS = 1990
+# shown at the end of a streamed message until it is complete
+STREAMING_CURSOR = " \u258c"
+DEFAULT_EDIT_INTERVAL_SECONDS = 1.0
+
+
+def _split_streamed(text: str, limit: int = MAX_STREAMED_CHARS) -> tuple[str, str]:
+    """Splits off a full message at the last line break that fits, keeping code fences balanced"""
+    # room to close a fence left open
+    limit -= len("\n```")
+    cut = text.rfind("\n", 0, limit)
+    if cut <= 0:
+        cut = limit
+    head, tail = text[:cut], text[cut:].lstrip("\n")
+    if head.count("```") % 2:
+        head += "\n```"
+        tail = "```\n" + tail
+    return head, tail
+
+
 ToolChoiceTypes = Literal["none", "auto", "required"] | ToolChoiceTypesParam | ToolChoiceFunctionParam
 
 
@@ -72,13 +108,25 @@ def format_function_call_history_items(result: str, call: Response) -> FunctionC
 class AIClient:
     def __init__(self, armory: Armory, typing, record_message, record_usage: RecordUsage,
                  retry_protocol: RetryProtocol,
-                 send_message: Optional[SendMessage] = None):
+                 send_message: Optional[SendMessage] = None,
+                 edit_message: Optional[EditMessage] = None,
+                 streaming: Optional[StreamingSettings] = None,
+                 record_latency: Optional[RecordLatency] = None,
+                 delete_message: Optional[DeleteMessage] = None):
         self._armory = armory
         self._typing = typing
         self._record_message = step(record_message)
+        # a plain metric write rather than a step, so recording tool calls leaves the step sequence of
+        # conversations recorded before it unchanged; a replay may write a call again (see `mine_prewarm_items`)
+        self._record_tool_call = record_message
         self._record_usage = step(record_usage)
         self._retry_protocol = retry_protocol
         self._send_message = step(send_message) if send_message else None
+        self._edit_message = edit_message
+        self._delete_message = delete_message
+        # conversation replies are streamed only when the reply can be posted, edited, and withdrawn
+        self._streaming = streaming if send_message and edit_message and delete_message else None
+        self._record_latency = step(record_latency) if record_latency else None
         self._client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
     @staticmethod
@@ -122,6 +170,71 @@ class AIClient:
         except Exception as error:
             duck_logger.debug(f"Failed to send retry message in thread <#{ctx.thread_id}>: {error}")
 
+    async def _withdraw_streamed(self, ctx: DuckContext, message_ids: list[int]):
+        for message_id in message_ids:
+            try:
+                await self._delete_message(ctx.thread_id, message_id)
+            except Exception as error:
+                duck_logger.debug(f"Failed to delete streamed message {message_id} in thread <#{ctx.thread_id}>: {error}")
+
+    async def _stream_response(self, ctx: DuckContext, params: dict) -> tuple[Response, float | None, int]:
+        """
+        Consumes the Responses event stream, posting the reply text once the first token arrives and
+        editing it in place at most every `edit_interval_seconds`. Returns the completed response,
+        the seconds until the first text token (None if there was no text), and the number of edits.
+        If the stream fails, the partial reply is deleted, so a retry does not follow a truncated copy.
+        """
+        interval = self._streaming.get("edit_interval_seconds", DEFAULT_EDIT_INTERVAL_SECONDS)
+        started = time.monotonic()
+        first_token_seconds = None
+        text = ""
+        message_id = None
+        last_edit = 0.0
+        edits = 0
+        response = None
+        posted: list[int] = []
+
+        async def show(content: str):
+            nonlocal message_id, last_edit, edits
+            if message_id is None:
+                message_id = await self._send_message(ctx.thread_id, content)
+                posted.append(message_id)
+            else:
+                await self._edit_message(ctx.thread_id, message_id, content)
+                edits += 1
+            last_edit = time.monotonic()
+
+        try:
+            async with self._typing(ctx.thread_id):
+                stream = await self._client.responses.create(**params, stream=True)
+                async for event in stream:
+                    if event.type == "response.output_text.delta":
+                        if first_token_seconds is None:
+                            first_token_seconds = time.monotonic() - started
+                        text += event.delta
+                        while len(text) + len(STREAMING_CURSOR) > MAX_STREAMED_CHARS:
+                            head, text = _split_streamed(text, MAX_STREAMED_CHARS - len(STREAMING_CURSOR))
+                            await show(head)
+                            message_id = None
+                        if text.strip() and (message_id is None or time.monotonic() - last_edit >= interval):
+                            await show(text + STREAMING_CURSOR)
+                    elif event.type in ("response.completed", "response.incomplete"):
+                        response = event.response
+                    elif event.type == "response.failed":
+                        raise RuntimeError(f"Streamed response failed: {event.response.error}")
+                    elif event.type == "error":
+                        raise RuntimeError(f"Streamed response failed: {event.message}")
+            if response is None:
+                raise RuntimeError("Response stream ended without a response")
+            # the complete text replaces the last throttled edit
+            if message_id is not None:
+                await show(text)
+        except Exception:
+            await self._withdraw_streamed(ctx, posted)
+            raise
+
+        return response, first_token_seconds, edits
+
     @step
     async def _get_completion(
             self,
@@ -133,7 +246,8 @@ class AIClient:
             tools: list[FunctionToolParam],
             tool_settings: ToolChoiceTypes,
             output_format: Type[BaseModel] | None,
-            reasoning: str | None = None
+            reasoning: str | None = None,
+            stream: bool = False
     ) -> list[Response]:
         params = dict(
             model=model,
@@ -152,8 +266,17 @@ class AIClient:
         max_retries = max(0, int(self._retry_protocol.get("max_retries", 0)))
         for attempt in range(max_retries + 1):
             try:
-                async with self._typing(ctx.thread_id):
-                    response = await self._client.responses.create(**params)
+                started = time.monotonic()
+                if stream:
+                    response, first_token_seconds, edits = await self._stream_response(ctx, params)
+                else:
+                    async with self._typing(ctx.thread_id):
+                        response = await self._client.responses.create(**params)
+                    # without streaming, text reaches the student with the whole response
+                    has_text = any(item.type == "message" for item in response.output)
+                    first_token_seconds = time.monotonic() - started if has_text else None
+                    edits = 0
+                total_seconds = time.monotonic() - started
                 break
             except Exception as error:
                 should_retry = (
@@ -173,6 +296,10 @@ class AIClient:
                                      usage.input_tokens_details.cached_tokens,
                                      usage.output_tokens_details.reasoning_tokens)
 
+        if self._record_latency:
+            await self._record_latency(ctx.guild_id, ctx.parent_channel_id, ctx.thread_id, ctx.author_id, model,
+                                       stream, first_token_seconds, total_seconds, edits)
+
         return [
             resp.model_dump(exclude_none=True)
             for resp in response.output
@@ -225,7 +352,10 @@ class AIClient:
                                        json.dumps(user_message))
 
             history.append(EasyInputMessage(role='user', content=user_message, type='message').model_dump())
-            agent_response, agent_history, conversation_complete = await self._run_agent(ctx, agent, history)
+            # replies are streamed straight to the thread, so a streamed reply comes back as None
+            agent_response, agent_history, conversation_complete = await self._run_agent(
+                ctx, agent, history, self._streaming is not None
+            )
 
             if agent_response:
                 await send_user_message(ctx, agent_response)
@@ -239,16 +369,18 @@ class AIClient:
 
     @step
     async def _run_agent(self,
-                         ctx: DuckContext, agent: Agent, context: list[HistoryType]
+                         ctx: DuckContext, agent: Agent, context: list[HistoryType], stream: bool = False
                          ) -> tuple[str | None, list[HistoryType], bool]:
         tools_json = [self._armory.get_tool_schema(tool_name) for tool_name in agent.tools]
         history: list[HistoryType] = []
+        # structured output is parsed, not shown, so it is never streamed
+        stream = stream and agent.output_format is None
         try:
             while True:
                 outputs = await self._get_completion(
                     ctx, agent.prompt, history, context,
                     agent.model, tools_json, agent.tool_settings,
-                    agent.output_format, agent.reasoning
+                    agent.output_format, agent.reasoning, stream
                 )
 
                 history += outputs
@@ -265,6 +397,11 @@ class AIClient:
                     if output['type'] == "function_call":
                         tool_name = output["name"]
                         tool_args = json.loads(output["arguments"])
+                        # recorded so recurring tool requests can be mined, e.g. to prewarm caches
+                        await self._record_tool_call(
+                            ctx.guild_id, ctx.thread_id, ctx.author_id, "function_call",
+                            json.dumps({"call_id": output["call_id"], "name": tool_name, "arguments": tool_args})
+                        )
 
                         tool = self._armory.get_specific_tool(tool_name)
 
@@ -286,6 +423,9 @@ class AIClient:
                             return None, history, True
 
                     elif output['type'] == "message":
+                        if stream:
+                            # already posted to the thread as it was generated
+                            return None, history, False
                         message = output['content'][0]['text']  # TODO - should we be more intelligent here?
                         return message, history, False
 
@@ -5,16 +5,22 @@ import os
 from pathlib import Path
 from typing import Iterable
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from quest import these
 from quest.extras.sql import SqlBlobStorage
 from quest.utils import quest_logger
 
-from .utils.protocols import ToolCache, CacheKeyBuilder
-from .armory.tool_cache import InMemoryToolCache, SemanticCacheKeyBuilder, SqlToolCache
+from .utils.protocols import ToolCache, CacheKeyBuilder, RecordExecution
+from .armory.cache_eviction import build_eviction_policy
+from .armory.cache_prewarm import CachePrewarmer
+from .armory.output_bundler import SendTally
+from .armory.similarity_index import SimilarityIndex, DEFAULT_DIMENSIONS, DEFAULT_MAX_ENTRIES, DEFAULT_THRESHOLD, \
+    DEFAULT_TOP_K
+from .armory.tool_cache import InMemoryToolCache, SemanticCacheKeyBuilder, SqlToolCache, TieredToolCache, \
+    DEFAULT_KEY_MEMO_SIZE
 from .workflows.registration import Registration
 from .workflows.assignment_feedback_workflow import AssignmentFeedbackWorkflow
-from .utils.python_exec_container import build_containers, PythonExecContainer
+from .utils.python_exec_container import build_containers, ContainerPool
 from .armory.python_tools import PythonTools, DatasetTools
 from .armory.armory import Armory
 from .armory.talk_tool import TalkTool
@@ -35,8 +41,9 @@ from .storage.sql_metrics import SQLMetricsHandler
 from .storage.sql_quest import create_sql_manager
 from .utils.config_loader import load_configuration
 from .utils.config_types import CacheCleanupSettings, CacheSettings, Config, RegistrationSettings, DUCK_NAME, \
-    DuckConfig, ToolConfig
+    DuckConfig, PrewarmSettings, ToolConfig
 from .utils.cache_cleaner import CacheCleaner
+from .utils.output_reaper import OutputReaper
 from .utils.feedback_notifier import FeedbackNotifier
 from .utils.logger import duck_logger, filter_logs, add_console_handler
 from .utils.persistent_queue import PersistentQueue
@@ -52,10 +59,14 @@ def setup_workflow_manager(
         send_message,
         log_dir: Path,
         tool_caches: list[ToolCache],
+        containers: dict[str, ContainerPool],
+        prewarmers: dict[str, tuple[CachePrewarmer, PrewarmSettings]],
 ):
     reporter = Reporter(metrics_handler, config['servers'], config['reporter_settings'], True)
 
-    commands = create_commands(send_message, metrics_handler, reporter, log_dir, tool_caches)
+    commands = create_commands(
+        send_message, metrics_handler, reporter, log_dir, tool_caches, containers, prewarmers
+    )
     commands_workflow = BotCommands(commands, send_message)
 
     workflows = {
@@ -261,21 +272,47 @@ def _build_cache_key_builder(cache_settings: CacheSettings, tool_name: str) -> C
         )
 
     return SemanticCacheKeyBuilder(
-        client=OpenAI(),
+        client=AsyncOpenAI(),
         prompt=Path(prompt).read_text(),
         model=cache_settings.get("engine", "gpt-5-nano"),
         reasoning_effort=cache_settings.get("reasoning", "minimal"),
+        memo_size=cache_settings.get("key_memo_size", DEFAULT_KEY_MEMO_SIZE),
+    )
+
+
+def _build_similarity_index(cache_settings: CacheSettings) -> SimilarityIndex | None:
+    similarity = cache_settings.get("similarity")
+    if similarity is None:
+        return None
+    return SimilarityIndex(
+        dimensions=similarity.get("dimensions", DEFAULT_DIMENSIONS),
+        threshold=similarity.get("threshold", DEFAULT_THRESHOLD),
+        top_k=similarity.get("top_k", DEFAULT_TOP_K),
+        max_entries=similarity.get("max_entries", DEFAULT_MAX_ENTRIES),
     )
 
 
 def _build_tool_cache(cache_settings: CacheSettings, sql_session) -> ToolCache:
     backend = cache_settings.get("backend", "memory")
+    eviction = cache_settings.get("eviction", {})
+    policy = build_eviction_policy(eviction.get("policy", "lru"))
+    max_bytes = eviction.get("max_bytes")
+    max_entries = eviction.get("max_entries")
 
     if backend == "memory":
-        return InMemoryToolCache()
+        return InMemoryToolCache(policy=policy, max_bytes=max_bytes, max_entries=max_entries)
 
     if backend == "database":
-        return SqlToolCache(sql_session)
+        sql_cache = SqlToolCache(sql_session, policy, max_bytes, max_entries)
+        hot_tier_bytes = cache_settings.get("hot_tier_bytes")
+        if not hot_tier_bytes:
+            return sql_cache
+        return TieredToolCache(
+            sql_cache,
+            hot_tier_bytes,
+            cache_settings.get("hot_tier_warm_entries", 50),
+            cache_settings.get("hot_tier_write_back_seconds", 30),
+        )
 
     raise NotImplementedError(f"Unsupported cache backend: {backend}")
 
@@ -289,12 +326,15 @@ def _get_tool_cache_settings(tool_config: ToolConfig) -> CacheSettings | None:
 def build_armory(
         config: Config,
         send_message,
-        containers: dict[str, PythonExecContainer],
-        sql_session
-) -> tuple[Armory, TalkTool, list[ToolCache]]:
+        containers: dict[str, ContainerPool],
+        sql_session,
+        record_execution: RecordExecution | None = None
+) -> tuple[Armory, TalkTool, list[ToolCache], dict[str, tuple[CachePrewarmer, PrewarmSettings]]]:
     armory = Armory(send_message)
     tool_caches: list[ToolCache] = []
+    prewarmers: dict[str, tuple[CachePrewarmer, PrewarmSettings]] = {}
     container_names_for_python_tools: set[str] = set()
+    send_tally = SendTally()
 
     # setup tools
     config_tools = config.get("tools", [])
@@ -305,17 +345,37 @@ def build_armory(
             cache_settings = _get_tool_cache_settings(tool_config)
             tool_cache = None
             cache_key_builder = None
+            similarity_index = None
             if cache_settings is not None:
                 tool_cache = _build_tool_cache(cache_settings, sql_session)
                 setattr(tool_cache, "_cache_source", tool_name)
                 tool_caches.append(tool_cache)
                 cache_key_builder = _build_cache_key_builder(cache_settings, tool_name)
+                similarity_index = _build_similarity_index(cache_settings)
+                prewarm_settings = cache_settings.get("prewarm", {})
+                prewarmers[tool_name] = (
+                    CachePrewarmer(
+                        containers[container_name],
+                        tool_cache,
+                        cache_key_builder,
+                        Path(prewarm_settings.get("progress_file", f"prewarm-{tool_name}.progress.jsonl")),
+                        similarity_index,
+                        prewarm_settings.get("max_concurrency", 2),
+                    ),
+                    prewarm_settings,
+                )
             python_tools = PythonTools(
                 containers[container_name],
                 send_message,
                 tool_cache,
-                cache_key_builder
+                cache_key_builder,
+                record_execution,
+                similarity_index,
+                bool(cache_settings and cache_settings.get("speculative_execution", False)),
+                send_tally,
             )
+            # datasets are staged on startup, so entries built from data that has since changed go now
+            python_tools.invalidate_stale_entries()
             amended_description = tool_config.get('description', python_tools.run_code.__doc__)
             armory.add_tool(python_tools.run_code, name=tool_name, description=amended_description)
         else:
@@ -343,7 +403,7 @@ def build_armory(
     talk_tool = TalkTool(send_message)
     armory.scrub_tools(talk_tool)
 
-    return armory, talk_tool, tool_caches
+    return armory, talk_tool, tool_caches, prewarmers
 
 
 def _setup_cache_cleaner(
@@ -370,6 +430,13 @@ def _setup_cache_cleaner(
     return cc
 
 
+def _setup_output_reaper(config: Config, containers: dict[str, ContainerPool]) -> OutputReaper:
+    interval_seconds = {
+        name: container_config['settings'].get('reap_interval_seconds', 300)
+        for name, container_config in config.get('containers', {}).items()
+    }
+    return OutputReaper(containers, interval_seconds)
+
 
 def add_agent_tools_to_armory(config: Config, armory: Armory, ai_client: AIClient):
     for name, settings in config.get("agents_as_tools", {}).items():
@@ -404,11 +471,12 @@ async def _main(config: Config, log_dir: Path):
             metrics_handler = SQLMetricsHandler(sql_session)
 
             with these(build_containers(config)) as containers:
-                armory, talk_tool, tool_caches = build_armory(
+                armory, talk_tool, tool_caches, prewarmers = build_armory(
                     config,
                     bot.send_message,
                     containers,
                     sql_session,
+                    metrics_handler.record_execution,
                 )
                 ai_client = AIClient(
                     armory,
@@ -416,7 +484,11 @@ async def _main(config: Config, log_dir: Path):
                     metrics_handler.record_message,
                     metrics_handler.record_usage,
                     config["ai_completion_retry_protocol"],
-                    bot.send_message
+                    bot.send_message,
+                    bot.edit_message,
+                    config.get("ai_streaming"),
+                    metrics_handler.record_latency,
+                    bot.delete_message,
                 )
                 add_agent_tools_to_armory(config, armory, ai_client)
 
@@ -444,6 +516,8 @@ async def _main(config: Config, log_dir: Path):
                         bot.send_message,
                         log_dir,
                         tool_caches,
+                        containers,
+                        prewarmers,
                 ) as workflow_manager:
                     tasks = []
 
@@ -468,6 +542,15 @@ async def _main(config: Config, log_dir: Path):
                             config.get("cache_cleanup_settings", {})
                         )
                         tasks.append(cleaner.start())
+                        # hot cache tiers warm up and then write back hit counts
+                        tasks.extend(
+                            tool_cache.start()
+                            for tool_cache in {id(cache): cache for cache in tool_caches}.values()
+                            if isinstance(tool_cache, TieredToolCache)
+                        )
+
+                    if containers:
+                        tasks.append(_setup_output_reaper(config, containers).start())
 
                     await asyncio.gather(*tasks)
 
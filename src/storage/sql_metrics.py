@@ -1,7 +1,8 @@
+import json
 from datetime import datetime
 from zoneinfo import ZoneInfo
 
-from sqlalchemy import Column, Integer, String, BigInteger, JSON
+from sqlalchemy import Column, Integer, String, BigInteger, JSON, Float, Boolean
 from sqlalchemy.orm import declarative_base, Session
 
 from ..utils.logger import duck_logger
@@ -52,6 +53,43 @@ class UsageModel(MetricsBase):
     reasoning_tokens = Column(String(255))
 
 
+@add_iter
+class ExecutionModel(MetricsBase):
+    __tablename__ = 'executions'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    timestamp = Column(String(255))
+    guild_id = Column(BigInteger)
+    parent_channel_id = Column(BigInteger)
+    thread_id = Column(BigInteger)
+    user_id = Column(BigInteger)
+    container = Column(String(255))
+    exit_code = Column(Integer)
+    wall_seconds = Column(Float)
+    cpu_seconds = Column(Float)
+    max_rss_kb = Column(BigInteger)
+    bytes_written = Column(BigInteger)
+    code = Column(String(4096))
+
+
+@add_iter
+class LatencyModel(MetricsBase):
+    __tablename__ = 'latency'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    timestamp = Column(String(255))
+    guild_id = Column(BigInteger)
+    parent_channel_id = Column(BigInteger)
+    thread_id = Column(BigInteger)
+    user_id = Column(BigInteger)
+    engine = Column(String(255))
+    streamed = Column(Boolean)
+    # until the student sees the first text; null for responses without text (e.g. only tool calls)
+    first_token_seconds = Column(Float)
+    total_seconds = Column(Float)
+    message_edits = Column(Integer)
+
+
 @add_iter
 class FeedbackModel(MetricsBase):
     __tablename__ = 'feedback'
@@ -107,6 +145,46 @@ class SQLMetricsHandler:
             self.session.rollback()
             duck_logger.exception("Failed to record usage metrics")
 
+    async def record_execution(self, guild_id, parent_channel_id, thread_id, user_id, container, exit_code,
+                               wall_seconds, cpu_seconds, max_rss_kb, bytes_written, code):
+        try:
+            new_execution_row = ExecutionModel(timestamp=get_timestamp(),
+                                               guild_id=guild_id,
+                                               parent_channel_id=parent_channel_id,
+                                               thread_id=thread_id,
+                                               user_id=user_id,
+                                               container=container,
+                                               exit_code=exit_code,
+                                               wall_seconds=wall_seconds,
+                                               cpu_seconds=cpu_seconds,
+                                               max_rss_kb=max_rss_kb,
+                                               bytes_written=bytes_written,
+                                               code=code[:4096])
+            self.session.add(new_execution_row)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            duck_logger.exception("Failed to record execution metrics")
+
+    async def record_latency(self, guild_id, parent_channel_id, thread_id, user_id, engine, streamed,
+                             first_token_seconds, total_seconds, message_edits):
+        try:
+            new_latency_row = LatencyModel(timestamp=get_timestamp(),
+                                           guild_id=guild_id,
+                                           parent_channel_id=parent_channel_id,
+                                           thread_id=thread_id,
+                                           user_id=user_id,
+                                           engine=engine,
+                                           streamed=streamed,
+                                           first_token_seconds=first_token_seconds,
+                                           total_seconds=total_seconds,
+                                           message_edits=message_edits)
+            self.session.add(new_latency_row)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            duck_logger.exception("Failed to record latency metrics")
+
     async def record_feedback(self, workflow_type: str, guild_id: int, parent_channel_id: int, thread_id: int,
                               user_id: int, reviewer_id: int,
                               feedback_score: int, written_feedback: str):
@@ -154,3 +232,25 @@ class SQLMetricsHandler:
 
     def get_feedback(self):
         return self.sql_model_to_data_list(FeedbackModel)
+
+    def get_executions(self):
+        return self.sql_model_to_data_list(ExecutionModel)
+
+    def get_latency(self):
+        return self.sql_model_to_data_list(LatencyModel)
+
+    def get_tool_calls(self) -> list[dict]:
+        """Recorded function calls as `{"name", "arguments"}`, oldest first"""
+        rows = (
+            self.session.query(MessagesModel.output)
+            .filter(MessagesModel.type == "function_call")
+            .order_by(MessagesModel.id)
+            .all()
+        )
+        calls = []
+        for output, in rows:
+            try:
+                calls.append(json.loads(output) if isinstance(output, str) else output)
+            except json.JSONDecodeError:
+                duck_logger.warning(f"Skipping unreadable function call record: {output[:100]}")
+        return calls
@@ -0,0 +1,143 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Hashable, TypedDict
+
+from .logger import duck_logger
+
+# Upper bounds (seconds) of the queue wait-time histogram buckets; a final bucket catches the rest
+WAIT_BUCKETS = (0.1, 0.5, 1, 2, 5, 10, 30, 60)
+
+
+class AdmissionStats(TypedDict):
+    limit: int
+    running: int
+    waiting: int
+    admitted: int
+    mean_wait_seconds: float
+    # (upper bound in seconds or None for the overflow bucket, count)
+    wait_histogram: list[tuple[float | None, int]]
+
+
+OnQueued = Callable[[int], Awaitable[None]]
+
+
+@dataclass(order=True)
+class _Waiter:
+    start_tag: float
+    seq: int
+    flow: Hashable = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+
+class AdmissionController:
+    """
+    Bounds concurrent executions and orders waiting requests with start-time fair queuing.
+
+    Each flow (e.g. an (author, thread) pair) gets a share of the slots proportional to its
+    weight, so one flow submitting many requests cannot starve the others: a flow's next
+    request is tagged behind its previous one, while a newly active flow starts at the
+    current virtual time.
+    """
+
+    def __init__(self, max_concurrent: int, weights: dict[Hashable, float] | None = None):
+        self._max_concurrent = max(1, max_concurrent)
+        self._weights = weights or {}
+        self._running = 0
+        self._queue: list[_Waiter] = []
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._last_finish: dict[Hashable, float] = {}
+        self._admitted = 0
+        self._wait_total = 0.0
+        self._wait_counts = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def _weight(self, flow: Hashable) -> float:
+        weight = self._weights.get(flow)
+        if weight is None and isinstance(flow, tuple) and flow:
+            # (author, thread) flows fall back to the author's weight
+            weight = self._weights.get(flow[0])
+        return max(weight or 1.0, 1e-6)
+
+    def _tag(self, flow: Hashable) -> float:
+        if len(self._last_finish) > 1024:
+            # flows that have fallen behind virtual time would start at it anyway
+            self._last_finish = {f: t for f, t in self._last_finish.items() if t > self._virtual_time}
+        start = max(self._virtual_time, self._last_finish.get(flow, 0.0))
+        self._last_finish[flow] = start + 1 / self._weight(flow)
+        return start
+
+    def _waiting(self) -> list[_Waiter]:
+        return [waiter for waiter in self._queue if not waiter.future.done()]
+
+    def _position(self, waiter: _Waiter) -> int:
+        return 1 + sum(1 for other in self._waiting() if other < waiter)
+
+    def _record_wait(self, seconds: float):
+        self._admitted += 1
+        self._wait_total += seconds
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if seconds <= bound:
+                self._wait_counts[i] += 1
+                return
+        self._wait_counts[-1] += 1
+
+    def _release(self):
+        self._running -= 1
+        while self._queue and self._running < self._max_concurrent:
+            waiter = heapq.heappop(self._queue)
+            if waiter.future.done():
+                continue  # cancelled while waiting
+            self._running += 1
+            self._virtual_time = max(self._virtual_time, waiter.start_tag)
+            waiter.future.set_result(None)
+
+    def has_free_slot(self) -> bool:
+        """Whether `admit` would start immediately"""
+        return self._running < self._max_concurrent and not self._waiting()
+
+    @asynccontextmanager
+    async def admit(self, flow: Hashable, on_queued: OnQueued | None = None):
+        """Holds an execution slot for the body; waits in fair order when all slots are busy"""
+        requested = time.monotonic()
+        start_tag = self._tag(flow)
+
+        if self.has_free_slot():
+            self._running += 1
+            self._virtual_time = max(self._virtual_time, start_tag)
+        else:
+            waiter = _Waiter(start_tag, next(self._seq), flow, asyncio.get_running_loop().create_future())
+            heapq.heappush(self._queue, waiter)
+            try:
+                if on_queued is not None:
+                    try:
+                        await on_queued(self._position(waiter))
+                    except Exception:
+                        duck_logger.exception("Failed to notify queued request")
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # the slot was granted as we were cancelled; hand it on
+                    self._release()
+                else:
+                    waiter.future.cancel()
+                raise
+
+        self._record_wait(time.monotonic() - requested)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def stats(self) -> AdmissionStats:
+        return {
+            "limit": self._max_concurrent,
+            "running": self._running,
+            "waiting": len(self._waiting()),
+            "admitted": self._admitted,
+            "mean_wait_seconds": self._wait_total / self._admitted if self._admitted else 0.0,
+            "wait_histogram": list(zip([*WAIT_BUCKETS, None], self._wait_counts)),
+        }
@@ -145,6 +145,11 @@ class RetryProtocol(TypedDict):
     backoff: int
 
 
+class StreamingSettings(TypedDict, total=False):
+    # minimum seconds between edits of a streamed reply; Discord allows about 5 edits per 5 s per channel
+    edit_interval_seconds: float
+
+
 class AdminSettings(TypedDict):
     admin_channel_id: int
     admin_role_id: int
@@ -170,6 +175,20 @@ class ContainerSettings(TypedDict, total=False):
     cpus: int
     pids_limit: int
     read_only_root: bool
+    pool_size: int
+    execution_mode: Literal["cold", "fork_server"]
+    fork_server_preload: list[str]
+    dataset_staging: Literal["copy", "mount"]
+    dataset_cache_dir: str
+    dataset_columnar: bool
+    s3_cache: bool
+    s3_max_workers: int
+    docker_transport: Literal["threaded", "async"]
+    output_ttl_seconds: int
+    output_quota_bytes: int
+    reap_interval_seconds: int
+    max_concurrent_runs: int
+    run_queue_weights: dict[int, float]
 
 
 class ContainerConfig(TypedDict):
@@ -178,12 +197,48 @@ class ContainerConfig(TypedDict):
     settings: ContainerSettings
 
 
+class SimilaritySettings(TypedDict, total=False):
+    threshold: float
+    top_k: int
+    dimensions: int
+    # the least recently added or matched row is replaced past this many
+    max_entries: int
+
+
+class EvictionSettings(TypedDict, total=False):
+    # "lru" or "gds" (GreedyDual-Size weighted by execution time, size, and hits)
+    policy: Literal["lru", "gds"]
+    max_bytes: int
+    max_entries: int
+
+
+class PrewarmSettings(TypedDict, total=False):
+    # curated `{"user_intent", "code"}` JSON lines; `!prewarm <tool> mine` uses recorded tool calls instead
+    items_file: str
+    # finished items are appended here so an interrupted prewarm resumes
+    progress_file: str
+    max_concurrency: int
+    # mined requests must have been asked at least this many times
+    min_count: int
+
+
 class CacheSettings(TypedDict):
     backend: NotRequired[Literal["memory", "database"]]
     prompt: NotRequired[str]
     prompt_files: NotRequired[list[str]]
     engine: NotRequired[str]
     reasoning: NotRequired[str]
+    key_memo_size: NotRequired[int]
+    similarity: NotRequired[SimilaritySettings]
+    # start the container run while the semantic key is built; cancelled if the key is a hit
+    speculative_execution: NotRequired[bool]
+    prewarm: NotRequired[PrewarmSettings]
+    # entries are evicted on write once either budget is exceeded; without budgets only expiry applies
+    eviction: NotRequired[EvictionSettings]
+    # database backend only: in-process LRU of whole entries in front of the database
+    hot_tier_bytes: NotRequired[int]
+    hot_tier_warm_entries: NotRequired[int]
+    hot_tier_write_back_seconds: NotRequired[int]
 
 
 class CacheCleanupSettings(TypedDict):
@@ -210,6 +265,8 @@ class Config(TypedDict):
     servers: dict[str, ServerConfig]
     admin_settings: AdminSettings
     ai_completion_retry_protocol: RetryProtocol
+    # stream conversation replies into a message edited as text arrives; omitted, replies are sent whole
+    ai_streaming: NotRequired[StreamingSettings]
     feedback_notifier_settings: NotRequired[FeedbackNotifierSettings]
     reporter_settings: ReporterConfig
     sender_email: str
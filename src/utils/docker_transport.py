@@ -0,0 +1,203 @@
+import asyncio
+import contextlib
+import json
+import os
+import struct
+from typing import Protocol
+from urllib.parse import quote, urlencode
+
+from docker.errors import APIError, NotFound
+
+DEFAULT_DOCKER_SOCKET = "/var/run/docker.sock"
+DOCKER_API_VERSION = "v1.41"
+
+
+class DockerTransport(Protocol):
+    """The container operations an execution needs, bound to one running container"""
+
+    async def exec(self, cmd: list[str], workdir: str | None = None, detach: bool = False) -> tuple[int, bytes, bytes]:
+        """Runs `cmd` and returns (exit code, stdout, stderr); a detached exec returns immediately with (0, b"", b"")"""
+
+    async def get_archive(self, path: str) -> bytes:
+        """Returns a tar archive of `path`; raises docker.errors.NotFound when it does not exist"""
+
+    async def put_archive(self, path: str, data: bytes):
+        """Extracts the tar archive `data` into the directory `path`"""
+
+
+class ThreadedDockerTransport:
+    """Runs each docker-py call in the default executor; works with any DOCKER_HOST"""
+
+    def __init__(self, container):
+        self._container = container
+
+    async def exec(self, cmd: list[str], workdir: str | None = None, detach: bool = False) -> tuple[int, bytes, bytes]:
+        result = await asyncio.to_thread(self._container.exec_run, cmd, workdir=workdir, demux=True, detach=detach)
+        if detach:
+            return 0, b"", b""
+        stdout, stderr = result.output
+        return result.exit_code, stdout or b"", stderr or b""
+
+    async def get_archive(self, path: str) -> bytes:
+        stream, _ = await asyncio.to_thread(self._container.get_archive, path)
+        return b"".join(stream)
+
+    async def put_archive(self, path: str, data: bytes):
+        await asyncio.to_thread(self._container.put_archive, path, data)
+
+
+def demux_stream(data: bytes) -> tuple[bytes, bytes]:
+    """
+    Splits a multiplexed (non-TTY) attach stream into stdout and stderr.
+    Each frame is an 8-byte header [stream, 0, 0, 0, size (uint32 big-endian)] followed by the payload.
+    """
+    stdout, stderr = bytearray(), bytearray()
+    offset = 0
+    while offset + 8 <= len(data):
+        stream_type, size = struct.unpack(">BxxxL", data[offset:offset + 8])
+        payload = data[offset + 8:offset + 8 + size]
+        offset += 8 + size
+        if stream_type == 2:
+            stderr += payload
+        else:
+            stdout += payload
+    return bytes(stdout), bytes(stderr)
+
+
+async def _close(writer: asyncio.StreamWriter):
+    writer.close()
+    # docker may already have dropped the connection
+    with contextlib.suppress(ConnectionError):
+        await writer.wait_closed()
+
+
+class AsyncDockerTransport:
+    """
+    Speaks the Docker Engine API over its Unix socket with asyncio streams, so concurrent
+    executions hold no threads. Each request uses its own connection; cancelling an exec
+    closes its attach stream.
+    """
+
+    def __init__(self, container_id: str, socket_path: str = DEFAULT_DOCKER_SOCKET, api_version: str = DOCKER_API_VERSION):
+        self._container_id = container_id
+        self._socket_path = socket_path
+        self._api_version = api_version
+
+    async def _open(self, method: str, path: str, body: bytes | None = None, headers: dict[str, str] | None = None):
+        reader, writer = await asyncio.open_unix_connection(self._socket_path)
+        lines = [f"{method} /{self._api_version}{path} HTTP/1.1", "Host: docker"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        try:
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+            await writer.drain()
+
+            status_line = await reader.readline()
+            if not status_line:
+                raise APIError(f"Docker closed the connection during {method} {path}")
+            status = int(status_line.split()[1])
+            response_headers = {}
+            while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                name, _, value = line.decode("latin-1").partition(":")
+                response_headers[name.strip().lower()] = value.strip()
+        except BaseException:
+            await _close(writer)
+            raise
+        return status, response_headers, reader, writer
+
+    @staticmethod
+    async def _read_body(headers: dict[str, str], reader: asyncio.StreamReader) -> bytes:
+        if "content-length" in headers:
+            return await reader.readexactly(int(headers["content-length"]))
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = bytearray()
+            while size := int((await reader.readline()).split(b";")[0], 16):
+                body += await reader.readexactly(size)
+                await reader.readline()
+            await reader.readline()
+            return bytes(body)
+        return await reader.read()
+
+    async def _request(self, method: str, path: str, body: bytes | None = None, headers: dict[str, str] | None = None) -> bytes:
+        headers = {"Connection": "close", **(headers or {})}
+        status, response_headers, reader, writer = await self._open(method, path, body, headers)
+        try:
+            data = await self._read_body(response_headers, reader)
+        finally:
+            await _close(writer)
+
+        if status == 404:
+            raise NotFound(self._error_message(data) or f"{method} {path} not found")
+        if status >= 400:
+            raise APIError(f"{method} {path} failed with {status}: {self._error_message(data)}")
+        return data
+
+    @staticmethod
+    def _error_message(data: bytes) -> str:
+        try:
+            return json.loads(data).get("message", "")
+        except ValueError:
+            return data.decode("utf-8", errors="replace")
+
+    async def _request_json(self, method: str, path: str, payload: dict | None = None) -> dict:
+        body = json.dumps(payload).encode() if payload is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else None
+        data = await self._request(method, path, body, headers)
+        return json.loads(data) if data else {}
+
+    async def exec(self, cmd: list[str], workdir: str | None = None, detach: bool = False) -> tuple[int, bytes, bytes]:
+        config = {"Cmd": cmd, "AttachStdout": not detach, "AttachStderr": not detach}
+        if workdir:
+            config["WorkingDir"] = workdir
+        created = await self._request_json("POST", f"/containers/{quote(self._container_id)}/exec", config)
+        exec_id = created["Id"]
+
+        if detach:
+            await self._request_json("POST", f"/exec/{exec_id}/start", {"Detach": True, "Tty": False})
+            return 0, b"", b""
+
+        start_body = json.dumps({"Detach": False, "Tty": False}).encode()
+        status, headers, reader, writer = await self._open(
+            "POST",
+            f"/exec/{exec_id}/start",
+            start_body,
+            {"Content-Type": "application/json", "Connection": "Upgrade", "Upgrade": "tcp"},
+        )
+        try:
+            if status >= 400:
+                raise APIError(f"Starting exec {exec_id} failed with {status}: "
+                               f"{self._error_message(await self._read_body(headers, reader))}")
+            # the attach stream runs until the process exits and docker closes the connection
+            raw = await reader.read()
+        finally:
+            await _close(writer)
+
+        stdout, stderr = demux_stream(raw)
+        inspected = await self._request_json("GET", f"/exec/{exec_id}/json")
+        # the stream can close a moment before docker records the exit code
+        while inspected.get("Running"):
+            await asyncio.sleep(0.01)
+            inspected = await self._request_json("GET", f"/exec/{exec_id}/json")
+        return inspected.get("ExitCode") or 0, stdout, stderr
+
+    async def get_archive(self, path: str) -> bytes:
+        return await self._request("GET", f"/containers/{quote(self._container_id)}/archive?{urlencode({'path': path})}")
+
+    async def put_archive(self, path: str, data: bytes):
+        await self._request(
+            "PUT",
+            f"/containers/{quote(self._container_id)}/archive?{urlencode({'path': path})}",
+            data,
+            {"Content-Type": "application/x-tar"},
+        )
+
+
+def docker_socket_path() -> str | None:
+    """The Unix socket behind DOCKER_HOST (or the default socket), or None for non-Unix hosts"""
+    host = os.environ.get("DOCKER_HOST")
+    if not host:
+        return DEFAULT_DOCKER_SOCKET
+    if host.startswith("unix://"):
+        return host[len("unix://"):]
+    return None
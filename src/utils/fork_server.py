@@ -0,0 +1,218 @@
+from textwrap import dedent
+
+# Path of the fork server's listening socket inside the sandbox container
+FORK_SERVER_SOCKET = "/tmp/duck-fork-server.sock"
+
+# Exit code the client reports when no fork server is listening (EX_TEMPFAIL)
+FORK_SERVER_UNAVAILABLE = 75
+
+
+def build_fork_server_code(
+        setup_code: str,
+        preload: list[str] | None = None,
+        socket_path: str = FORK_SERVER_SOCKET
+) -> str:
+    """
+    Returns the source of the long-lived fork server that runs inside the sandbox.
+
+    The server executes `setup_code` (imports, display options, savefig patch) once,
+    imports any extra `preload` modules, and then forks a fresh child for every request.
+    Each child adopts the client's stdout/stderr file descriptors, changes into the run's
+    output directory, and executes the user code with the same semantics as `python3 -c`.
+    """
+    server_code = dedent("""\
+        import importlib
+        import json
+        import os
+        import selectors
+        import signal
+        import socket
+        import struct
+        import sys
+        import traceback
+        from pathlib import Path
+
+        SOCKET_PATH = {socket_path!r}
+        PRELOAD = {preload!r}
+        SETUP_CODE = {setup_code!r}
+
+        namespace = {{"__name__": "__main__", "__builtins__": __builtins__}}
+        exec(compile(SETUP_CODE, "<sandbox-setup>", "exec"), namespace)
+        for module_name in PRELOAD:
+            try:
+                importlib.import_module(module_name)
+            except Exception:
+                pass
+
+
+        def _recv_exact(conn, size):
+            data = b""
+            while len(data) < size:
+                chunk = conn.recv(size - len(data))
+                if not chunk:
+                    raise ConnectionError("client disconnected")
+                data += chunk
+            return data
+
+
+        def _run_child(request, stdout_fd, stderr_fd):
+            os.setsid()
+            os.dup2(stdout_fd, 1)
+            os.dup2(stderr_fd, 2)
+            os.close(stdout_fd)
+            os.close(stderr_fd)
+
+            outdir = request["outdir"]
+            os.chdir(outdir)
+            namespace["outdir"] = Path(outdir)
+            sys.argv = ["-c"]
+
+            exit_code = 0
+            try:
+                exec(compile(request["code"], "<string>", "exec"), namespace)
+            except SystemExit as exit_request:
+                if exit_request.code is None:
+                    exit_code = 0
+                elif isinstance(exit_request.code, int):
+                    exit_code = exit_request.code
+                else:
+                    print(exit_request.code, file=sys.stderr)
+                    exit_code = 1
+            except BaseException as error:
+                # skip this frame so the traceback matches an uncaught error under `python3 -c`
+                traceback.print_exception(type(error), error, error.__traceback__.tb_next)
+                exit_code = 1
+            finally:
+                try:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                except Exception:
+                    pass
+            os._exit(exit_code)
+
+
+        def _already_running():
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(SOCKET_PATH)
+                return True
+            except OSError:
+                return False
+            finally:
+                probe.close()
+
+
+        def main():
+            if _already_running():
+                return
+            if os.path.exists(SOCKET_PATH):
+                os.unlink(SOCKET_PATH)
+
+            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            server.bind(SOCKET_PATH)
+            server.listen(128)
+            server.setblocking(False)
+
+            # wake the selector whenever a child exits
+            wake_r, wake_w = os.pipe()
+            os.set_blocking(wake_r, False)
+            os.set_blocking(wake_w, False)
+            signal.set_wakeup_fd(wake_w)
+            signal.signal(signal.SIGCHLD, lambda *_: None)
+
+            selector = selectors.DefaultSelector()
+            selector.register(server, selectors.EVENT_READ)
+            selector.register(wake_r, selectors.EVENT_READ)
+            children = {{}}
+
+            while True:
+                for key, _ in selector.select():
+                    if key.fileobj is server:
+                        conn, _ = server.accept()
+                        conn.setblocking(True)
+                        try:
+                            header, fds, _, _ = socket.recv_fds(conn, 8, 2)
+                            (size,) = struct.unpack("!Q", header)
+                            request = json.loads(_recv_exact(conn, size).decode("utf-8"))
+                        except Exception:
+                            conn.close()
+                            continue
+
+                        sys.stdout.flush()
+                        sys.stderr.flush()
+                        pid = os.fork()
+                        if pid == 0:
+                            selector.close()
+                            server.close()
+                            _run_child(request, fds[0], fds[1])
+                        for fd in fds:
+                            os.close(fd)
+                        children[pid] = conn
+                    else:
+                        try:
+                            os.read(wake_r, 4096)
+                        except BlockingIOError:
+                            pass
+
+                while children:
+                    try:
+                        pid, status = os.waitpid(-1, os.WNOHANG)
+                    except ChildProcessError:
+                        break
+                    if pid == 0:
+                        break
+                    conn = children.pop(pid, None)
+                    if conn is None:
+                        continue
+                    exit_code = os.waitstatus_to_exitcode(status)
+                    if exit_code < 0:
+                        exit_code = 128 - exit_code
+                    try:
+                        conn.sendall(f"{{exit_code}}\\n".encode())
+                    except OSError:
+                        pass
+                    conn.close()
+
+
+        main()
+    """)
+    return server_code.format(
+        socket_path=socket_path,
+        preload=list(preload or []),
+        setup_code=setup_code,
+    )
+
+
+def build_fork_client_code(socket_path: str = FORK_SERVER_SOCKET) -> str:
+    """
+    Returns the source of the tiny client exec'd once per run as `python3 -c <client> <outdir> <code>`.
+    It hands its own stdout/stderr to the fork server and exits with the child's exit code.
+    """
+    return dedent(f"""\
+        import json
+        import socket
+        import struct
+        import sys
+
+        outdir, code = sys.argv[1], sys.argv[2]
+        payload = json.dumps({{"outdir": outdir, "code": code}}).encode("utf-8")
+
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect({socket_path!r})
+            socket.send_fds(client, [struct.pack("!Q", len(payload))], [1, 2])
+            client.sendall(payload)
+        except OSError:
+            sys.exit({FORK_SERVER_UNAVAILABLE})
+
+        reply = b""
+        while not reply.endswith(b"\\n"):
+            chunk = client.recv(64)
+            if not chunk:
+                sys.exit("Fork server exited before the run completed")
+            reply += chunk
+        sys.exit(int(reply))
+    """)
+
+
+FORK_CLIENT_CODE = build_fork_client_code()
@@ -0,0 +1,34 @@
+import asyncio
+
+from .logger import duck_logger
+from .python_exec_container import ContainerPool
+
+# Share of output_quota_bytes at which a container is reported as nearly full
+DISK_USAGE_WARNING_RATIO = 0.8
+
+
+class OutputReaper:
+    """A class that periodically removes finished run output directories from sandbox containers"""
+
+    def __init__(self, containers: dict[str, ContainerPool], interval_seconds: dict[str, float]):
+        self._containers = containers
+        self._interval_seconds = interval_seconds
+
+    async def _reap_forever(self, pool: ContainerPool, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await pool.reap_outputs()
+            for member in pool.stats()["members"]:
+                usage = member["disk_usage"]
+                if usage and usage["quota_bytes"] and usage["used_bytes"] >= DISK_USAGE_WARNING_RATIO * usage["quota_bytes"]:
+                    duck_logger.warning(
+                        f"{member['name']} output directory is at "
+                        f"{usage['used_bytes'] / usage['quota_bytes']:.0%} of its {usage['quota_bytes']} byte quota"
+                    )
+
+    async def start(self):
+        duck_logger.info(f"Starting output reaper for {len(self._containers)} container pool(s)")
+        await asyncio.gather(*[
+            self._reap_forever(pool, self._interval_seconds.get(name, 300))
+            for name, pool in self._containers.items()
+        ])
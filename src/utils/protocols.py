@@ -1,11 +1,10 @@
 import dataclasses
 from typing import Protocol, TypedDict, Any, TYPE_CHECKING
 
-from .python_exec_container import FileResult
 from ..utils.config_types import FileData
 
 if TYPE_CHECKING:
-    from ..armory.tool_cache import CacheKey
+    from ..armory.tool_cache import CacheEntry, CacheEntryBuilder, CacheKey, CacheLookupStats
 
 
 class Attachment(TypedDict):
@@ -29,17 +28,29 @@ class Message(TypedDict):
 
 
 class SendMessage(Protocol):
-    async def __call__(self, channel_id: int, message: str = None, file: FileData = None, view=None) -> int: ...
+    async def __call__(
+            self, channel_id: int, message: str = None, file: FileData | list[FileData] = None, view=None
+    ) -> int: ...
 
 
 class EditMessage(Protocol):
     async def __call__(self, channel_id: int, message_id: int, new_content: str): ...
 
 
+class DeleteMessage(Protocol):
+    async def __call__(self, channel_id: int, message_id: int): ...
+
+
 class AddReaction(Protocol):
     async def __call__(self, channel_id: int, message_id: int, reaction: str): ...
 
 
+class RecordExecution(Protocol):
+    async def __call__(self, guild_id: int, parent_channel_id: int, thread_id: int, user_id: int, container: str,
+                       exit_code: int, wall_seconds: float, cpu_seconds: float | None, max_rss_kb: int | None,
+                       bytes_written: int, code: str): ...
+
+
 class ReportError(Protocol):
     async def __call__(self, msg: str, notify_admin: bool = False): ...
 
@@ -64,29 +75,34 @@ class ConversationComplete(BaseException):
 
 
 class ToolCache(Protocol):
+    lookup_stats: "CacheLookupStats"
+
     def cleanup(self):
         ...
 
     def get_key(self, cache_key: "CacheKey") -> str:
         ...
 
-    def check_if_cached(self, key: str) -> bool:
+    def get_or_none(self, key: str) -> "CacheEntry | None":
+        """The entry under `key`, counted as a hit, or None"""
         ...
 
-    async def send_from_cache(self, key: str, send_message: SendMessage, channel_id: int) -> dict[
-        str, Any]:
+    def load_entry(self, key: str) -> "CacheEntry | None":
+        """The entry under `key` without counting it as a hit, or None"""
         ...
 
-    def cache_file(self, key: str, filename: str, file: FileResult):
+    def write_entry(self, key: str, builder: "CacheEntryBuilder") -> list[str]:
+        """Writes a complete entry in one transaction, replacing any entry under `key`; returns the keys evicted"""
         ...
 
-    def cache_table(self, key: str, filename: str, table_chunks: list[str], description: str = ""):
+    def set_cost(self, key: str, cost_seconds: float):
         ...
 
-    def cache_msg(self, key: str, msg: str):
+    def list_entries(self, offset: int = 0, limit: int | None = None) -> list[dict[str, Any]]:
+        """Summary rows, most hit first"""
         ...
 
-    def list_entries(self) -> list[dict[str, Any]]:
+    def count_entries(self) -> int:
         ...
 
     def remove_entry(self, key: str) -> bool:
@@ -95,9 +111,13 @@ class ToolCache(Protocol):
     def clear_entries(self) -> int:
         ...
 
+    def invalidate_datasets(self, versions: dict[str, str]) -> list[str]:
+        """Removes entries computed from a version of these datasets other than the given current one; returns their keys"""
+        ...
+
 
 class CacheKeyBuilder(Protocol):
-    def build_cache_key(self, user_intent: str, code: str) -> "CacheKey":
+    async def build_cache_key(self, user_intent: str, code: str) -> "CacheKey":
         ...
 
 
@@ -2,17 +2,26 @@ import asyncio
 import io
 import json
 import os
+import shlex
 import tarfile
+import time
 import uuid
+from contextlib import ExitStack
+from dataclasses import dataclass
 from textwrap import dedent, indent
-from typing import TypedDict
+from typing import Hashable
 
 import docker
 from docker.errors import NotFound
+from typing_extensions import NotRequired, TypedDict
 
+from .admission import AdmissionController, AdmissionStats, OnQueued
 from .config_types import Config, ResourceConfig, ContainerSettings
+from .docker_transport import DockerTransport, AsyncDockerTransport, ThreadedDockerTransport, docker_socket_path
+from .fork_server import build_fork_server_code, FORK_CLIENT_CODE, FORK_SERVER_UNAVAILABLE
 from .logger import duck_logger
-from .resource_staging import determine_staging_case, get_dataset_info, get_folder_info, DatasetInfo
+from .resource_staging import determine_staging_case, get_dataset_info, get_folder_info, DatasetInfo, \
+    materialize_dataset, DEFAULT_DATASET_CACHE_DIR, S3DatasetCache, build_columnar_copy
 
 
 class FileResult(TypedDict):
@@ -20,11 +29,216 @@ class FileResult(TypedDict):
     bytes: bytes
 
 
+class ExecutionUsage(TypedDict):
+    wall_seconds: float
+    cpu_seconds: float | None
+    max_rss_kb: int | None
+    bytes_written: int
+
+
 class ExecutionResult(TypedDict):
     exit_code: int
     stdout: str
     stderr: str
     files: dict[str, FileResult]
+    usage: NotRequired[ExecutionUsage]
+
+
+class OutputDiskUsage(TypedDict):
+    used_bytes: int
+    quota_bytes: int | None
+    run_dirs: int
+    removed_dirs: int
+
+
+class PoolMemberStats(TypedDict):
+    name: str
+    in_flight: int
+    completed: int
+    utilisation: float
+    disk_usage: OutputDiskUsage | None
+
+
+class ContainerPoolStats(TypedDict):
+    name: str
+    size: int
+    in_flight: int
+    queue_depth: int
+    members: list[PoolMemberStats]
+    admission: AdmissionStats | None
+
+
+# Bookkeeping files written into a run's output directory; never returned as output files
+INTERNAL_FILE_PREFIX = ".duck-"
+USAGE_FILENAME = ".duck-usage.json"
+RUN_PGID_FILENAME = ".duck-run.pgid"
+RUN_PID_FILENAME = ".duck-run.pid"
+RUN_CANCELLED_FILENAME = ".duck-run.cancelled"
+
+# Runs inside the container as `python3 -c REAP_OUTPUTS_CODE <request json>`. Removes retrieved run
+# directories, then expired ones, then the oldest until under the quota; directories of in-flight runs
+# are never touched. Prints an OutputDiskUsage JSON object.
+REAP_OUTPUTS_CODE = dedent("""\
+    import json
+    import os
+    import shutil
+    import sys
+    import time
+
+    request = json.loads(sys.argv[1])
+    root, active = request["root"], set(request["active"])
+    ttl, quota = request["ttl_seconds"], request["quota_bytes"]
+    now = time.time()
+    removed = 0
+
+
+    def dir_size(path):
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.lstat(os.path.join(dirpath, filename)).st_size
+                except OSError:
+                    pass
+        return total
+
+
+    for path in request["retrieved"]:
+        if path not in active and os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+            removed += 1
+
+    idle, used = [], 0
+    for entry in os.scandir(root) if os.path.isdir(root) else []:
+        if not entry.is_dir(follow_symlinks=False):
+            continue
+        size = dir_size(entry.path)
+        if entry.path in active:
+            used += size
+        elif ttl and now - entry.stat().st_mtime > ttl:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+        else:
+            idle.append((entry.stat().st_mtime, entry.path, size))
+            used += size
+
+    remaining = len(idle)
+    for _, path, size in sorted(idle):
+        if not quota or used <= quota:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        used -= size
+        removed += 1
+        remaining -= 1
+
+    print(json.dumps({
+        "used_bytes": used,
+        "quota_bytes": quota,
+        "run_dirs": remaining + len(active),
+        "removed_dirs": removed,
+    }))
+""")
+
+# Runs before any user code: once per execution in "cold" mode, once per container in "fork_server" mode.
+# `outdir` is bound per run before the user code executes.
+SANDBOX_SETUP_CODE = dedent("""\
+    import sys
+    import traceback
+    import os
+    import json
+    from pathlib import Path
+
+
+    # ===== Configure numeric display (no scientific notation) ===== #
+    try:
+        import numpy as np
+        import pandas as pd
+
+        def _plain_float(value):
+            formatted = format(float(value), ".4f")
+            formatted = formatted.rstrip("0").rstrip(".")
+            return formatted if formatted else "0"
+
+        np.set_printoptions(
+            suppress=True,
+            formatter={"float_kind": _plain_float}
+        )
+        pd.set_option("display.float_format", _plain_float)
+    except Exception:
+        pass
+
+    # ===== Patch matplotlib to auto-save metadata ===== #
+    try:
+        import matplotlib.pyplot as plt
+
+        _original_savefig = plt.Figure.savefig
+
+        def detect_plot_type(ax):
+            if ax.lines:
+                return "line"
+            if ax.collections:
+                return "scatter_or_heatmap"
+            if ax.patches:
+                return "bar_or_hist"
+            if ax.images:
+                return "image"
+            return "unknown"
+
+        def savefig_with_metadata(self, *args, **kwargs):
+            if args:
+                orig = args[0]
+                new_path = str(outdir / os.path.basename(orig))
+                args = (new_path, *args[1:])
+            else:
+                orig = kwargs.get("fname", "figure.png")
+                new_path = os.path.join(str(outdir), os.path.basename(orig))
+                kwargs["fname"] = new_path
+
+            _original_savefig(self, *args, **kwargs)
+
+            for i, ax in enumerate(self.axes):
+                metadata = {
+                    "title": ax.get_title(),
+                    "xlabel": ax.get_xlabel(),
+                    "ylabel": ax.get_ylabel(),
+                    "plot_type": detect_plot_type(ax)
+                }
+                if len(self.axes) == 1:
+                    meta_path = os.path.splitext(new_path)[0] + ".json"
+                else:
+                    base, ext = os.path.splitext(new_path)
+                    meta_path = f"{base}_ax{i}.json"
+                with open(meta_path, "w") as f:
+                    json.dump(metadata, f)
+
+        plt.Figure.savefig = savefig_with_metadata
+    except ImportError:
+        pass
+
+    # ===== Load staged CSVs from their memory-mapped Arrow copies ===== #
+    try:
+        import pandas as pd
+        import pyarrow as pa
+
+        _original_read_csv = pd.read_csv
+
+        def read_csv_columnar(filepath_or_buffer, *args, **kwargs):
+            # only plain pd.read_csv(path) calls; any parsing option goes to pandas unchanged
+            if not args and not kwargs and isinstance(filepath_or_buffer, (str, os.PathLike)):
+                csv_path = os.fspath(filepath_or_buffer)
+                arrow_path = os.path.splitext(csv_path)[0] + ".arrow"
+                if csv_path.endswith(".csv") and os.path.exists(arrow_path):
+                    try:
+                        with pa.memory_map(arrow_path) as source:
+                            return pa.ipc.open_file(source).read_all().to_pandas()
+                    except Exception:
+                        pass
+            return _original_read_csv(filepath_or_buffer, *args, **kwargs)
+
+        pd.read_csv = read_csv_columnar
+    except ImportError:
+        pass
+""")
 
 
 class PythonExecContainer:
@@ -35,7 +249,15 @@ class PythonExecContainer:
         self._settings = settings
         self._resource_metadata = []
         self._container = None
+        self._transport: DockerTransport | None = None
         self._working_dir = self._settings["working_dir"] if "working_dir" in self._settings else "/home/sandbox/out"
+        self._execution_mode = self._settings.get("execution_mode", "cold")
+        self._fork_server_started_at: float | None = None
+        self._datasets: list[tuple[str, DatasetInfo]] | None = None
+        # run directories currently executing, and those whose outputs have been read back
+        self._active_runs: set[str] = set()
+        self._retrieved_runs: list[str] = []
+        self._disk_usage: OutputDiskUsage | None = None
 
         try:
             self._client: docker.Client = docker.from_env()
@@ -48,6 +270,10 @@ class PythonExecContainer:
                 f"Original error: {e}"
             ) from e
 
+    @property
+    def name(self) -> str:
+        return self._name
+
     def name_in_use(self, name: str) -> bool:
         try:
             # Docker treats names as "/name" internally, but the SDK matches automatically
@@ -56,6 +282,10 @@ class PythonExecContainer:
         except NotFound:
             return False
 
+    def use_datasets(self, datasets: list[tuple[str, DatasetInfo]]):
+        """Stage these already-collected (target_dir, dataset) pairs instead of collecting resources on enter"""
+        self._datasets = datasets
+
     def __enter__(self):
         # start container
         duck_logger.info(f"Starting container {self._name} from {self._image}")
@@ -64,6 +294,18 @@ class PythonExecContainer:
             cont.stop()
             cont.remove()
 
+        datasets = self._datasets if self._datasets is not None else collect_datasets(
+            self._resource_data,
+            build_s3_cache(self._settings),
+            self._settings.get("dataset_columnar", False)
+        )
+        staging = self._settings.get("dataset_staging", "copy")
+        volumes = self._dataset_volumes(datasets) if staging == "mount" else None
+
+        read_only = self._settings.get("read_only_root", False)
+        # a read-only root still needs scratch space for run outputs and the fork server socket
+        tmpfs = {self._working_dir: "", "/tmp": ""} if read_only else None
+
         cpus = self._settings.get("cpus")
         self._container = self._client.containers.run(
             self._image,
@@ -75,11 +317,21 @@ class PythonExecContainer:
             memswap_limit=self._settings.get("memory_swap"),
             nano_cpus= int(cpus) * 1_000_000_000 if cpus else None,
             pids_limit=self._settings.get("pids_limit"),
-            read_only=self._settings.get("read_only_root", False),
+            read_only=read_only,
+            volumes=volumes,
+            tmpfs=tmpfs,
         )
         duck_logger.info(f"Container {self._name} started")
+        self._transport = self._build_transport()
+
+        if staging != "mount":
+            self._copy_datasets(datasets)
+        for target_dir, dataset in datasets:
+            if dataset.derived_from is None:
+                self._record_dataset(target_dir, dataset)
 
-        self._stage_files()
+        if self._execution_mode == "fork_server":
+            self._start_fork_server()
 
         return self
 
@@ -89,14 +341,22 @@ class PythonExecContainer:
             self._container.stop()
             self._container.remove()
 
-    def _stage_file(self, target_path: str, dataset: DatasetInfo):
-        self._write_file(dataset.filename, dataset.data, target_path)
+    def _build_transport(self) -> DockerTransport:
+        if self._settings.get("docker_transport", "threaded") == "async":
+            socket_path = docker_socket_path()
+            if socket_path is not None:
+                return AsyncDockerTransport(self._container.id, socket_path)
+            duck_logger.warning(f"DOCKER_HOST is not a Unix socket; {self._name} falls back to the threaded transport")
+        return ThreadedDockerTransport(self._container)
+
+    def _record_dataset(self, target_path: str, dataset: DatasetInfo):
         dataset_name = self._extract_dataset_name(dataset.description, dataset.filename)
         self._resource_metadata.append({
             "filename": dataset.filename,
             "path": os.path.join(target_path, dataset.filename),
             "dataset_name": dataset_name,
             "full_description": dataset.description,
+            "version": dataset.content_hash[:16],
         })
 
     @staticmethod
@@ -110,63 +370,35 @@ class PythonExecContainer:
                     return value
         return fallback_filename
 
-    def _stage_files(self):
-        for resource_info in self._resource_data:
-            remote_path = resource_info.get("source")
-            target_path = resource_info.get("target")
-            if not remote_path or not target_path:
-                duck_logger.warn(f"Skipping invalid resource entry: {resource_info}")
-                continue
-
-            # determine which case:
-            case = determine_staging_case(remote_path, target_path)
-            match case:
-                case "file: file":
-                    target_dir = os.path.dirname(target_path)
-                    dataset = get_dataset_info(remote_path)
-                    self._stage_file(target_dir, dataset)
-                case "file: folder":
-                    dataset = get_dataset_info(remote_path)
-                    self._stage_file(target_path, dataset)
-                case "folder: folder":
-                    for dataset in get_folder_info(remote_path):
-                        self._stage_file(target_path, dataset)
-
-    def _mkdir(self, path: str) -> str:
-        """Makes a directory in the /out directory and returns the path"""
-        self._container.exec_run(["mkdir", "-p", path])
-        return path
-
-    def _write_file(self, filename: str, data: bytes, container_dir: str) -> int:
-        """
-        Writes a dict of {relative_path: bytes} to the container directory and returns exit code
-
-        Example:
-            files = {
-                "input.txt": b"...",
-                "subdir/data.json": b"..."
-            }
-
-        container_dir should be a full container path, e.g. "/out/<uuid>"
-        """
-        dest_path = os.path.join(container_dir, filename)  # full path to file
-        # make sure the directory exists in the container
-        parent_dir = os.path.dirname(dest_path)
-        self._container.exec_run(["mkdir", "-p", parent_dir])
-
-        # create a tar archive containing just this file
-        tarstream = io.BytesIO()
-        with tarfile.open(fileobj=tarstream, mode="w") as tar:
-            info = tarfile.TarInfo(name=os.path.basename(dest_path))
-            info.size = len(data)
-            tar.addfile(info, io.BytesIO(data))
-
-        tarstream.seek(0)
-
-        # Send archive into the correct directory
-        return self._container.put_archive(parent_dir, tarstream.getvalue())
+    def _dataset_volumes(self, datasets: list[tuple[str, DatasetInfo]]) -> dict[str, dict[str, str]]:
+        """Materialises each dataset once on the host and returns read-only bind mounts for them"""
+        cache_dir = self._settings.get("dataset_cache_dir", DEFAULT_DATASET_CACHE_DIR)
+        volumes = {}
+        for target_dir, dataset in datasets:
+            host_path = materialize_dataset(dataset, cache_dir)
+            volumes[str(host_path)] = {"bind": os.path.join(target_dir, dataset.filename), "mode": "ro"}
+        return volumes
+
+    def _copy_datasets(self, datasets: list[tuple[str, DatasetInfo]]):
+        """Copies datasets into the container with one mkdir and one archive per target directory"""
+        by_dir: dict[str, list[DatasetInfo]] = {}
+        for target_dir, dataset in datasets:
+            by_dir.setdefault(target_dir, []).append(dataset)
+        if not by_dir:
+            return
+
+        self._container.exec_run(["mkdir", "-p", *by_dir])
+        for target_dir, dir_datasets in by_dir.items():
+            tarstream = io.BytesIO()
+            with tarfile.open(fileobj=tarstream, mode="w") as tar:
+                for dataset in dir_datasets:
+                    info = tarfile.TarInfo(name=dataset.filename)
+                    info.size = len(dataset.data)
+                    tar.addfile(info, io.BytesIO(dataset.data))
+            self._container.put_archive(target_dir, tarstream.getvalue())
 
-    def _get_plot_description(self, path: str, filename: str, json_files: set[str]) -> str:
+    @staticmethod
+    def _get_plot_description(filename: str, json_files: dict[str, bytes]) -> str:
         """Returns the description of a plot contained in its corresponding json file"""
         # filename without file extension
         base = filename.rsplit(".", 1)[0]
@@ -176,8 +408,7 @@ class PythonExecContainer:
         for json_name in json_files:
             if json_name.startswith(base + "_ax") and json_name.endswith(".json"):
                 try:
-                    json_bytes = self._read_file(os.path.join(path, json_name))
-                    meta = json.loads(json_bytes.decode())
+                    meta = json.loads(json_files[json_name].decode())
 
                     subplot_descriptions[json_name] = (
                         f"{meta.get('plot_type', 'unknown type of')} plot titled "
@@ -205,12 +436,10 @@ class PythonExecContainer:
 
         # ===== otherwise fall back to single json behavior ===== #
         single_json = base + ".json"
-        description_path = os.path.join(path, single_json)
 
         if single_json in json_files:
             try:
-                json_bytes = self._read_file(description_path)
-                meta = json.loads(json_bytes.decode())
+                meta = json.loads(json_files[single_json].decode())
                 return (
                     f"{meta.get('plot_type', 'unknown type of')} plot titled "
                     f"'{meta.get('title', '')}', xlabel='{meta.get('xlabel', '')}', "
@@ -222,143 +451,58 @@ class PythonExecContainer:
         # if no metadata found
         return "image without description"
 
-    def _get_file_description(self, path: str, filename: str, json_files: set[str]) -> str:
+    def _get_file_description(self, filename: str, json_files: dict[str, bytes]) -> str:
         """Returns the description of a file"""
         if is_image(filename):
-            return self._get_plot_description(path, filename, json_files)
+            return self._get_plot_description(filename, json_files)
         elif is_table(filename):
             name, ext = os.path.splitext(filename)
             return f"table titled '{name}'"
         else:
             return "file without saved description"
 
-    def _read_file(self, path) -> bytes:
-        """Reads a file from a full path, e.g. '/out/<uuid>/file.txt' and returns its contents"""
-        stream, _ = self._container.get_archive(path)
-        tar_bytes = b"".join(stream)
-        tarstream = io.BytesIO(tar_bytes)
+    async def _fetch_archive(self, path: str) -> dict[str, bytes]:
+        """
+        Fetches a whole container directory, e.g. "/out/<uuid>", in a single archive request over
+        the configured transport and returns the regular files directly inside it as {filename: bytes}
+        """
+        try:
+            data = await self._transport.get_archive(path)
+        except NotFound as e:
+            raise FileNotFoundError(f"Directory not found in container: {path}") from e
+        return self._unpack_archive(data)
 
-        with tarfile.open(fileobj=tarstream, mode="r:*") as tar:
+    @staticmethod
+    def _unpack_archive(data: bytes) -> dict[str, bytes]:
+        contents = {}
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:*") as tar:
             for member in tar.getmembers():
+                # members are named "<dirname>/<filename>"; nested directories are not outputs
+                parts = member.name.split("/")
+                if not member.isfile() or len(parts) != 2:
+                    continue
                 if file := tar.extractfile(member):
-                    return file.read()
+                    contents[parts[1]] = file.read()
+        return contents
 
-        raise FileNotFoundError(f"File not found in container: {path}")
+    def _describe_files(self, contents: dict[str, bytes]) -> dict[str, FileResult]:
+        json_files = {name: data for name, data in contents.items() if name.endswith(".json")}
 
-    def _read_files(self, path: str) -> dict[str, dict[str, str] | bytes]:
-        """
-        Reads all files inside a directory given by `path`, e.g. "/out/<uuid>"
-        Returns:
-            {
-                "path/filename": {
-                    "description": str,
-                    "data": bytes
-                }
-            }
-        """
         out_files = {}
-
-        # run ls inside container to list directory contents
-        exit_code, dirs = self._container.exec_run(f"ls -1 {path}")
-
-        if exit_code != 0:
-            raise FileNotFoundError(f"Directory not found in container: {path}")
-
-        filenames = dirs.decode().splitlines()
-        json_files = {f for f in filenames if f.endswith(".json")}
-
-        for filename in filenames:
+        for filename in sorted(contents):
             # skip json files
             if filename.endswith(".json"):
                 continue
 
-            full_path = os.path.join(path, filename)
-            file_data = self._read_file(full_path)
-            description = self._get_file_description(path, filename, json_files)
-
             out_files[filename] = {
-                "description": description,
-                "bytes": file_data
+                "description": self._get_file_description(filename, json_files),
+                "bytes": contents[filename]
             }
         return out_files
 
-    def _wrap_code(self, path: str, code: str) -> str:
-        wrapped_code = dedent(f"""\
-            import sys
-            import traceback
-            import os
-            import json
-            from pathlib import Path
-
-
-            outdir = Path({path!r})  # full container path for outputs
-
-            # ===== Configure numeric display (no scientific notation) ===== #
-            try:
-                import numpy as np
-                import pandas as pd
-
-                def _plain_float(value):
-                    formatted = format(float(value), ".4f")
-                    formatted = formatted.rstrip("0").rstrip(".")
-                    return formatted if formatted else "0"
-
-                np.set_printoptions(
-                    suppress=True,
-                    formatter={{"float_kind": _plain_float}}
-                )
-                pd.set_option("display.float_format", _plain_float)
-            except Exception:
-                pass
-
-            # ===== Patch matplotlib to auto-save metadata ===== #
-            try:
-                import matplotlib.pyplot as plt
-
-                _original_savefig = plt.Figure.savefig
-
-                def detect_plot_type(ax):
-                    if ax.lines:
-                        return "line"
-                    if ax.collections:
-                        return "scatter_or_heatmap"
-                    if ax.patches:
-                        return "bar_or_hist"
-                    if ax.images:
-                        return "image"
-                    return "unknown"
-
-                def savefig_with_metadata(self, *args, **kwargs):
-                    if args:
-                        orig = args[0]
-                        new_path = str(outdir / os.path.basename(orig))
-                        args = (new_path, *args[1:])
-                    else:
-                        orig = kwargs.get("fname", "figure.png")
-                        new_path = os.path.join(str(outdir), os.path.basename(orig))
-                        kwargs["fname"] = new_path
-
-                    _original_savefig(self, *args, **kwargs)
-
-                    for i, ax in enumerate(self.axes):
-                        metadata = {{
-                            "title": ax.get_title(),
-                            "xlabel": ax.get_xlabel(),
-                            "ylabel": ax.get_ylabel(),
-                            "plot_type": detect_plot_type(ax)
-                        }}
-                        if len(self.axes) == 1:
-                            meta_path = os.path.splitext(new_path)[0] + ".json"
-                        else:
-                            base, ext = os.path.splitext(new_path)
-                            meta_path = f"{{base}}_ax{{i}}.json"
-                        with open(meta_path, "w") as f:
-                            json.dump(metadata, f)
-
-                plt.Figure.savefig = savefig_with_metadata
-            except ImportError:
-                pass
-
+    @staticmethod
+    def _wrap_user_code(code: str) -> str:
+        return dedent(f"""\
             # ===== Execute user code safely ===== #
             try:
 {indent(code, '                ')}
@@ -367,70 +511,211 @@ class PythonExecContainer:
                 raise
             finally:
                 sys.stdout.flush()
+                # ===== Record resource usage for this run ===== #
+                try:
+                    import json as _json, resource as _resource
+                    _self = _resource.getrusage(_resource.RUSAGE_SELF)
+                    _children = _resource.getrusage(_resource.RUSAGE_CHILDREN)
+                    with open(str(outdir) + "/{USAGE_FILENAME}", "w") as _usage_file:
+                        _json.dump({{
+                            "cpu_seconds": _self.ru_utime + _self.ru_stime + _children.ru_utime + _children.ru_stime,
+                            "max_rss_kb": max(_self.ru_maxrss, _children.ru_maxrss),
+                        }}, _usage_file)
+                except Exception:
+                    pass
         """)
-        return wrapped_code
 
-    def _wrap_and_execute(self, code: str, path: str) -> tuple[int, str, str]:
-        """Wraps the code before execution and returns the stdout/stderr"""
-        wrapped_code = self._wrap_code(path, code)
+    @staticmethod
+    def _register_run_code(path: str) -> str:
+        """
+        Puts the run in its own process group and records the group id in its output directory,
+        so a timeout can kill exactly this run's process tree. If the run does not lead its group, the
+        group may be shared with other runs, so only its pid is recorded. A run cancelled before it
+        registers exits here.
+        """
+        return dedent(f"""\
+            import os as _duck_os
+            try:
+                _duck_os.setpgid(0, 0)
+            except OSError:
+                pass  # already a session leader (fork server child), so already its own group
+            if _duck_os.getpgid(0) == _duck_os.getpid():
+                with open({path!r} + "/{RUN_PGID_FILENAME}", "w") as _pgid_file:
+                    _pgid_file.write(str(_duck_os.getpid()))
+            else:
+                with open({path!r} + "/{RUN_PID_FILENAME}", "w") as _pid_file:
+                    _pid_file.write(str(_duck_os.getpid()))
+            if _duck_os.path.exists({path!r} + "/{RUN_CANCELLED_FILENAME}"):
+                _duck_os._exit(137)
+        """)
 
-        # execute inside the container
-        result = self._container.exec_run(
-            ["python3", "-u", "-c", wrapped_code],
-            workdir=path,
-            demux=True
+    @staticmethod
+    def _kill_run_command(path: str) -> list[str]:
+        """Marks the run cancelled, then kills its process group, or only its process if it could not lead a group"""
+        pgid_file = shlex.quote(f"{path}/{RUN_PGID_FILENAME}")
+        pid_file = shlex.quote(f"{path}/{RUN_PID_FILENAME}")
+        cancelled_file = shlex.quote(f"{path}/{RUN_CANCELLED_FILENAME}")
+        return ["sh", "-c", (
+            f'touch {cancelled_file}; '
+            f'if [ -f {pgid_file} ]; then kill -s KILL -- "-$(cat {pgid_file})"; '
+            f'elif [ -f {pid_file} ]; then kill -s KILL "$(cat {pid_file})"; fi; true'
+        )]
+
+    def _wrap_code(self, path: str, code: str) -> str:
+        return (
+            self._register_run_code(path)
+            + SANDBOX_SETUP_CODE
+            + f"\noutdir = Path({path!r})  # full container path for outputs\n\n"
+            + self._wrap_user_code(code)
         )
-        stdout_bytes, stderr_bytes = result.output
+
+    async def _exec_python(self, command: list[str], path: str) -> tuple[int, str, str]:
+        exit_code, stdout_bytes, stderr_bytes = await self._transport.exec(command, workdir=path)
         stdout = stdout_bytes.decode("utf-8", errors="replace") if stdout_bytes else ""
         stderr = stderr_bytes.decode("utf-8", errors="replace") if stderr_bytes else ""
-        return result.exit_code, stdout, stderr
+        return exit_code, stdout, stderr
+
+    def _fork_server_command(self) -> list[str] | None:
+        """The command that starts the fork server, or None if it was (re)started in the last 5 seconds"""
+        now = time.monotonic()
+        if self._fork_server_started_at is not None and now - self._fork_server_started_at < 5:
+            return None
+        self._fork_server_started_at = now
+        duck_logger.info(f"Starting fork server in {self._name}")
+        server_code = build_fork_server_code(SANDBOX_SETUP_CODE, self._settings.get("fork_server_preload"))
+        return ["python3", "-c", server_code]
+
+    def _start_fork_server(self):
+        if command := self._fork_server_command():
+            self._container.exec_run(command, detach=True)
+
+    async def _restart_fork_server(self):
+        if command := self._fork_server_command():
+            await self._transport.exec(command, detach=True)
+
+    async def _wrap_and_execute(self, code: str, path: str) -> tuple[int, str, str]:
+        """Wraps the code before execution and returns the stdout/stderr"""
+        if self._execution_mode == "fork_server":
+            exit_code, stdout, stderr = await self._exec_python(
+                ["python3", "-c", FORK_CLIENT_CODE, path, self._register_run_code(path) + self._wrap_user_code(code)],
+                path
+            )
+            if exit_code != FORK_SERVER_UNAVAILABLE:
+                return exit_code, stdout, stderr
 
-    def _run_code(self, code: str) -> ExecutionResult:
-        unique_id = str(uuid.uuid4())
-        dir_path = self._mkdir(f'{self._working_dir}/{unique_id}')
-        duck_logger.debug(f'Running code in {self._container.name}:\n{code}')
+            # the fork server is still starting or was killed; run cold and bring it back
+            duck_logger.warning(f"Fork server unavailable in {self._name}; running without it")
+            await self._restart_fork_server()
 
-        exit_code, stdout, stderr = self._wrap_and_execute(code, dir_path)
+        # execute inside the container
+        return await self._exec_python(["python3", "-u", "-c", self._wrap_code(path, code)], path)
+
+    async def _run_code(self, code: str, dir_path: str) -> ExecutionResult:
+        await self._transport.exec(["mkdir", "-p", dir_path])
+        duck_logger.debug(f'Running code in {self._name}:\n{code}')
+
+        started = time.monotonic()
+        exit_code, stdout, stderr = await self._wrap_and_execute(code, dir_path)
+        wall_seconds = time.monotonic() - started
 
         duck_logger.debug(f'Exit code: {exit_code}')
         duck_logger.debug(' stdout '.center(20, '-')+f"\n{stdout}")
         duck_logger.debug(' stderr '.center(20, '-')+f"\n{stderr}")
 
-        files = self._read_files(dir_path)
+        contents = await self._fetch_archive(dir_path)
+        usage_json = contents.get(USAGE_FILENAME)
+        contents = {name: data for name, data in contents.items() if not name.startswith(INTERNAL_FILE_PREFIX)}
+        usage = self._build_usage(wall_seconds, usage_json, contents)
+        duck_logger.debug(f'Usage: {usage}')
+        files = self._describe_files(contents)
 
         output = {
             'exit_code': exit_code,
             'stdout': stdout,
             'stderr': stderr,
-            'files': files
+            'files': files,
+            'usage': usage
         }
         return output
 
+    @staticmethod
+    def _build_usage(wall_seconds: float, usage_json: bytes | None, contents: dict[str, bytes]) -> ExecutionUsage:
+        """Combines the host-side wall time with the rusage the run recorded (absent if it was killed)"""
+        sampled = {}
+        if usage_json:
+            try:
+                sampled = json.loads(usage_json.decode())
+            except ValueError:
+                duck_logger.warning("Could not parse execution usage")
+        return {
+            "wall_seconds": wall_seconds,
+            "cpu_seconds": sampled.get("cpu_seconds"),
+            "max_rss_kb": sampled.get("max_rss_kb"),
+            "bytes_written": sum(len(data) for data in contents.values()),
+        }
+
     async def run_code(self, code: str) -> ExecutionResult:
         """Takes python code to execute and an optional dict of files to reference"""
         timeout = self._settings.get("timeout")
+        # each run gets its own output directory, which also identifies it for cancellation
+        dir_path = f'{self._working_dir}/{uuid.uuid4()}'
 
-        # If no timeout, fallback to normal call
-        if not timeout:
-            return await asyncio.to_thread(self._run_code, code)
-
+        self._active_runs.add(dir_path)
         try:
-            # run _run_code in a thread with timeout
-            return await asyncio.wait_for(
-                asyncio.to_thread(self._run_code, code),
-                timeout=timeout
-            )
+            # If no timeout, fallback to normal call
+            if not timeout:
+                return await self._run_code(code, dir_path)
+
+            # cancelling _run_code closes its exec stream
+            return await asyncio.wait_for(self._run_code(code, dir_path), timeout=timeout)
         except asyncio.TimeoutError:
-            # kill any processes inside the container
-            if self._container:
-                self._container.exec_run("pkill -u sandbox", demux=True)
+            # kill only this run's process group; other runs in the container are untouched
+            if self._transport:
+                await self._transport.exec(self._kill_run_command(dir_path))
 
             return {
                 "exit_code": -1,
                 "stdout": "",
                 "stderr": f"Execution timed out after {timeout} seconds",
-                "files": {}
+                "files": {},
+                "usage": {"wall_seconds": float(timeout), "cpu_seconds": None, "max_rss_kb": None, "bytes_written": 0}
             }
+        except asyncio.CancelledError:
+            # e.g. a speculative run whose output turned out to be cached; stop it rather than let it finish
+            if self._transport:
+                await self._transport.exec(self._kill_run_command(dir_path))
+            raise
+        finally:
+            # outputs are in memory (or abandoned) now, so the directory can be reaped
+            self._active_runs.discard(dir_path)
+            self._retrieved_runs.append(dir_path)
+
+    async def reap_outputs(self) -> OutputDiskUsage | None:
+        """Removes retrieved, expired, and over-quota run directories in one exec and returns working_dir usage"""
+        if self._transport is None:
+            return None
+        retrieved, self._retrieved_runs = self._retrieved_runs, []
+        request = {
+            "root": self._working_dir,
+            "active": sorted(self._active_runs),
+            "retrieved": retrieved,
+            "ttl_seconds": self._settings.get("output_ttl_seconds", 3600),
+            "quota_bytes": self._settings.get("output_quota_bytes"),
+        }
+        exit_code, stdout, stderr = await self._transport.exec(["python3", "-c", REAP_OUTPUTS_CODE, json.dumps(request)])
+        if exit_code != 0:
+            # try these directories again next time
+            self._retrieved_runs.extend(retrieved)
+            duck_logger.error(f"Output reaping failed in {self._name}: {stderr.decode(errors='replace')}")
+            return self._disk_usage
+
+        self._disk_usage = json.loads(stdout)
+        duck_logger.debug(f"Reaped outputs in {self._name}: {self._disk_usage}")
+        return self._disk_usage
+
+    def disk_usage(self) -> OutputDiskUsage | None:
+        """working_dir usage as of the last reap"""
+        return self._disk_usage
 
     def describe_dataset(self, dataset_name: str) -> str | None:
         """Return full metadata for a dataset matched by exact staged filename."""
@@ -465,12 +750,236 @@ class PythonExecContainer:
             })
         return inventory
 
+    def get_dataset_versions(self) -> dict[str, str]:
+        """Staged path -> content hash prefix; changes whenever a dataset is restaged with new data"""
+        return {
+            resource["path"]: resource["version"]
+            for resource in self._resource_metadata
+            if resource.get("path") and resource.get("version")
+        }
+
+
+def build_s3_cache(settings: ContainerSettings) -> S3DatasetCache:
+    """S3 objects are cached under <dataset_cache_dir>/s3 unless s3_cache is disabled"""
+    cache_dir = None
+    if settings.get("s3_cache", True):
+        cache_dir = os.path.join(settings.get("dataset_cache_dir", DEFAULT_DATASET_CACHE_DIR), "s3")
+    return S3DatasetCache(cache_dir, settings.get("s3_max_workers", 8))
+
+
+def collect_datasets(
+        resource_data: list[ResourceConfig],
+        s3_cache: S3DatasetCache | None = None,
+        columnar: bool = False
+) -> list[tuple[str, DatasetInfo]]:
+    """
+    Loads every configured resource and returns (container target directory, dataset) pairs.
+    With `columnar`, each CSV is followed by its Arrow IPC copy for the same directory.
+    """
+    datasets = []
+    for resource_info in resource_data:
+        remote_path = resource_info.get("source")
+        target_path = resource_info.get("target")
+        if not remote_path or not target_path:
+            duck_logger.warn(f"Skipping invalid resource entry: {resource_info}")
+            continue
+
+        # determine which case:
+        case = determine_staging_case(remote_path, target_path)
+        match case:
+            case "file: file":
+                datasets.append((os.path.dirname(target_path), get_dataset_info(remote_path, s3_cache)))
+            case "file: folder":
+                datasets.append((target_path, get_dataset_info(remote_path, s3_cache)))
+            case "folder: folder":
+                for dataset in get_folder_info(remote_path, s3_cache):
+                    datasets.append((target_path, dataset))
+
+    if not columnar:
+        return datasets
+    with_copies = []
+    for target_dir, dataset in datasets:
+        with_copies.append((target_dir, dataset))
+        if copy := build_columnar_copy(dataset):
+            with_copies.append((target_dir, copy))
+    return with_copies
+
+
+@dataclass
+class _PoolMember:
+    container: PythonExecContainer
+    in_flight: int = 0
+    completed: int = 0
+    busy_seconds: float = 0.0
+    busy_since: float | None = None
+
+    def start(self):
+        if self.in_flight == 0:
+            self.busy_since = time.monotonic()
+        self.in_flight += 1
+
+    def finish(self):
+        self.in_flight -= 1
+        self.completed += 1
+        if self.in_flight == 0 and self.busy_since is not None:
+            self.busy_seconds += time.monotonic() - self.busy_since
+            self.busy_since = None
+
+    def busy_time(self) -> float:
+        if self.busy_since is None:
+            return self.busy_seconds
+        return self.busy_seconds + time.monotonic() - self.busy_since
+
+
+class ContainerPool:
+    """
+    A group of identical PythonExecContainers that behaves as one logical container.
+
+    Each execution is scheduled onto the member with the fewest in-flight runs,
+    preferring the member that has been busy the least when several are tied.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            members: list[PythonExecContainer],
+            resource_data: list[ResourceConfig] = None,
+            s3_cache: S3DatasetCache | None = None,
+            columnar: bool = False,
+            admission: AdmissionController | None = None
+    ):
+        if not members:
+            raise ValueError(f"Container pool {name} must have at least one member")
+        self._name = name
+        self._members = [_PoolMember(container) for container in members]
+        self._resource_data = resource_data or []
+        self._s3_cache = s3_cache
+        self._columnar = columnar
+        self._admission = admission
+        self._started_at = time.monotonic()
+        self._exit_stack: ExitStack | None = None
+
+    def __enter__(self):
+        # load resources once for the whole pool rather than once per member
+        datasets = collect_datasets(self._resource_data, self._s3_cache, self._columnar)
+        for member in self._members:
+            member.container.use_datasets(datasets)
+
+        with ExitStack() as stack:
+            for member in self._members:
+                stack.enter_context(member.container)
+            self._exit_stack = stack.pop_all()
+        self._started_at = time.monotonic()
+        duck_logger.info(f"Container pool {self._name} started with {len(self._members)} member(s)")
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._exit_stack is not None:
+            self._exit_stack.__exit__(exc_type, exc_val, exc_tb)
+            self._exit_stack = None
+
+    @property
+    def name(self) -> str:
+        return self._name
 
-def build_containers(config: Config) -> dict[str, PythonExecContainer]:
+    @property
+    def members(self) -> list[PythonExecContainer]:
+        return [member.container for member in self._members]
+
+    def _pick_member(self) -> _PoolMember:
+        return min(self._members, key=lambda member: (member.in_flight, member.busy_time()))
+
+    async def run_code(self, code: str, flow: Hashable = None, on_queued: OnQueued | None = None) -> ExecutionResult:
+        """
+        Runs code on the least loaded member. With an admission controller, the run first waits
+        for a slot in fair order among flows (e.g. the requesting (author, thread) pair);
+        `on_queued` is awaited with the queue position when it has to wait.
+        """
+        if self._admission is None:
+            return await self._run_on_member(code)
+        async with self._admission.admit(flow, on_queued):
+            return await self._run_on_member(code)
+
+    def has_free_slot(self) -> bool:
+        """Whether a run would start now rather than queue for admission"""
+        return self._admission is None or self._admission.has_free_slot()
+
+    async def _run_on_member(self, code: str) -> ExecutionResult:
+        member = self._pick_member()
+        member.start()
+        try:
+            return await member.container.run_code(code)
+        finally:
+            member.finish()
+
+    async def reap_outputs(self):
+        for member in self._members:
+            try:
+                await member.container.reap_outputs()
+            except Exception:
+                duck_logger.exception(f"Output reaping failed for {member.container.name}")
+
+    def stats(self) -> ContainerPoolStats:
+        elapsed = max(time.monotonic() - self._started_at, 1e-9)
+        members: list[PoolMemberStats] = [
+            {
+                "name": member.container.name,
+                "in_flight": member.in_flight,
+                "completed": member.completed,
+                "utilisation": min(member.busy_time() / elapsed, 1.0),
+                "disk_usage": member.container.disk_usage(),
+            }
+            for member in self._members
+        ]
+        return {
+            "name": self._name,
+            "size": len(self._members),
+            "in_flight": sum(member.in_flight for member in self._members),
+            # runs sharing a member with an earlier run are waiting on CPU/pids behind it
+            "queue_depth": sum(max(member.in_flight - 1, 0) for member in self._members),
+            "members": members,
+            "admission": self._admission.stats() if self._admission is not None else None,
+        }
+
+    # Members are staged from the same resources, so any one can answer dataset lookups
+    def describe_dataset(self, dataset_name: str) -> str | None:
+        return self._members[0].container.describe_dataset(dataset_name)
+
+    def get_dataset_filenames(self) -> list[str]:
+        return self._members[0].container.get_dataset_filenames()
+
+    def get_dataset_inventory(self) -> list[dict[str, str]]:
+        return self._members[0].container.get_dataset_inventory()
+
+    def get_dataset_versions(self) -> dict[str, str]:
+        return self._members[0].container.get_dataset_versions()
+
+
+def build_admission(settings: ContainerSettings) -> AdmissionController | None:
+    max_concurrent = settings.get('max_concurrent_runs')
+    if not max_concurrent:
+        return None
+    return AdmissionController(int(max_concurrent), settings.get('run_queue_weights'))
+
+
+def build_containers(config: Config) -> dict[str, ContainerPool]:
     # setup container dictionary
     container_config = {}
     for name, c in config.get('containers', {}).items():
-        container_config[name] = PythonExecContainer(c['image'], name, c['resources'], c['settings'])
+        pool_size = max(1, int(c['settings'].get('pool_size', 1)))
+        member_names = [name] if pool_size == 1 else [f"{name}-{i}" for i in range(pool_size)]
+        members = [
+            PythonExecContainer(c['image'], member_name, c['resources'], c['settings'])
+            for member_name in member_names
+        ]
+        container_config[name] = ContainerPool(
+            name,
+            members,
+            c['resources'],
+            build_s3_cache(c['settings']),
+            c['settings'].get('dataset_columnar', False),
+            build_admission(c['settings'])
+        )
     return container_config
 
 
@@ -1,7 +1,13 @@
+import hashlib
+import io
 import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Iterable
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from functools import cached_property
 from typing import Optional
 
 import boto3
@@ -19,6 +25,13 @@ class DatasetInfo:
     # Optional future metadata
     size: Optional[int] = None
     source_path: Optional[str] = None
+    # set on derived copies (e.g. the Arrow IPC copy of a CSV) to the filename they were built from
+    derived_from: Optional[str] = None
+
+    @cached_property
+    def content_hash(self) -> str:
+        """SHA-256 of the staged bytes; cached results are keyed on it, so new data invalidates them"""
+        return hashlib.sha256(self.data).hexdigest()
 
 
 # ======================= #
@@ -28,6 +41,11 @@ class DatasetInfo:
 
 DATASET_EXTENSIONS = {".csv"}
 
+# Extension of the Arrow IPC copy staged next to each CSV when columnar staging is enabled
+COLUMNAR_EXTENSION = ".arrow"
+
+DEFAULT_DATASET_CACHE_DIR = os.path.join(tempfile.gettempdir(), "rubber-duck-datasets")
+
 _s3_client = boto3.client("s3")
 
 
@@ -85,66 +103,182 @@ def _split_s3_path(path: str) -> tuple[str, str]:
     return bucket, key
 
 
-def _get_s3_desc(path: str) -> str:
+@dataclass
+class StagingStats:
+    bytes_fetched: int = 0
+    bytes_reused: int = 0
+    objects_fetched: int = 0
+    objects_reused: int = 0
+
+
+def _error_code(error: ClientError) -> str:
+    return str(getattr(error, "response", {}).get("Error", {}).get("Code", ""))
+
+
+class S3DatasetCache:
+    """
+    Fetches S3 objects concurrently and keeps an on-disk copy keyed by bucket, key, and ETag.
+
+    Objects whose ETag is already known (from a listing) are reused without a request;
+    otherwise a cached copy is revalidated with a conditional GET (If-None-Match).
+    With no cache_dir, nothing is persisted and every object is downloaded.
+    """
+
+    def __init__(self, cache_dir: str | None = None, max_workers: int = 8, client=None):
+        self._root = Path(cache_dir) if cache_dir else None
+        self.max_workers = max(1, max_workers)
+        self.client = client or _s3_client
+        self.stats = StagingStats()
+        self._lock = threading.Lock()
+
+    def _entry_dir(self, bucket: str, key: str) -> Path:
+        return self._root / bucket / hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _etag_filename(etag: str) -> str:
+        return etag.strip('"').replace("/", "_")
+
+    def _cached(self, bucket: str, key: str) -> tuple[str, Path] | None:
+        if self._root is None:
+            return None
+        entry_dir = self._entry_dir(bucket, key)
+        if not entry_dir.is_dir():
+            return None
+        for path in entry_dir.iterdir():
+            if not path.name.startswith("."):
+                return path.name, path
+        return None
+
+    def _store(self, bucket: str, key: str, etag: str, data: bytes):
+        if self._root is None or not etag:
+            return
+        entry_dir = self._entry_dir(bucket, key)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=entry_dir, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        target = entry_dir / self._etag_filename(etag)
+        os.replace(tmp_path, target)
+        for stale in entry_dir.iterdir():
+            if stale != target and not stale.name.startswith("."):
+                stale.unlink(missing_ok=True)
+
+    def _record(self, size: int, fetched: bool):
+        with self._lock:
+            if fetched:
+                self.stats.bytes_fetched += size
+                self.stats.objects_fetched += 1
+            else:
+                self.stats.bytes_reused += size
+                self.stats.objects_reused += 1
+
+    def get(self, bucket: str, key: str, etag: str | None = None) -> bytes:
+        """Returns the object's bytes, reusing the cached copy when its ETag still matches"""
+        cached = self._cached(bucket, key)
+        request = {"Bucket": bucket, "Key": key}
+
+        if cached is not None:
+            cached_etag, cached_path = cached
+            if etag is not None and self._etag_filename(etag) == cached_etag:
+                data = cached_path.read_bytes()
+                self._record(len(data), fetched=False)
+                return data
+            if etag is None:
+                request["IfNoneMatch"] = f'"{cached_etag}"'
+
+        try:
+            obj = self.client.get_object(**request)
+        except ClientError as e:
+            if cached is not None and _error_code(e) in {"304", "NotModified"}:
+                data = cached[1].read_bytes()
+                self._record(len(data), fetched=False)
+                return data
+            raise
+
+        data = obj["Body"].read()
+        self._store(bucket, key, obj.get("ETag", ""), data)
+        self._record(len(data), fetched=True)
+        return data
+
+    def list_etags(self, bucket: str, prefix: str) -> dict[str, str]:
+        """Returns {key: etag} for every object under the prefix"""
+        paginator = self.client.get_paginator("list_objects_v2")
+        etags = {}
+        for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                etags[obj["Key"]] = obj.get("ETag")
+        return etags
+
+
+def _log_staging(path: str, before: StagingStats, after: StagingStats):
+    duck_logger.info(
+        f"Staged {path}: fetched {after.bytes_fetched - before.bytes_fetched} bytes "
+        f"({after.objects_fetched - before.objects_fetched} objects), "
+        f"reused {after.bytes_reused - before.bytes_reused} bytes "
+        f"({after.objects_reused - before.objects_reused} objects)"
+    )
+
+
+def _meta_key(key: str) -> str:
+    return f"{key.rsplit('.', 1)[0]}.meta.json"
+
+
+def _get_s3_desc(path: str, cache: S3DatasetCache, etags: dict[str, str] | None = None) -> str:
     duck_logger.debug(f"Loading S3 metadata for dataset: {path}")
 
     bucket, key = _split_s3_path(path)
-    meta_key = f"{key.rsplit('.', 1)[0]}.meta.json"
+    meta_key = _meta_key(key)
+
+    # a listing tells us up front whether metadata exists, so missing metadata costs no request
+    if etags is not None and meta_key not in etags:
+        return f"Dataset name: {Path(key).name}"
 
     try:
-        obj = _s3_client.get_object(Bucket=bucket, Key=meta_key)
-        metadata = json.loads(obj["Body"].read().decode("utf-8"))
+        raw = cache.get(bucket, meta_key, etags.get(meta_key) if etags else None)
+        metadata = json.loads(raw.decode("utf-8"))
         return _format_description(metadata)
 
     except ClientError as e:
-        if e.response["Error"]["Code"] != "NoSuchKey":
+        if _error_code(e) != "NoSuchKey":
             duck_logger.error(f"Failed to load S3 metadata: s3://{bucket}/{meta_key}", exc_info=True)
         return f"Dataset name: {Path(key).name}"
 
 
-def _get_s3_bytes(path: str) -> bytes:
+def _get_s3_bytes(path: str, cache: S3DatasetCache, etag: str | None = None) -> bytes:
     bucket, key = _split_s3_path(path)
-    obj = _s3_client.get_object(Bucket=bucket, Key=key)
-    data = obj["Body"].read()
-    return data
-
+    return cache.get(bucket, key, etag)
 
-def _iter_s3_dataset_keys(bucket: str, prefix: str) -> Iterable[str]:
-    paginator = _s3_client.get_paginator("list_objects_v2")
 
-    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
-        for obj in sorted(page.get("Contents", []), key=lambda o: o["Key"]):
-            key = obj["Key"]
-            if key.endswith("/"):
-                continue
-            if _is_metadata(key) or not _is_dataset(key):
-                continue
-            yield key
+def _is_s3_dataset_key(key: str) -> bool:
+    return not key.endswith("/") and not _is_metadata(key) and _is_dataset(key)
 
 
-def _get_s3_folder_info(path: str) -> list[DatasetInfo]:
+def _get_s3_folder_info(path: str, cache: S3DatasetCache) -> list[DatasetInfo]:
     duck_logger.debug(f"Loading S3 folder datasets: {path}")
 
     bucket, prefix = _split_s3_path(path)
     if not prefix.endswith("/"):
         prefix += "/"
 
-    datasets: list[DatasetInfo] = []
+    before = replace(cache.stats)
+    etags = cache.list_etags(bucket, prefix)
+    dataset_keys = sorted(key for key in etags if _is_s3_dataset_key(key))
 
-    for key in _iter_s3_dataset_keys(bucket, prefix):
+    def load(key: str) -> DatasetInfo:
         dataset_path = f"s3://{bucket}/{key}"
-        data = _get_s3_bytes(dataset_path)
-
-        datasets.append(
-            DatasetInfo(
-                filename=Path(key).name,
-                description=_get_s3_desc(dataset_path),
-                data=data,
-                size=len(data),
-                source_path=dataset_path,
-            )
+        data = _get_s3_bytes(dataset_path, cache, etags[key])
+        return DatasetInfo(
+            filename=Path(key).name,
+            description=_get_s3_desc(dataset_path, cache, etags),
+            data=data,
+            size=len(data),
+            source_path=dataset_path,
         )
 
+    with ThreadPoolExecutor(max_workers=cache.max_workers) as pool:
+        datasets = list(pool.map(load, dataset_keys))
+
+    _log_staging(path, before, cache.stats)
     return datasets
 
 
@@ -233,22 +367,25 @@ def determine_staging_case(remote_path: str, target_path: str) -> str:
     return ""
 
 
-def get_folder_info(folder_path: str) -> list[DatasetInfo]:
+def get_folder_info(folder_path: str, cache: S3DatasetCache | None = None) -> list[DatasetInfo]:
     return (
-        _get_s3_folder_info(folder_path)
+        _get_s3_folder_info(folder_path, cache or S3DatasetCache())
         if _is_s3(folder_path)
         else _get_local_folder_info(folder_path)
     )
 
 
-def get_dataset_info(file_path: str) -> DatasetInfo:
+def get_dataset_info(file_path: str, cache: S3DatasetCache | None = None) -> DatasetInfo:
     duck_logger.debug(f"Preparing dataset for staging: {file_path}")
 
     filename = Path(file_path).name
 
     if _is_s3(file_path):
-        description = _get_s3_desc(file_path)
-        data = _get_s3_bytes(file_path)
+        cache = cache or S3DatasetCache()
+        before = replace(cache.stats)
+        description = _get_s3_desc(file_path, cache)
+        data = _get_s3_bytes(file_path, cache)
+        _log_staging(file_path, before, cache.stats)
     else:
         description = _get_local_desc(file_path)
         data = _get_local_bytes(file_path)
@@ -262,6 +399,62 @@ def get_dataset_info(file_path: str) -> DatasetInfo:
     )
 
 
+def build_columnar_copy(dataset: DatasetInfo) -> DatasetInfo | None:
+    """
+    Parses a CSV dataset once with pandas and returns an uncompressed Arrow IPC file copy of it,
+    named <stem>.arrow, that the sandbox can memory-map instead of re-parsing the CSV on every run.
+    Returns None if the dataset is not a CSV or cannot be converted.
+    """
+    if Path(dataset.filename).suffix != ".csv":
+        return None
+    try:
+        import pandas as pd
+        import pyarrow as pa
+    except ImportError:
+        duck_logger.warning("pyarrow is not installed; skipping columnar dataset staging")
+        return None
+
+    try:
+        table = pa.Table.from_pandas(pd.read_csv(io.BytesIO(dataset.data)))
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        data = sink.getvalue().to_pybytes()
+    except Exception:
+        duck_logger.exception(f"Failed to build columnar copy of {dataset.filename}")
+        return None
+
+    return DatasetInfo(
+        filename=Path(dataset.filename).stem + COLUMNAR_EXTENSION,
+        description=f"Arrow IPC copy of {dataset.filename}",
+        data=data,
+        size=len(data),
+        source_path=dataset.source_path,
+        derived_from=dataset.filename,
+    )
+
+
+def materialize_dataset(dataset: DatasetInfo, cache_dir: str) -> Path:
+    """
+    Writes the dataset into a content-addressed host directory and returns its path:
+    <cache_dir>/<content_hash>/<filename>. Identical content is written once and shared.
+    """
+    target = Path(cache_dir) / dataset.content_hash / dataset.filename
+    if target.exists():
+        duck_logger.debug(f"Reusing materialized dataset: {target}")
+        return target
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    # write then rename so a concurrent reader never sees a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(dataset.data)
+    os.chmod(tmp_path, 0o444)
+    os.replace(tmp_path, target)
+    duck_logger.debug(f"Materialized dataset: {target}")
+    return target
+
+
 # DEBUG
 
 
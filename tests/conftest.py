@@ -11,5 +11,14 @@ quest_mod = types.ModuleType("quest")
 quest_utils_mod = types.ModuleType("quest.utils")
 quest_utils_mod.quest_logger = logging.getLogger("quest")
 quest_mod.utils = quest_utils_mod
+# steps run directly; tests drive workflows without a workflow manager to record them
+quest_mod.step = lambda func: func
+
+
+def _no_queue(*_args, **_kwargs):
+    raise NotImplementedError("quest queues are not available in tests")
+
+
+quest_mod.queue = _no_queue
 sys.modules.setdefault("quest", quest_mod)
 sys.modules.setdefault("quest.utils", quest_utils_mod)
@@ -0,0 +1,96 @@
+import asyncio
+
+from src.utils.admission import AdmissionController, WAIT_BUCKETS
+
+
+def test_waiting_flows_are_admitted_in_fair_order_and_told_their_position():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1)
+        release = asyncio.Event()
+        order = []
+        positions = {}
+
+        async def run(flow, label):
+            async def on_queued(position):
+                positions[label] = position
+
+            async with controller.admit(flow, on_queued):
+                order.append(label)
+                await release.wait()
+
+        # one student floods their thread before a second student asks once
+        tasks = [asyncio.create_task(run(("ada", 1), f"ada-{i}")) for i in range(4)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(run(("bob", 2), "bob-0")))
+        await asyncio.sleep(0)
+
+        stats = controller.stats()
+        assert (stats["running"], stats["waiting"]) == (1, 4)
+
+        release.set()
+        await asyncio.gather(*tasks)
+        return order, positions, controller.stats()
+
+    order, positions, stats = asyncio.run(scenario())
+
+    assert order == ["ada-0", "bob-0", "ada-1", "ada-2", "ada-3"]
+    assert positions == {"ada-1": 1, "ada-2": 2, "ada-3": 3, "bob-0": 1}
+    assert stats["admitted"] == 5
+    assert (stats["running"], stats["waiting"]) == (0, 0)
+    assert sum(count for _, count in stats["wait_histogram"]) == 5
+    assert len(stats["wait_histogram"]) == len(WAIT_BUCKETS) + 1
+
+
+def test_weighted_flow_gets_a_larger_share():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, weights={"ta": 2.0})
+        release = asyncio.Event()
+        order = []
+
+        async def run(flow):
+            async with controller.admit(flow):
+                order.append(flow[0])
+                await release.wait()
+
+        blocker = asyncio.create_task(run(("first", 0)))
+        await asyncio.sleep(0)
+        tasks = [asyncio.create_task(run((author, 1))) for author in ["student"] * 3 + ["ta"] * 4]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(blocker, *tasks)
+        return order[1:]
+
+    order = asyncio.run(scenario())
+
+    assert order[:6].count("ta") == 4
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1)
+        release = asyncio.Event()
+        admitted = []
+
+        async def run(label):
+            async with controller.admit(label):
+                admitted.append(label)
+                await release.wait()
+
+        running = asyncio.create_task(run("a"))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(run("b"))
+        waiting = asyncio.create_task(run("c"))
+        await asyncio.sleep(0)
+
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert controller.stats()["waiting"] == 1
+
+        release.set()
+        await asyncio.gather(running, waiting)
+        return admitted, controller.stats()
+
+    admitted, stats = asyncio.run(scenario())
+
+    assert admitted == ["a", "c"]
+    assert stats["running"] == 0
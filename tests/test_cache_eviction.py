@@ -0,0 +1,78 @@
+import sys
+import types
+from datetime import datetime, timezone
+
+
+boto3_stub = types.ModuleType("boto3")
+boto3_stub.client = lambda *_args, **_kwargs: types.SimpleNamespace()
+sys.modules.setdefault("boto3", boto3_stub)
+
+botocore_stub = types.ModuleType("botocore")
+botocore_exceptions_stub = types.ModuleType("botocore.exceptions")
+
+
+class _ClientError(Exception):
+    pass
+
+
+botocore_exceptions_stub.ClientError = _ClientError
+botocore_stub.exceptions = botocore_exceptions_stub
+sys.modules.setdefault("botocore", botocore_stub)
+sys.modules.setdefault("botocore.exceptions", botocore_exceptions_stub)
+
+from src.armory.cache_eviction import GreedyDualSizePolicy, build_eviction_policy
+from src.armory.tool_cache import CacheEntryBuilder, InMemoryToolCache
+
+
+def _write(cache, key: str, stdout: str):
+    builder = CacheEntryBuilder()
+    builder.set_stdout(stdout)
+    cache.write_entry(key, builder)
+
+
+def _cached(cache, key: str) -> bool:
+    return cache.load_entry(key) is not None
+
+
+def test_greedy_dual_size_prefers_expensive_small_and_frequently_hit_entries():
+    policy = GreedyDualSizePolicy()
+    now = datetime.now(timezone.utc)
+
+    cheap = policy.priority(0, 1_000, 0.1, now)
+    expensive = policy.priority(0, 1_000, 5.0, now)
+    large = policy.priority(0, 100_000, 5.0, now)
+    popular = policy.priority(9, 1_000, 0.1, now)
+
+    assert large < cheap < popular < expensive
+
+    policy.evicted(cheap)
+    assert policy.clock == cheap
+    # after aging, a fresh cheap entry outranks the one that was evicted
+    assert policy.priority(0, 1_000, 0.1, now) > cheap
+
+
+def test_in_memory_cache_evicts_on_insert_by_policy_within_budget():
+    cache = InMemoryToolCache(policy=build_eviction_policy("gds"), max_bytes=250)
+
+    _write(cache, "slow", "s" * 100)
+    cache.set_cost("slow", 30.0)
+    _write(cache, "fast", "f" * 100)
+    cache.set_cost("fast", 0.05)
+    _write(cache, "new", "n" * 100)
+
+    assert cache.used_bytes <= 250
+    assert _cached(cache, "slow")
+    assert not _cached(cache, "fast")
+    # the entry just written is never the victim, even if it is the cheapest
+    assert _cached(cache, "new")
+
+
+def test_lru_entry_budget_keeps_recently_hit_entries():
+    cache = InMemoryToolCache(max_entries=2)
+
+    _write(cache, "a", "a")
+    _write(cache, "b", "b")
+    cache.get_or_none("a")
+    _write(cache, "c", "c")
+
+    assert [_cached(cache, key) for key in ["a", "b", "c"]] == [True, False, True]
@@ -0,0 +1,128 @@
+import asyncio
+import sys
+import types
+
+
+boto3_stub = types.ModuleType("boto3")
+boto3_stub.client = lambda *_args, **_kwargs: types.SimpleNamespace()
+sys.modules.setdefault("boto3", boto3_stub)
+
+botocore_stub = types.ModuleType("botocore")
+botocore_exceptions_stub = types.ModuleType("botocore.exceptions")
+
+
+class _ClientError(Exception):
+    pass
+
+
+botocore_exceptions_stub.ClientError = _ClientError
+botocore_stub.exceptions = botocore_exceptions_stub
+sys.modules.setdefault("botocore", botocore_stub)
+sys.modules.setdefault("botocore.exceptions", botocore_exceptions_stub)
+
+from src.armory.cache_prewarm import CachePrewarmer, mine_prewarm_items
+from src.armory.tool_cache import CacheKey, InMemoryToolCache
+
+
+class _KeyBuilder:
+    async def build_cache_key(self, user_intent: str, code: str) -> CacheKey:
+        return CacheKey(dataset=["grades.csv"], analysis=[user_intent])
+
+
+class _Pool:
+    name = "sandbox"
+
+    def __init__(self):
+        self.runs = []
+        self.active = 0
+        self.peak = 0
+        self.versions = {}
+
+    def get_dataset_versions(self):
+        return dict(self.versions)
+
+    def has_free_slot(self):
+        return True
+
+    async def run_code(self, code, flow=None, on_queued=None):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        self.runs.append(code)
+        if "boom" in code:
+            raise RuntimeError("sandbox unavailable")
+        exit_code = 1 if "fail" in code else 0
+        return {"exit_code": exit_code, "stdout": f"out of {code}", "stderr": "", "files": {}}
+
+
+def test_prewarm_fills_the_cache_reports_and_resumes(tmp_path):
+    pool = _Pool()
+    cache = InMemoryToolCache()
+    progress = tmp_path / "progress.jsonl"
+    prewarmer = CachePrewarmer(pool, cache, _KeyBuilder(), progress, max_concurrency=2)
+    items = [{"user_intent": f"mean of column {i}", "code": f"print({i})"} for i in range(5)]
+    items.append({"user_intent": "broken", "code": "fail()"})
+    items.append({"user_intent": "unreachable", "code": "boom()"})
+
+    report = asyncio.run(prewarmer.run(items))
+
+    assert pool.peak <= 2
+    assert report["items"] == 7
+    assert report["created"] == 5
+    assert report["failed"] == 1
+    assert report["errors"] == 1
+    # exact and semantic keys per run, including the failed run's partial output
+    assert report["entries_created"] == 12
+    assert report["bytes_stored"] > 0
+    assert cache.count_entries() == 12
+
+    pool.runs.clear()
+    resumed = asyncio.run(prewarmer.run(items))
+
+    # only the errored item is replayed
+    assert pool.runs == ["boom()"]
+    assert resumed["resumed"] == 6
+    assert resumed["created"] == 5
+    assert resumed["entries_created"] == report["entries_created"]
+
+    # restaged data makes earlier progress stale, so every item is warmed again
+    pool.runs.clear()
+    pool.versions = {"/d/grades.csv": "def"}
+    restaged = asyncio.run(prewarmer.run(items))
+
+    assert len(pool.runs) == 7
+    assert restaged["resumed"] == 0
+
+
+def test_mine_prewarm_items_keeps_recurring_requests_most_frequent_first():
+    calls = [
+        {"name": "run_python", "arguments": {"user_intent": "Plot grades", "code": "plot()"}},
+        {"name": "run_python", "arguments": {"user_intent": "mean", "code": "print(1)"}},
+        {"name": "run_python", "arguments": {"user_intent": "mean", "code": "print( 1 )  # again"}},
+        {"name": "run_python", "arguments": {"user_intent": "mean", "code": "print(1)"}},
+        {"name": "run_python", "arguments": {"user_intent": "plot grades", "code": "plot()"}},
+        {"name": "run_python", "arguments": {"user_intent": "once", "code": "print(2)"}},
+        # recorded again by a resumed conversation
+        {"call_id": "c1", "name": "run_python", "arguments": {"user_intent": "twice", "code": "print(3)"}},
+        {"call_id": "c1", "name": "run_python", "arguments": {"user_intent": "twice", "code": "print(3)"}},
+        {"name": "describe", "arguments": {"user_intent": "mean", "code": "print(1)"}},
+    ]
+
+    items = mine_prewarm_items(calls, "run_python", min_count=2)
+
+    assert [item["user_intent"] for item in items] == ["mean", "Plot grades"]
+
+
+def test_prewarm_lookups_are_not_counted_as_cache_accesses(tmp_path):
+    cache = InMemoryToolCache()
+    progress = tmp_path / "progress.jsonl"
+    items = [{"user_intent": "mean of scores", "code": "print(1)"}]
+
+    asyncio.run(CachePrewarmer(_Pool(), cache, _KeyBuilder(), progress).run(items))
+    progress.unlink()
+    report = asyncio.run(CachePrewarmer(_Pool(), cache, _KeyBuilder(), progress).run(items))
+
+    assert report["already_cached"] == 1
+    assert cache.lookup_stats.snapshot() == {}
+    assert {entry["hits"] for entry in cache.list_entries()} == {0}
@@ -0,0 +1,123 @@
+import asyncio
+import sys
+import types
+
+
+boto3_stub = types.ModuleType("boto3")
+boto3_stub.client = lambda *_args, **_kwargs: types.SimpleNamespace()
+sys.modules.setdefault("boto3", boto3_stub)
+
+botocore_stub = types.ModuleType("botocore")
+botocore_exceptions_stub = types.ModuleType("botocore.exceptions")
+
+
+class _ClientError(Exception):
+    pass
+
+
+botocore_exceptions_stub.ClientError = _ClientError
+botocore_stub.exceptions = botocore_exceptions_stub
+sys.modules.setdefault("botocore", botocore_stub)
+sys.modules.setdefault("botocore.exceptions", botocore_exceptions_stub)
+
+from src.utils.admission import AdmissionController
+from src.utils.python_exec_container import ContainerPool
+
+
+class _FakeContainer:
+    def __init__(self, name, release: asyncio.Event | None = None):
+        self.name = name
+        self.entered = False
+        self.runs = []
+        self._release = release
+
+    def use_datasets(self, datasets):
+        self.datasets = datasets
+
+    def __enter__(self):
+        self.entered = True
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.entered = False
+
+    async def run_code(self, code):
+        self.runs.append(code)
+        if self._release is not None:
+            await self._release.wait()
+        return {"exit_code": 0, "stdout": self.name, "stderr": "", "files": {}}
+
+    def disk_usage(self):
+        return None
+
+    def get_dataset_inventory(self):
+        return [{"filename": "a.csv", "path": "/d/a.csv", "dataset_name": "A"}]
+
+
+def test_pool_spreads_concurrent_runs_across_least_loaded_members():
+    async def scenario():
+        release = asyncio.Event()
+        members = [_FakeContainer(f"sandbox-{i}", release) for i in range(3)]
+        pool = ContainerPool("sandbox", members)
+
+        tasks = [asyncio.create_task(pool.run_code(f"print({i})")) for i in range(4)]
+        await asyncio.sleep(0)
+
+        stats = pool.stats()
+        assert stats["size"] == 3
+        assert stats["in_flight"] == 4
+        assert stats["queue_depth"] == 1
+        assert sorted(member["in_flight"] for member in stats["members"]) == [1, 1, 2]
+
+        release.set()
+        results = await asyncio.gather(*tasks)
+        return members, pool, results
+
+    members, pool, results = asyncio.run(scenario())
+
+    assert {result["stdout"] for result in results} == {"sandbox-0", "sandbox-1", "sandbox-2"}
+    assert all(member.runs for member in members)
+    stats = pool.stats()
+    assert stats["in_flight"] == 0
+    assert stats["queue_depth"] == 0
+    assert sum(member["completed"] for member in stats["members"]) == 4
+
+
+def test_pool_enters_and_exits_every_member_and_serves_dataset_lookups():
+    members = [_FakeContainer("sandbox-0"), _FakeContainer("sandbox-1")]
+
+    with ContainerPool("sandbox", members) as pool:
+        assert all(member.entered for member in members)
+        assert pool.get_dataset_inventory()[0]["filename"] == "a.csv"
+
+    assert not any(member.entered for member in members)
+
+
+def test_pool_admission_limits_concurrency_and_reports_queue_position():
+    async def scenario():
+        release = asyncio.Event()
+        members = [_FakeContainer("sandbox-0", release), _FakeContainer("sandbox-1", release)]
+        pool = ContainerPool("sandbox", members, admission=AdmissionController(max_concurrent=1))
+        positions = []
+
+        async def on_queued(position):
+            positions.append(position)
+
+        tasks = [
+            asyncio.create_task(pool.run_code(f"print({i})", ("ada", i), on_queued))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0)
+
+        stats = pool.stats()
+        assert stats["in_flight"] == 1
+        assert (stats["admission"]["running"], stats["admission"]["waiting"]) == (1, 2)
+
+        release.set()
+        await asyncio.gather(*tasks)
+        return positions, pool.stats()
+
+    positions, stats = asyncio.run(scenario())
+
+    assert positions == [1, 2]
+    assert stats["admission"]["admitted"] == 3
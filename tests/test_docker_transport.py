@@ -0,0 +1,120 @@
+import asyncio
+import json
+import struct
+import threading
+
+import pytest
+from docker.errors import NotFound
+
+from src.utils.docker_transport import AsyncDockerTransport, demux_stream
+
+
+def _frame(stream: int, payload: bytes) -> bytes:
+    return struct.pack(">BxxxL", stream, len(payload)) + payload
+
+
+class _FakeDockerDaemon:
+    """Serves the handful of Engine API endpoints the transport uses over a Unix socket."""
+
+    def __init__(self):
+        self.execs: dict[str, list[str]] = {}
+        self.archives: dict[str, bytes] = {}
+        self.stream_closed = asyncio.Event()
+
+    async def handle(self, reader, writer):
+        request_line = (await reader.readline()).decode()
+        method, target, _ = request_line.split(" ", 2)
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+        path, _, query = target.partition("?")
+
+        if method == "POST" and path.endswith("/exec"):
+            exec_id = f"exec{len(self.execs)}"
+            self.execs[exec_id] = json.loads(body)["Cmd"]
+            self._respond(writer, 201, json.dumps({"Id": exec_id}).encode())
+        elif method == "POST" and path.endswith("/start"):
+            cmd = self.execs[path.split("/")[-2]]
+            writer.write(b"HTTP/1.1 101 UPGRADED\r\nContent-Type: application/vnd.docker.raw-stream\r\n"
+                         b"Connection: Upgrade\r\nUpgrade: tcp\r\n\r\n")
+            if cmd[0] == "hang":
+                await writer.drain()
+                await reader.read()
+                self.stream_closed.set()
+            else:
+                writer.write(_frame(1, cmd[1].encode()) + _frame(2, b"warn\n") + _frame(1, b"!"))
+        elif method == "GET" and path.endswith("/json"):
+            cmd = self.execs[path.split("/")[-2]]
+            self._respond(writer, 200, json.dumps({"Running": False, "ExitCode": int(cmd[2])}).encode())
+        elif method == "GET" and path.endswith("/archive"):
+            archive_path = query.split("=", 1)[1]
+            if archive_path not in self.archives:
+                self._respond(writer, 404, b'{"message": "no such file"}')
+            else:
+                data = self.archives[archive_path]
+                writer.write(b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n")
+                for start in range(0, len(data), 3):
+                    chunk = data[start:start + 3]
+                    writer.write(f"{len(chunk):x}\r\n".encode() + chunk + b"\r\n")
+                writer.write(b"0\r\n\r\n")
+        elif method == "PUT" and path.endswith("/archive"):
+            self.archives[query.split("=", 1)[1]] = body
+            self._respond(writer, 200, b"")
+        await writer.drain()
+        writer.close()
+
+    @staticmethod
+    def _respond(writer, status: int, body: bytes):
+        writer.write(f"HTTP/1.1 {status} X\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+
+
+def _with_daemon(tmp_path, scenario):
+    socket_path = str(tmp_path / "docker.sock")
+
+    async def main():
+        daemon = _FakeDockerDaemon()
+        server = await asyncio.start_unix_server(daemon.handle, socket_path, backlog=1024)
+        async with server:
+            return await scenario(daemon, AsyncDockerTransport("sandbox", socket_path))
+
+    return asyncio.run(main())
+
+
+def test_demux_stream_splits_stdout_and_stderr_frames():
+    data = _frame(1, b"out") + _frame(2, b"err") + _frame(1, b"put")
+    assert demux_stream(data) == (b"output", b"err")
+
+
+def test_exec_returns_demuxed_output_and_exit_code_without_extra_threads(tmp_path):
+    async def scenario(daemon, transport):
+        threads_before = threading.active_count()
+        results = await asyncio.gather(*[transport.exec(["echo", f"run{i}", str(i % 3)]) for i in range(200)])
+        return results, threads_before, threading.active_count()
+
+    results, threads_before, threads_after = _with_daemon(tmp_path, scenario)
+
+    assert results[0] == (0, b"run0!", b"warn\n")
+    assert results[7] == (1, b"run7!", b"warn\n")
+    assert threads_after == threads_before
+
+
+def test_cancelling_exec_closes_attach_stream(tmp_path):
+    async def scenario(daemon, transport):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(transport.exec(["hang"]), timeout=0.1)
+        await asyncio.wait_for(daemon.stream_closed.wait(), timeout=1)
+
+    _with_daemon(tmp_path, scenario)
+
+
+def test_archive_round_trip_and_missing_path(tmp_path):
+    async def scenario(daemon, transport):
+        await transport.put_archive("/out", b"tar-bytes-here")
+        data = await transport.get_archive("/out")
+        with pytest.raises(NotFound):
+            await transport.get_archive("/missing")
+        return data
+
+    assert _with_daemon(tmp_path, scenario) == b"tar-bytes-here"
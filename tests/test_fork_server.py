@@ -0,0 +1,72 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src.utils.fork_server import build_fork_server_code, build_fork_client_code, FORK_SERVER_UNAVAILABLE
+
+
+SETUP_CODE = "import sys\nGREETING = 'preloaded'\n"
+
+
+@pytest.fixture
+def fork_server(tmp_path):
+    socket_path = str(tmp_path / "fork.sock")
+    server = subprocess.Popen([sys.executable, "-c", build_fork_server_code(SETUP_CODE, socket_path=socket_path)])
+    deadline = time.monotonic() + 10
+    while not (tmp_path / "fork.sock").exists():
+        if time.monotonic() > deadline:
+            server.kill()
+            pytest.fail("fork server did not start")
+        time.sleep(0.05)
+    yield socket_path
+    server.kill()
+    server.wait()
+
+
+def _run(socket_path: str, outdir: str, code: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", build_fork_client_code(socket_path), outdir, code],
+        capture_output=True,
+        text=True,
+        timeout=10,
+    )
+
+
+def test_fork_server_keeps_stdout_stderr_and_runs_in_output_dir(fork_server, tmp_path):
+    outdir = tmp_path / "out"
+    outdir.mkdir()
+
+    result = _run(
+        fork_server,
+        str(outdir),
+        "import os\nprint(GREETING, os.getcwd(), outdir)\nprint('warn', file=sys.stderr)",
+    )
+
+    assert result.returncode == 0
+    assert result.stdout == f"preloaded {outdir} {outdir}\n"
+    assert result.stderr == "warn\n"
+
+
+def test_fork_server_reports_python_c_exit_codes(fork_server, tmp_path):
+    assert _run(fork_server, str(tmp_path), "sys.exit(3)").returncode == 3
+
+    failed = _run(fork_server, str(tmp_path), "raise ValueError('boom')")
+    assert failed.returncode == 1
+    assert failed.stderr.startswith("Traceback (most recent call last):\n  File \"<string>\"")
+    assert failed.stderr.endswith("ValueError: boom\n")
+
+
+def test_fork_server_children_do_not_share_state(fork_server, tmp_path):
+    assert _run(fork_server, str(tmp_path), "GREETING = 'changed'").returncode == 0
+
+    result = _run(fork_server, str(tmp_path), "print(GREETING)")
+
+    assert result.stdout == "preloaded\n"
+
+
+def test_client_reports_unavailable_without_server(tmp_path):
+    result = _run(str(tmp_path / "missing.sock"), str(tmp_path), "print(1)")
+
+    assert result.returncode == FORK_SERVER_UNAVAILABLE
@@ -0,0 +1,181 @@
+import asyncio
+import sys
+import types
+from contextlib import asynccontextmanager
+
+
+boto3_stub = types.ModuleType("boto3")
+boto3_stub.client = lambda *_args, **_kwargs: types.SimpleNamespace()
+sys.modules.setdefault("boto3", boto3_stub)
+
+botocore_stub = types.ModuleType("botocore")
+botocore_exceptions_stub = types.ModuleType("botocore.exceptions")
+
+
+class _ClientError(Exception):
+    pass
+
+
+botocore_exceptions_stub.ClientError = _ClientError
+botocore_stub.exceptions = botocore_exceptions_stub
+sys.modules.setdefault("botocore", botocore_stub)
+sys.modules.setdefault("botocore.exceptions", botocore_exceptions_stub)
+
+from src.armory.armory import Armory
+from src.gen_ai.gen_ai import STREAMING_CURSOR, Agent, AIClient, _split_streamed
+from src.utils.protocols import ConversationComplete
+
+
+class _MessageItem:
+    type = "message"
+
+    def __init__(self, text: str):
+        self._text = text
+
+    def model_dump(self, exclude_none=False):
+        return {"type": "message", "role": "assistant", "content": [{"type": "output_text", "text": self._text}]}
+
+
+class DiscordServerError(Exception):
+    status = 503
+
+
+class _FakeResponses:
+    def __init__(self, deltas: list[str], fail_after: int | None = None):
+        self._deltas = deltas
+        # the first stream raises after this many deltas
+        self._fail_after = fail_after
+        self.calls = []
+
+    async def create(self, **params):
+        self.calls.append(params)
+        response = types.SimpleNamespace(output=[_MessageItem("".join(self._deltas))], usage=None)
+        if not params.get("stream"):
+            return response
+
+        fail_after = self._fail_after if len(self.calls) == 1 else None
+
+        async def events():
+            for i, delta in enumerate(self._deltas):
+                if i == fail_after:
+                    raise DiscordServerError("stream dropped")
+                await asyncio.sleep(0)
+                yield types.SimpleNamespace(type="response.output_text.delta", delta=delta)
+            yield types.SimpleNamespace(type="response.completed", response=response)
+
+        return events()
+
+
+@asynccontextmanager
+async def _typing(_channel_id):
+    yield
+
+
+def _conversation(monkeypatch, deltas: list[str], streaming, fail_after: int | None = None, max_retries: int = 0):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    discord_calls, replies, latency = [], [], []
+
+    async def send_message(channel_id, message=None, file=None, view=None):
+        discord_calls.append(("send", message))
+        return 100 + len(discord_calls)
+
+    async def edit_message(channel_id, message_id, new_content):
+        discord_calls.append(("edit", new_content))
+
+    async def delete_message(channel_id, message_id):
+        discord_calls.append(("delete", message_id))
+
+    async def record(*args):
+        pass
+
+    async def record_latency(*args):
+        latency.append(args[5:])
+
+    client = AIClient(
+        Armory(send_message), _typing, record, record,
+        {"max_retries": max_retries, "delay": 0, "backoff": 1},
+        send_message, edit_message, streaming, record_latency, delete_message
+    )
+    client._client = types.SimpleNamespace(responses=_FakeResponses(deltas, fail_after))
+    user_messages = iter(["hi"])
+
+    async def get_user_message(ctx):
+        try:
+            return next(user_messages)
+        except StopIteration:
+            raise ConversationComplete()
+
+    async def send_user_message(ctx, message):
+        replies.append(message)
+
+    ctx = types.SimpleNamespace(guild_id=1, parent_channel_id=2, thread_id=3, author_id=4)
+    agent = Agent(name="duck", prompt="Be helpful", model="gpt-5-mini", tools=[])
+    history = asyncio.run(client.run_conversation(ctx, agent, get_user_message, send_user_message))
+    return discord_calls, replies, latency, history
+
+
+def test_streamed_replies_are_posted_at_the_first_token_and_edited_in_place(monkeypatch):
+    calls, replies, latency, history = _conversation(
+        monkeypatch, ["Hel", "lo ", "there"], {"edit_interval_seconds": 0}
+    )
+
+    assert calls == [
+        ("send", "Hel" + STREAMING_CURSOR),
+        ("edit", "Hello " + STREAMING_CURSOR),
+        ("edit", "Hello there" + STREAMING_CURSOR),
+        ("edit", "Hello there"),
+    ]
+    # posted while streaming, so not sent again
+    assert replies == []
+    assert history[-1]["content"][0]["text"] == "Hello there"
+    [(streamed, first_token_seconds, total_seconds, edits)] = latency
+    assert streamed and edits == 3
+    assert 0 <= first_token_seconds <= total_seconds
+
+
+def test_edits_are_throttled_and_replies_are_sent_whole_without_streaming(monkeypatch):
+    calls, replies, latency, _ = _conversation(monkeypatch, ["Hel", "lo ", "there"], {"edit_interval_seconds": 60})
+
+    assert calls == [("send", "Hel" + STREAMING_CURSOR), ("edit", "Hello there")]
+    assert replies == []
+
+    calls, replies, latency, _ = _conversation(monkeypatch, ["Hel", "lo ", "there"], None)
+
+    assert calls == []
+    assert replies == ["Hello there"]
+    [(streamed, first_token_seconds, total_seconds, edits)] = latency
+    assert not streamed and edits == 0
+    # the whole reply arrives at once
+    assert 0 <= first_token_seconds <= total_seconds
+
+
+def test_a_failed_stream_is_withdrawn_before_the_retry_streams_the_reply_again(monkeypatch):
+    calls, replies, latency, history = _conversation(
+        monkeypatch, ["Hel", "lo ", "there"], {"edit_interval_seconds": 0}, fail_after=2, max_retries=1
+    )
+
+    retry_notice = calls[3]
+    assert calls[:3] == [("send", "Hel" + STREAMING_CURSOR), ("edit", "Hello " + STREAMING_CURSOR), ("delete", 101)]
+    assert retry_notice[0] == "send" and "Retrying" in retry_notice[1]
+    assert calls[4:] == [
+        ("send", "Hel" + STREAMING_CURSOR),
+        ("edit", "Hello " + STREAMING_CURSOR),
+        ("edit", "Hello there" + STREAMING_CURSOR),
+        ("edit", "Hello there"),
+    ]
+    # the partial reply is never finalised, and only one complete reply remains
+    assert ("edit", "Hello ") not in calls
+    assert replies == []
+    assert history[-1]["content"][0]["text"] == "Hello there"
+    assert len(latency) == 1
+
+
+def test_long_streamed_text_is_split_at_line_breaks_with_balanced_fences():
+    text = "intro\n```python\n" + "x = 1\n" * 30 + "```\nafter"
+
+    head, tail = _split_streamed(text, limit=60)
+
+    assert len(head) <= 60
+    assert head.endswith("\n```") and head.count("```") == 2
+    assert tail.startswith("```\n")
+    assert head[:-len("\n```")] + "\n" + tail[len("```\n"):] == text
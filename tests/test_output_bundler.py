@@ -0,0 +1,93 @@
+import asyncio
+import sys
+import types
+from datetime import datetime, timezone
+
+
+boto3_stub = types.ModuleType("boto3")
+boto3_stub.client = lambda *_args, **_kwargs: types.SimpleNamespace()
+sys.modules.setdefault("boto3", boto3_stub)
+
+botocore_stub = types.ModuleType("botocore")
+botocore_exceptions_stub = types.ModuleType("botocore.exceptions")
+
+
+class _ClientError(Exception):
+    pass
+
+
+botocore_exceptions_stub.ClientError = _ClientError
+botocore_stub.exceptions = botocore_exceptions_stub
+sys.modules.setdefault("botocore", botocore_stub)
+sys.modules.setdefault("botocore.exceptions", botocore_exceptions_stub)
+
+from src.armory.output_bundler import MAX_MESSAGE_CHARS, OutputBundler, SendTally
+from src.armory.tool_cache import CacheEntry, send_cache_entry
+
+
+def _recorder():
+    calls = []
+
+    async def send_message(channel_id, message=None, file=None):
+        calls.append((message, file))
+        return len(calls)
+
+    return calls, send_message
+
+
+def test_outputs_are_packed_into_the_fewest_messages():
+    bundler = OutputBundler()
+    for i in range(12):
+        bundler.add_file(f"plot{i}.png", b"png")
+    bundler.add_text("```\n| a |\n```")
+    bundler.add_text("```\n| b |\n```")
+    bundler.add_text("mean: 85.5")
+    calls, send_message = _recorder()
+
+    stats = asyncio.run(bundler.send(send_message, 1))
+
+    assert stats == {"outputs": 15, "messages": 2}
+    text, files = calls[0]
+    assert text == "```\n| a |\n```\n```\n| b |\n```\nmean: 85.5"
+    assert [file["filename"] for file in files] == [f"plot{i}.png" for i in range(10)]
+    assert calls[1][0] is None
+    assert [file["filename"] for file in calls[1][1]] == ["plot10.png", "plot11.png"]
+
+
+def test_text_over_the_message_limit_starts_a_new_message_in_order():
+    bundler = OutputBundler()
+    bundler.add_text("a" * (MAX_MESSAGE_CHARS - 10))
+    bundler.add_text("b" * 20)
+    bundler.add_text("c" * 5)
+    bundler.add_text("d" * (MAX_MESSAGE_CHARS * 2))
+    calls, send_message = _recorder()
+
+    asyncio.run(bundler.send(send_message, 1))
+
+    assert [message[0] for message, _ in calls] == ["a", "b", "d"]
+    assert calls[1][0] == "b" * 20 + "\n" + "c" * 5
+    assert all(file is None for _, file in calls)
+
+
+def test_cached_entries_are_bundled_and_savings_tallied_per_conversation():
+    now = datetime.now(timezone.utc)
+    entry = CacheEntry(
+        stdout="done",
+        tables=[{"filename": "summary.csv", "description": "", "chunks": ["```\n1\n```", "```\n2\n```"]}],
+        files={"a.png": {"bytes": b"a", "description": ""}, "b.png": {"bytes": b"b", "description": ""}},
+        created_at=now, last_access=now, hit_count=0, expires_at=now,
+    )
+    tally = SendTally(max_conversations=1)
+    calls, send_message = _recorder()
+
+    output = asyncio.run(send_cache_entry(entry, send_message, 7, tally))
+    asyncio.run(send_cache_entry(entry, send_message, 7, tally))
+
+    assert len(calls) == 2
+    assert output["files"] == {"a.png": "", "b.png": "", "summary.csv": ""}
+    assert tally.get(7) == {"outputs": 10, "messages": 2}
+    assert tally.saved(7) == 8
+
+    asyncio.run(send_cache_entry(entry, send_message, 8, tally))
+    # only the most recent conversations are kept
+    assert tally.get(7) == {"outputs": 0, "messages": 0}
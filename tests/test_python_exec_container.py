@@ -0,0 +1,356 @@
+import asyncio
+import os
+import io
+import json
+import posixpath
+import signal
+import subprocess
+import sys
+import tarfile
+import time
+import types
+from textwrap import dedent
+
+import docker
+import pytest
+from docker.errors import NotFound
+
+
+boto3_stub = types.ModuleType("boto3")
+boto3_stub.client = lambda *_args, **_kwargs: types.SimpleNamespace()
+sys.modules.setdefault("boto3", boto3_stub)
+
+botocore_stub = types.ModuleType("botocore")
+botocore_exceptions_stub = types.ModuleType("botocore.exceptions")
+
+
+class _ClientError(Exception):
+    pass
+
+
+botocore_exceptions_stub.ClientError = _ClientError
+botocore_stub.exceptions = botocore_exceptions_stub
+sys.modules.setdefault("botocore", botocore_stub)
+sys.modules.setdefault("botocore.exceptions", botocore_exceptions_stub)
+
+from src.utils.python_exec_container import PythonExecContainer, SANDBOX_SETUP_CODE
+from src.utils.resource_staging import DatasetInfo, build_columnar_copy
+
+
+class _FakeDockerContainer:
+    """In-memory stand-in for a docker-py container; `program` decides what a python exec writes."""
+
+    def __init__(self, name, program):
+        self.name = name
+        self.files: dict[str, bytes] = {}
+        self.dirs: set[str] = set()
+        self.calls: list[str] = []
+        self._program = program
+
+    def exec_run(self, cmd, workdir=None, demux=False, detach=False, **_kwargs):
+        self.calls.append("exec_run")
+        if cmd[0] == "python3":
+            exit_code, stdout, stderr, outputs = self._program()
+            for filename, data in outputs.items():
+                self.files[posixpath.join(workdir, filename)] = data
+            return types.SimpleNamespace(exit_code=exit_code, output=(stdout, stderr))
+        if cmd[:2] == ["mkdir", "-p"]:
+            self.dirs.update(cmd[2:])
+        return types.SimpleNamespace(exit_code=0, output=(None, None) if demux else b"")
+
+    def get_archive(self, path):
+        self.calls.append("get_archive")
+        prefix = path.rstrip("/") + "/"
+        members = {name: data for name, data in self.files.items() if name.startswith(prefix)}
+        if not members and path.rstrip("/") not in self.dirs:
+            raise NotFound(f"{path} not found")
+
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for name, data in members.items():
+                info = tarfile.TarInfo(name=posixpath.basename(path.rstrip("/")) + "/" + name[len(prefix):])
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return [buffer.getvalue()], {}
+
+    def put_archive(self, path, data):
+        self.calls.append("put_archive")
+        return True
+
+    def stop(self):
+        pass
+
+    def remove(self):
+        pass
+
+
+class _FakeContainers:
+    def __init__(self, program):
+        self._program = program
+        self.created: list[_FakeDockerContainer] = []
+
+    def get(self, name):
+        raise NotFound(name)
+
+    def run(self, image, name=None, **kwargs):
+        container = _FakeDockerContainer(name, self._program)
+        container.run_kwargs = kwargs
+        self.created.append(container)
+        return container
+
+
+@pytest.fixture
+def make_container(monkeypatch):
+    def _make(program, settings=None, resources=None):
+        client = types.SimpleNamespace(ping=lambda: True, containers=_FakeContainers(program))
+        monkeypatch.setattr(docker, "from_env", lambda: client)
+        container = PythonExecContainer(
+            "sandbox-image", "sandbox", resources or [], settings or {"working_dir": "/out"}
+        )
+        return container, client.containers
+
+    return _make
+
+
+def _plot_meta(title: str) -> bytes:
+    return json.dumps({"title": title, "xlabel": "x", "ylabel": "y", "plot_type": "line"}).encode()
+
+
+def test_run_code_fetches_all_outputs_in_one_archive_request(make_container):
+    def program():
+        outputs = {"grid.png": b"png-bytes", "summary.csv": b"a,b\n1,2\n"}
+        outputs.update({f"grid_ax{i}.json": _plot_meta(f"panel {i}") for i in range(4)})
+        return 0, b"done\n", None, outputs
+
+    container, containers = make_container(program)
+
+    with container:
+        result = asyncio.run(container.run_code("make_plots()"))
+
+    assert result["exit_code"] == 0
+    assert result["stdout"] == "done\n"
+    assert set(result["files"]) == {"grid.png", "summary.csv"}
+    assert result["files"]["grid.png"]["bytes"] == b"png-bytes"
+    assert result["files"]["grid.png"]["description"].startswith("figure with 4 subplots: {subplot 0:")
+    assert "panel 3" in result["files"]["grid.png"]["description"]
+    assert result["files"]["summary.csv"]["description"] == "table titled 'summary'"
+    assert containers.created[0].calls.count("get_archive") == 1
+
+
+def test_mount_staging_bind_mounts_shared_read_only_dataset_copies(make_container, tmp_path):
+    dataset = tmp_path / "carprice.csv"
+    dataset.write_bytes(b"price\n1\n")
+    resources = [{"source": str(dataset), "target": "/home/sandbox/datasets/"}]
+    settings = {
+        "working_dir": "/out",
+        "dataset_staging": "mount",
+        "dataset_cache_dir": str(tmp_path / "cache"),
+        "read_only_root": True,
+    }
+
+    first, first_containers = make_container(lambda: (0, None, None, {}), settings, resources)
+    second, second_containers = make_container(lambda: (0, None, None, {}), settings, resources)
+    with first, second:
+        first_run = first_containers.created[0]
+        second_run = second_containers.created[0]
+
+        assert first_run.run_kwargs["volumes"] == second_run.run_kwargs["volumes"]
+        (host_path, mount), = first_run.run_kwargs["volumes"].items()
+        assert mount == {"bind": "/home/sandbox/datasets/carprice.csv", "mode": "ro"}
+        assert open(host_path, "rb").read() == b"price\n1\n"
+        assert first_run.run_kwargs["read_only"] is True
+        assert "/out" in first_run.run_kwargs["tmpfs"]
+        assert "put_archive" not in first_run.calls
+        assert first.get_dataset_inventory() == [
+            {"filename": "carprice.csv", "path": "/home/sandbox/datasets/carprice.csv", "dataset_name": "carprice.csv"}
+        ]
+
+
+def test_run_code_reports_usage_and_hides_usage_sidecar(make_container):
+    def program():
+        usage = json.dumps({"cpu_seconds": 0.25, "max_rss_kb": 51200}).encode()
+        return 0, b"", None, {".duck-usage.json": usage, "summary.csv": b"a\n1\n"}
+
+    container, _ = make_container(program)
+
+    with container:
+        result = asyncio.run(container.run_code("pass"))
+
+    assert set(result["files"]) == {"summary.csv"}
+    assert result["usage"]["cpu_seconds"] == 0.25
+    assert result["usage"]["max_rss_kb"] == 51200
+    assert result["usage"]["bytes_written"] == len(b"a\n1\n")
+    assert result["usage"]["wall_seconds"] >= 0
+
+
+class _LocalTransport:
+    """Runs execs as host subprocesses so real process groups and timeouts can be exercised."""
+
+    def __init__(self):
+        self.processes = []
+
+    async def exec(self, cmd, workdir=None, detach=False):
+        process = await asyncio.create_subprocess_exec(
+            *cmd, cwd=workdir, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        self.processes.append(process)
+        # cancelling communicate() stops listening but, like a closed attach stream, leaves the process running
+        stdout, stderr = await process.communicate()
+        return process.returncode, stdout, stderr
+
+    async def get_archive(self, path):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            tar.add(path, arcname=posixpath.basename(path))
+        return buffer.getvalue()
+
+
+def _live_processes_in_group(pgid: int) -> list[int]:
+    """Non-zombie pids in the process group (killed children may linger as zombies until reaped)"""
+    live = []
+    for stat_path in os.listdir("/proc"):
+        if not stat_path.isdigit():
+            continue
+        try:
+            with open(f"/proc/{stat_path}/stat") as stat_file:
+                fields = stat_file.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        state, group = fields[0], int(fields[2])
+        if group == pgid and state != "Z":
+            live.append(int(stat_path))
+    return live
+
+
+def test_timeout_kills_only_the_slow_run(make_container, tmp_path):
+    settings = {"working_dir": str(tmp_path), "timeout": 8}
+    container, _ = make_container(lambda: (0, None, None, {}), settings)
+
+    slow = "import subprocess, time\nsubprocess.Popen(['sleep', '60'])\ntime.sleep(60)"
+    neighbour = "import time\ntime.sleep(1)\nprint('neighbour done')"
+
+    transport = _LocalTransport()
+
+    async def scenario():
+        results = await asyncio.gather(
+            container.run_code(slow),
+            *[container.run_code(neighbour) for _ in range(3)]
+        )
+        await asyncio.wait_for(asyncio.gather(*[process.wait() for process in transport.processes]), timeout=5)
+        return results
+
+    with container:
+        container._transport = transport
+        slow_result, *neighbours = asyncio.run(scenario())
+
+    assert slow_result["exit_code"] == -1
+    assert "timed out" in slow_result["stderr"]
+    for result in neighbours:
+        assert result["exit_code"] == 0
+        assert result["stdout"].strip() == "neighbour done"
+        assert not any(name.startswith(".duck-") for name in result["files"])
+
+    # the slow run and the process it spawned are gone
+    (cancelled,) = tmp_path.glob("*/.duck-run.cancelled")
+    pgid = int((cancelled.parent / ".duck-run.pgid").read_text())
+    for _ in range(20):
+        if not _live_processes_in_group(pgid):
+            break
+        time.sleep(0.05)
+    assert _live_processes_in_group(pgid) == []
+
+
+def test_cancelled_run_is_killed(make_container, tmp_path):
+    container, _ = make_container(lambda: (0, None, None, {}), {"working_dir": str(tmp_path)})
+    transport = _LocalTransport()
+
+    async def scenario():
+        run = asyncio.create_task(container.run_code("import time\ntime.sleep(60)"))
+        for _ in range(100):
+            if list(tmp_path.glob("*/.duck-run.pgid")):
+                break
+            await asyncio.sleep(0.05)
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+        await asyncio.wait_for(asyncio.gather(*[process.wait() for process in transport.processes]), timeout=5)
+
+    with container:
+        container._transport = transport
+        asyncio.run(scenario())
+
+    (cancelled,) = tmp_path.glob("*/.duck-run.cancelled")
+    pgid = int((cancelled.parent / ".duck-run.pgid").read_text())
+    for _ in range(20):
+        if not _live_processes_in_group(pgid):
+            break
+        time.sleep(0.05)
+    assert _live_processes_in_group(pgid) == []
+
+
+def test_kill_falls_back_to_the_run_pid_when_it_does_not_lead_its_group(tmp_path):
+    # both share the test's process group, like a run whose setpgid did not take effect
+    run = subprocess.Popen(["sleep", "60"])
+    neighbour = subprocess.Popen(["sleep", "60"])
+    try:
+        (tmp_path / ".duck-run.pid").write_text(str(run.pid))
+
+        subprocess.run(PythonExecContainer._kill_run_command(str(tmp_path)), check=True)
+
+        assert run.wait(timeout=5) == -signal.SIGKILL
+        assert neighbour.poll() is None
+    finally:
+        run.kill()
+        neighbour.kill()
+        neighbour.wait()
+
+
+def test_reap_outputs_removes_retrieved_expired_and_over_quota_dirs(make_container, tmp_path):
+    settings = {"working_dir": str(tmp_path), "output_ttl_seconds": 600, "output_quota_bytes": 2500}
+    container, _ = make_container(lambda: (0, None, None, {}), settings)
+
+    def make_run_dir(name, size, age):
+        run_dir = tmp_path / name
+        run_dir.mkdir()
+        (run_dir / "out.bin").write_bytes(b"0" * size)
+        mtime = time.time() - age
+        os.utime(run_dir, (mtime, mtime))
+        return run_dir
+
+    expired = make_run_dir("expired", 10, age=3600)
+    oldest = make_run_dir("oldest", 1000, age=300)
+    older = make_run_dir("older", 1000, age=200)
+    newest = make_run_dir("newest", 1000, age=100)
+    in_flight = make_run_dir("in-flight", 1000, age=7200)
+
+    with container:
+        container._transport = _LocalTransport()
+        result = asyncio.run(container.run_code("open('plot.png', 'wb').write(b'png')"))
+        assert result["files"]["plot.png"]["bytes"] == b"png"
+        container._active_runs.add(str(in_flight))
+        usage = asyncio.run(container.reap_outputs())
+
+    # the finished run's directory goes as soon as its outputs were read back
+    remaining = sorted(path.name for path in tmp_path.iterdir())
+    assert remaining == ["in-flight", "newest"]
+    assert not expired.exists() and not oldest.exists() and not older.exists()
+    assert usage == {"used_bytes": 2000, "quota_bytes": 2500, "run_dirs": 2, "removed_dirs": 4}
+    assert container.disk_usage() == usage
+
+
+def test_sandbox_read_csv_loads_the_staged_arrow_copy(tmp_path):
+    pytest.importorskip("pyarrow")
+    csv = b"x,y\n1,a\n2,b\n"
+    (tmp_path / "data.csv").write_bytes(csv)
+    copy = build_columnar_copy(DatasetInfo(filename="data.csv", description="", data=csv))
+    # the Arrow copy deliberately differs so the test can tell which file was read
+    (tmp_path / "data.arrow").write_bytes(copy.data)
+    (tmp_path / "data.csv").write_bytes(b"x,y\n9,z\n")
+
+    code = SANDBOX_SETUP_CODE + dedent(f"""\
+        print(pd.read_csv({str(tmp_path / 'data.csv')!r})["x"].tolist())
+        print(pd.read_csv({str(tmp_path / 'data.csv')!r}, usecols=["x"])["x"].tolist())
+    """)
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert result.stdout.splitlines() == ["[1, 2]", "[9]"]
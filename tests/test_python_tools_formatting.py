@@ -1,7 +1,6 @@
 import pandas as pd
 import sys
 import types
-import asyncio
 
 
 boto3_stub = types.ModuleType("boto3")
@@ -21,7 +20,7 @@ botocore_stub.exceptions = botocore_exceptions_stub
 sys.modules.setdefault("botocore", botocore_stub)
 sys.modules.setdefault("botocore.exceptions", botocore_exceptions_stub)
 
-from src.armory.python_tools import _format_table_values, send_table
+from src.armory.python_tools import _format_table_values, format_table
 
 
 def test_format_table_values_rounds_and_trims_numeric_columns():
@@ -54,24 +53,14 @@ def test_format_table_values_expands_scientific_notation_and_rounds():
     assert formatted["value"].tolist() == ["12301600"]
 
 
-def test_send_table_does_not_reintroduce_scientific_notation():
+def test_format_table_does_not_reintroduce_scientific_notation():
     table = pd.DataFrame(
         {
             "conf_low": [-3.71812e08, -40746, 99701.2],
             "conf_high": [-1.97874e08, 332304, 2.45405e06],
         }
     )
-    sent_messages = []
-
-    async def _send_message(_channel_id, message=None, file=None):
-        if message is not None:
-            sent_messages.append(message)
-        if file is not None:
-            sent_messages.append(str(file))
-
-    asyncio.run(send_table(_send_message, 123, table))
-
-    rendered = "\n".join(sent_messages)
+    rendered = "\n".join(format_table(table))
     assert "-3.71812e+08" not in rendered
     assert "-1.97874e+08" not in rendered
     assert "2.45405e+06" not in rendered
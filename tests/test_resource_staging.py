@@ -0,0 +1,156 @@
+import io
+import json
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+
+boto3_stub = types.ModuleType("boto3")
+boto3_stub.client = lambda *_args, **_kwargs: types.SimpleNamespace()
+sys.modules.setdefault("boto3", boto3_stub)
+
+botocore_stub = types.ModuleType("botocore")
+botocore_exceptions_stub = types.ModuleType("botocore.exceptions")
+
+
+class _ClientError(Exception):
+    pass
+
+
+botocore_exceptions_stub.ClientError = _ClientError
+botocore_stub.exceptions = botocore_exceptions_stub
+sys.modules.setdefault("botocore", botocore_stub)
+sys.modules.setdefault("botocore.exceptions", botocore_exceptions_stub)
+
+from botocore.exceptions import ClientError
+
+from src.utils.resource_staging import DatasetInfo, S3DatasetCache, build_columnar_copy, get_dataset_info, \
+    get_folder_info, materialize_dataset
+
+
+def _client_error(code: str) -> ClientError:
+    error = ClientError(code)
+    error.response = {"Error": {"Code": code}}
+    return error
+
+
+class _FakeS3:
+    """In-memory S3 stand-in supporting paginated listings and conditional GETs."""
+
+    def __init__(self, objects: dict[str, bytes], delay: float = 0.0):
+        self.objects = dict(objects)
+        self.gets: list[str] = []
+        self.not_modified = 0
+        self.max_concurrent = 0
+        self._active = 0
+        self._lock = threading.Lock()
+        self._delay = delay
+
+    def etag(self, key: str) -> str:
+        return f'"{hash(self.objects[key]) & 0xffffffff:x}"'
+
+    def get_paginator(self, _operation):
+        fake = self
+
+        class _Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(key for key in fake.objects if key.startswith(Prefix))
+                yield {"Contents": [{"Key": key, "ETag": fake.etag(key)} for key in keys]}
+
+        return _Paginator()
+
+    def get_object(self, Bucket, Key, IfNoneMatch=None):
+        with self._lock:
+            self._active += 1
+            self.max_concurrent = max(self.max_concurrent, self._active)
+        try:
+            time.sleep(self._delay)
+            if Key not in self.objects:
+                raise _client_error("NoSuchKey")
+            if IfNoneMatch == self.etag(Key):
+                self.not_modified += 1
+                raise _client_error("304")
+            self.gets.append(Key)
+            return {"Body": io.BytesIO(self.objects[Key]), "ETag": self.etag(Key)}
+        finally:
+            with self._lock:
+                self._active -= 1
+
+
+def _meta(name: str) -> bytes:
+    return json.dumps({"dataset_name": name, "columns": []}).encode()
+
+
+def test_folder_staging_downloads_concurrently_and_reuses_cached_etags(tmp_path):
+    s3 = _FakeS3({
+        "datasets/a.csv": b"x\n1\n",
+        "datasets/a.meta.json": _meta("A"),
+        "datasets/b.csv": b"y\n2\n",
+        "datasets/c.csv": b"z\n3\n",
+        "datasets/notes.txt": b"ignored",
+    }, delay=0.05)
+
+    first = S3DatasetCache(str(tmp_path), max_workers=4, client=s3)
+    datasets = get_folder_info("s3://bucket/datasets/", first)
+
+    assert [d.filename for d in datasets] == ["a.csv", "b.csv", "c.csv"]
+    assert datasets[0].description == "Dataset name: A"
+    assert datasets[1].description == "Dataset name: b.csv"
+    assert s3.max_concurrent > 1
+    # metadata missing from the listing is never requested
+    assert sorted(s3.gets) == ["datasets/a.csv", "datasets/a.meta.json", "datasets/b.csv", "datasets/c.csv"]
+    assert first.stats.objects_fetched == 4
+
+    s3.gets.clear()
+    s3.objects["datasets/b.csv"] = b"y\n2\n3\n"
+    second = S3DatasetCache(str(tmp_path), max_workers=4, client=s3)
+    datasets = get_folder_info("s3://bucket/datasets/", second)
+
+    assert s3.gets == ["datasets/b.csv"]
+    assert datasets[1].data == b"y\n2\n3\n"
+    assert second.stats.objects_reused == 3
+    assert second.stats.bytes_fetched == len(b"y\n2\n3\n")
+
+
+def test_single_file_staging_revalidates_with_conditional_get(tmp_path):
+    s3 = _FakeS3({"datasets/a.csv": b"x\n1\n"})
+
+    get_dataset_info("s3://bucket/datasets/a.csv", S3DatasetCache(str(tmp_path), client=s3))
+    cache = S3DatasetCache(str(tmp_path), client=s3)
+    dataset = get_dataset_info("s3://bucket/datasets/a.csv", cache)
+
+    assert dataset.data == b"x\n1\n"
+    assert dataset.description == "Dataset name: a.csv"
+    assert s3.gets == ["datasets/a.csv"]
+    assert s3.not_modified == 1
+    assert cache.stats.bytes_reused == len(b"x\n1\n")
+
+
+def test_columnar_copy_round_trips_to_the_same_dataframe():
+    pytest.importorskip("pyarrow")
+    import pandas as pd
+    import pyarrow as pa
+
+    csv = b"name,score,grade\nada,91.5,A\nbob,,B\ncy,78.25,\n"
+    dataset = DatasetInfo(filename="grades.csv", description="Dataset name: grades", data=csv)
+
+    copy = build_columnar_copy(dataset)
+
+    assert copy.filename == "grades.arrow"
+    assert copy.derived_from == "grades.csv"
+    loaded = pa.ipc.open_file(pa.BufferReader(copy.data)).read_all().to_pandas()
+    pd.testing.assert_frame_equal(loaded, pd.read_csv(io.BytesIO(csv)))
+    assert build_columnar_copy(DatasetInfo(filename="notes.txt", description="", data=b"x")) is None
+
+
+def test_materialized_datasets_live_under_their_content_hash(tmp_path):
+    dataset = DatasetInfo(filename="grades.csv", description="", data=b"name,score\nada,91.5\n")
+
+    path = materialize_dataset(dataset, str(tmp_path))
+
+    assert path == tmp_path / dataset.content_hash / "grades.csv"
+    assert path.read_bytes() == dataset.data
+    assert materialize_dataset(dataset, str(tmp_path)) == path
@@ -0,0 +1,66 @@
+import numpy as np
+
+from src.armory.similarity_index import SimilarityIndex
+
+
+MEAN_CODE = "import pandas as pd\ndf = pd.read_csv('/home/sandbox/datasets/grades.csv')\nprint(df['score'].mean())"
+PLOT_CODE = (
+    "import pandas as pd\nimport seaborn as sns\n"
+    "df = pd.read_csv('/home/sandbox/datasets/penguins.csv')\nsns.histplot(df['bill_length'])"
+)
+
+
+def test_near_duplicate_requests_match_and_different_analyses_do_not():
+    index = SimilarityIndex(threshold=0.8)
+    index.add("What is the mean score?", MEAN_CODE, "mean-key")
+    index.add("Plot a histogram of penguin bill length", PLOT_CODE, "plot-key")
+
+    rephrased = "data = pd.read_csv('datasets/grades.csv')\nprint(data['score'].mean())  # average"
+    matches = index.search("what's the mean of the score", rephrased)
+
+    assert [key for key, _ in matches] == ["mean-key"]
+    assert matches[0][1] > 0.95
+    assert index.search("What is the median score?", MEAN_CODE.replace("mean", "median")) == []
+    assert index.search("Plot a histogram of penguin body mass", PLOT_CODE.replace("bill_length", "body_mass")) == []
+
+
+def test_scope_isolates_rows_and_removed_rows_are_reused():
+    index = SimilarityIndex(threshold=0.5, initial_capacity=2)
+    index.add("mean score", MEAN_CODE, "v1", scope="grades@v1")
+
+    assert index.search("mean score", MEAN_CODE, scope="grades@v2") == []
+    assert index.search("mean score", MEAN_CODE, scope="grades@v1")[0][0] == "v1"
+
+    index.remove("v1")
+    assert index.search("mean score", MEAN_CODE, scope="grades@v1") == []
+
+    for i in range(5):
+        index.add(f"question {i}", f"print({i})", f"k{i}")
+    assert len(index) == 5
+    assert index.search("question 3", "print(3)")[0][0] == "k3"
+
+
+def test_top_k_orders_candidates_by_similarity():
+    index = SimilarityIndex(threshold=0.0, top_k=2)
+    index.add("mean score by section", MEAN_CODE, "close")
+    index.add("mean score", MEAN_CODE, "exact")
+    index.add("Plot a histogram of penguin bill length", PLOT_CODE, "far")
+
+    matches = index.search("mean score", MEAN_CODE)
+
+    assert [key for key, _ in matches] == ["exact", "close"]
+    assert np.isclose(matches[0][1], 1.0, atol=1e-5)
+
+
+def test_bound_replaces_least_recently_added_or_matched_row():
+    index = SimilarityIndex(threshold=0.9, initial_capacity=1, max_entries=2)
+    index.add("mean score", MEAN_CODE, "mean")
+    index.add("Plot a histogram of penguin bill length", PLOT_CODE, "plot")
+    index.touch("mean")
+
+    index.add("question 3", "print(3)", "k3")
+
+    assert len(index) == 2
+    assert index.search("Plot a histogram of penguin bill length", PLOT_CODE) == []
+    assert index.search("mean score", MEAN_CODE)[0][0] == "mean"
+    assert index.search("question 3", "print(3)")[0][0] == "k3"
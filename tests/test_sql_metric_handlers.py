@@ -99,3 +99,71 @@ def test_feedback_table():
     assert recorded_feedback[1][6] == 123456789
     assert recorded_feedback[1][7] == 987654
     assert recorded_feedback[1][8] == 4
+
+
+def test_executions_table():
+    handler = _new_handler()
+    asyncio.run(
+        handler.record_execution(
+            guild_id=1234,
+            parent_channel_id=2222,
+            thread_id=5678,
+            user_id=123456789,
+            container="stats",
+            exit_code=0,
+            wall_seconds=1.5,
+            cpu_seconds=0.75,
+            max_rss_kb=65536,
+            bytes_written=2048,
+            code="print('x' * 10)",
+        )
+    )
+    recorded_executions = handler.get_executions()
+    assert recorded_executions[0] == [
+        "id",
+        "timestamp",
+        "guild_id",
+        "parent_channel_id",
+        "thread_id",
+        "user_id",
+        "container",
+        "exit_code",
+        "wall_seconds",
+        "cpu_seconds",
+        "max_rss_kb",
+        "bytes_written",
+        "code",
+    ]
+    assert recorded_executions[1][6:] == ["stats", 0, 1.5, 0.75, 65536, 2048, "print('x' * 10)"]
+
+
+def test_latency_table():
+    handler = _new_handler()
+    asyncio.run(
+        handler.record_latency(
+            guild_id=1234,
+            parent_channel_id=2222,
+            thread_id=5678,
+            user_id=123456789,
+            engine="gpt-5-mini",
+            streamed=True,
+            first_token_seconds=0.4,
+            total_seconds=3.2,
+            message_edits=3,
+        )
+    )
+    recorded_latency = handler.get_latency()
+    assert recorded_latency[0] == [
+        "id",
+        "timestamp",
+        "guild_id",
+        "parent_channel_id",
+        "thread_id",
+        "user_id",
+        "engine",
+        "streamed",
+        "first_token_seconds",
+        "total_seconds",
+        "message_edits",
+    ]
+    assert recorded_latency[1][6:] == ["gpt-5-mini", True, 0.4, 3.2, 3]
@@ -0,0 +1,425 @@
+import asyncio
+import base64
+import json
+import sys
+import types
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+
+boto3_stub = types.ModuleType("boto3")
+boto3_stub.client = lambda *_args, **_kwargs: types.SimpleNamespace()
+sys.modules.setdefault("boto3", boto3_stub)
+
+botocore_stub = types.ModuleType("botocore")
+botocore_exceptions_stub = types.ModuleType("botocore.exceptions")
+
+
+class _ClientError(Exception):
+    pass
+
+
+botocore_exceptions_stub.ClientError = _ClientError
+botocore_stub.exceptions = botocore_exceptions_stub
+sys.modules.setdefault("botocore", botocore_stub)
+sys.modules.setdefault("botocore.exceptions", botocore_exceptions_stub)
+
+from src.armory.cache_eviction import build_eviction_policy
+from src.armory.tool_cache import (
+    REPORT_STDOUT_CHARS, CacheEntryBuilder, InMemoryToolCache, SqlToolCache, TieredToolCache, ToolCacheBlob,
+    ToolCacheDataset, ToolCacheRecord, send_cache_entry
+)
+
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 4096
+
+
+def _cache():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    statements: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return SqlToolCache(Session(engine)), engine, statements
+
+
+def _blobs(engine) -> list[tuple[str, int]]:
+    with Session(engine) as session:
+        return session.query(ToolCacheBlob.sha256, ToolCacheBlob.ref_count).all()
+
+
+def _write(cache, key: str, files: dict[str, bytes] | None = None, stdout: str | None = None):
+    builder = CacheEntryBuilder()
+    for filename, data in (files or {}).items():
+        builder.add_file(filename, {"bytes": data, "description": ""})
+    if stdout is not None:
+        builder.set_stdout(stdout)
+    cache.write_entry(key, builder)
+
+
+def _cached(cache, key: str) -> bool:
+    return cache.load_entry(key) is not None
+
+
+def _sent_files(cache, key) -> list[dict]:
+    sent = []
+
+    async def send_message(channel_id, content=None, file=None):
+        if file is not None:
+            sent.append(file)
+
+    asyncio.run(send_cache_entry(cache.get_or_none(key), send_message, 1))
+    return sent
+
+
+def test_identical_files_are_stored_once_and_released_with_their_entries():
+    cache, engine, statements = _cache()
+
+    _write(cache, "a", {"plot.png": PNG})
+    _write(cache, "b", {"same.png": PNG}, "done")
+
+    assert [count for _, count in _blobs(engine)] == [2]
+    with Session(engine) as session:
+        assert "bytes_b64" not in session.get(ToolCacheRecord, "a").files["plot.png"]
+
+    statements.clear()
+    assert cache.count_entries() == 2
+    assert [entry["files"] for entry in cache.list_entries()] == [1, 1]
+    assert not any("tool_cache_blobs" in statement for statement in statements)
+
+    assert _sent_files(cache, "b") == [{"filename": "same.png", "bytes": PNG}]
+
+    cache.remove_entry("a")
+    assert [count for _, count in _blobs(engine)] == [1]
+    cache.clear_entries()
+    assert _blobs(engine) == []
+
+
+def test_replacing_a_file_and_expiring_entries_release_blobs():
+    cache, engine, _ = _cache()
+
+    _write(cache, "a", {"plot.png": PNG})
+    _write(cache, "a", {"plot.png": PNG + b"v2"})
+    assert [count for _, count in _blobs(engine)] == [1]
+
+    with Session(engine) as session:
+        session.get(ToolCacheRecord, "a").expires_at = datetime.now(timezone.utc) - timedelta(days=1)
+        session.commit()
+    cache.cleanup()
+
+    assert _blobs(engine) == []
+    assert not _cached(cache, "a")
+
+
+def test_legacy_base64_entries_are_served_and_moved_into_blobs():
+    cache, engine, _ = _cache()
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        session.add(ToolCacheRecord(
+            key="legacy",
+            stdout=None,
+            tables=[],
+            files={"old.png": {"bytes_b64": base64.b64encode(PNG).decode("ascii"), "description": "old"}},
+            hit_count=0,
+            created_at=now,
+            last_access=now,
+            expires_at=now + timedelta(days=1),
+        ))
+        session.commit()
+
+    assert _sent_files(cache, "legacy") == [{"filename": "old.png", "bytes": PNG}]
+
+    with Session(engine) as session:
+        files = session.get(ToolCacheRecord, "legacy").files
+    assert set(files["old.png"]) == {"blob", "size", "description"}
+    assert [count for _, count in _blobs(engine)] == [1]
+    assert _sent_files(cache, "legacy") == [{"filename": "old.png", "bytes": PNG}]
+
+
+def test_hot_tier_serves_hits_from_memory_and_writes_hit_counts_back():
+    backend, engine, statements = _cache()
+    cache = TieredToolCache(backend, max_bytes=10_000)
+
+    _write(cache, "a", {"plot.png": PNG}, "done")
+    assert _cached(backend, "a")
+
+    statements.clear()
+    assert _cached(cache, "a")
+    assert _sent_files(cache, "a") == [{"filename": "plot.png", "bytes": PNG}]
+    assert _sent_files(cache, "a") == [{"filename": "plot.png", "bytes": PNG}]
+    assert statements == []
+
+    entries = cache.list_entries()
+    assert entries[0]["hits"] == 2
+    assert cache.lookup_stats.snapshot()["hot"] == {"hits": 2, "misses": 0}
+
+
+def test_hot_tier_evicts_least_recently_used_entries_over_its_byte_budget():
+    backend, _, statements = _cache()
+    cache = TieredToolCache(backend, max_bytes=len(PNG) * 2)
+
+    for key in ["a", "b", "c"]:
+        _write(cache, key, {"plot.png": PNG + key.encode()})
+
+    assert cache.used_bytes <= len(PNG) * 2
+    statements.clear()
+    assert _sent_files(cache, "c")[0]["bytes"] == PNG + b"c"
+    assert statements == []
+
+    # "a" was evicted, so it is loaded from the database and becomes hot again
+    assert _sent_files(cache, "a")[0]["bytes"] == PNG + b"a"
+    assert statements
+    assert cache.lookup_stats.snapshot()["hot"] == {"hits": 1, "misses": 1}
+
+
+def test_hot_tier_warms_from_the_most_hit_rows():
+    backend, _, statements = _cache()
+    for key, hits in [("cold", 1), ("warm", 5), ("hottest", 20)]:
+        _write(backend, key, stdout=key)
+        backend.record_hits({key: (hits, datetime.now(timezone.utc))})
+
+    cache = TieredToolCache(backend, max_bytes=1_000, warm_entries=2)
+    cache.warm()
+
+    statements.clear()
+    cache.get_or_none("hottest")
+    cache.get_or_none("warm")
+    assert statements == []
+    cache.get_or_none("cold")
+    assert statements
+
+
+def test_budgeted_database_cache_evicts_on_write_and_releases_blobs():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    cache = SqlToolCache(Session(engine), build_eviction_policy("gds"), max_bytes=len(PNG) * 2 + 16)
+
+    _write(cache, "slow", {"plot.png": PNG + b"slow"})
+    cache.set_cost("slow", 30.0)
+    _write(cache, "fast", {"plot.png": PNG + b"fast"})
+    cache.set_cost("fast", 0.05)
+    _write(cache, "new", {"plot.png": PNG + b"new"})
+
+    assert [_cached(cache, key) for key in ["slow", "fast", "new"]] == [True, False, True]
+    assert len(_blobs(engine)) == 2
+    with Session(engine) as session:
+        record = session.get(ToolCacheRecord, "slow")
+        assert record.size_bytes == len(PNG) + 4
+        assert record.cost_seconds == 30.0
+
+
+def test_eviction_columns_are_added_to_existing_tables():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE tool_cache (key_hash TEXT PRIMARY KEY, stdout TEXT, tables JSON NOT NULL, "
+            "files JSON NOT NULL, created_at DATETIME NOT NULL, last_access DATETIME NOT NULL, "
+            "hit_count INTEGER NOT NULL, expires_at DATETIME NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO tool_cache VALUES ('legacy', 'legacy output', '[]', '{}', "
+            "'2024-01-01 00:00:00', '2024-01-01 00:00:00', 3, '2999-01-01 00:00:00')"
+        )
+
+    cache = SqlToolCache(Session(engine), max_entries=2)
+    # rows written before the columns existed are sized and prioritised by the migration
+    with Session(engine) as session:
+        legacy = session.get(ToolCacheRecord, "legacy")
+        assert legacy.size_bytes == len("legacy output")
+        assert legacy.priority is not None
+    assert cache.used_bytes == len("legacy output")
+
+    statements: list[str] = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    _write(cache, "a", stdout="first")
+    _write(cache, "b", stdout="second")
+
+    # the budget is checked against running totals, not an aggregate query per write
+    assert not any("count(" in statement.lower() for statement in statements)
+    assert [_cached(cache, key) for key in ["legacy", "a", "b"]] == [False, True, True]
+    assert cache.used_bytes == len("first") + len("second")
+
+
+def test_complete_entries_are_written_in_one_commit_and_read_with_their_hit_in_one_transaction():
+    cache, engine, statements = _cache()
+    commits = []
+    event.listen(engine, "commit", lambda *args: commits.append(args))
+
+    builder = CacheEntryBuilder()
+    builder.add_file("plot.png", {"bytes": PNG, "description": "plot"})
+    builder.add_table("summary.csv", ["| a |", "| b |"], "summary")
+    builder.set_stdout("done")
+    builder.set_cost(2.5)
+    cache.write_entry("a", builder)
+    assert len(commits) == 1
+
+    statements.clear()
+    assert cache.get_or_none("missing") is None
+    assert len(statements) == 1
+
+    entry = cache.get_or_none("a")
+    assert entry.hit_count == 1
+    assert entry.cost_seconds == 2.5
+    assert entry.files["plot.png"]["bytes"] == PNG
+    assert [table["chunks"] for table in entry.tables] == [["| a |", "| b |"]]
+    assert entry.stdout == "done"
+
+    # rewriting replaces the entry's outputs and keeps its hit count
+    builder.files.clear()
+    cache.write_entry("a", builder)
+    assert _blobs(engine) == []
+    assert cache.get_or_none("a").hit_count == 2
+
+
+def test_rewriting_an_entry_keeps_the_expiry_its_hits_earned_in_every_backend():
+    def expiry(cache, key):
+        return cache.load_entry(key).expires_at.replace(tzinfo=timezone.utc)
+
+    tiered_backend = _cache()[0]
+    caches = [InMemoryToolCache(), _cache()[0], TieredToolCache(tiered_backend, max_bytes=10_000)]
+    for cache in caches:
+        _write(cache, "a", stdout="old")
+        for _ in range(5):
+            cache.get_or_none("a")
+        if isinstance(cache, TieredToolCache):
+            cache.flush()
+        earned = expiry(cache, "a")
+        assert earned > datetime.now(timezone.utc) + timedelta(days=5)
+
+        _write(cache, "a", stdout="new")
+
+        assert cache.load_entry("a").stdout == "new"
+        assert expiry(cache, "a") == earned
+    assert expiry(tiered_backend, "a") == expiry(caches[2], "a")
+
+
+def test_hot_tier_write_entry_is_served_from_memory():
+    backend, _, statements = _cache()
+    cache = TieredToolCache(backend, max_bytes=10_000)
+    builder = CacheEntryBuilder()
+    builder.add_file("plot.png", {"bytes": PNG, "description": "plot"})
+    cache.write_entry("a", builder)
+
+    statements.clear()
+    assert cache.get_or_none("a").files["plot.png"]["bytes"] == PNG
+    assert statements == []
+    assert backend.load_entry("a").files["plot.png"]["bytes"] == PNG
+
+
+def test_cleanup_and_clear_delete_in_bulk_and_listing_is_paginated():
+    cache, engine, statements = _cache()
+    for i in range(30):
+        builder = CacheEntryBuilder()
+        builder.add_file("plot.png", {"bytes": PNG + bytes([i % 3]), "description": ""})
+        builder.set_stdout(f"entry {i}")
+        cache.write_entry(f"k{i:02d}", builder)
+    cache.record_hits({f"k{i:02d}": (i, datetime.now(timezone.utc)) for i in range(30)})
+
+    page = cache.list_entries(offset=5, limit=10)
+    assert [entry["key"] for entry in page] == [f"k{i:02d}" for i in range(24, 14, -1)]
+    assert cache.count_entries() == 30
+
+    with Session(engine) as session:
+        for record in session.query(ToolCacheRecord).filter(ToolCacheRecord.key < "k20"):
+            record.expires_at = datetime.now(timezone.utc) - timedelta(days=1)
+        session.commit()
+
+    statements.clear()
+    cache.cleanup()
+    deletes = [statement for statement in statements if statement.startswith("DELETE")]
+    assert len(deletes) == 3  # unreferenced blobs, expired records, then their dataset index rows
+    assert cache.count_entries() == 10
+    assert sorted(count for _, count in _blobs(engine)) == [3, 3, 4]
+
+    statements.clear()
+    assert cache.clear_entries() == 10
+    assert len(statements) == 4  # records, blobs, and both dataset index tables
+    assert _blobs(engine) == []
+
+
+def test_listing_reads_a_stdout_prefix_and_no_table_chunks():
+    cache, _, statements = _cache()
+    builder = CacheEntryBuilder()
+    builder.add_table("summary.csv", ["| a |" * 1000, "| b |"], "summary")
+    builder.set_stdout("x" * (REPORT_STDOUT_CHARS * 4))
+    cache.write_entry("a", builder)
+
+    statements.clear()
+    [entry] = cache.list_entries()
+
+    assert (entry["tables"], entry["stdout"]) == (1, "x" * REPORT_STDOUT_CHARS)
+    [listing] = statements
+    assert "tables" not in listing.replace("table_count", "").replace("tool_cache", "")
+
+
+def test_restaged_datasets_invalidate_exactly_their_entries():
+    cache, engine, statements = _cache()
+    tiered = TieredToolCache(cache, max_bytes=len(PNG) * 10)
+
+    def write(key: str, datasets: dict[str, str]):
+        builder = CacheEntryBuilder()
+        builder.add_file("plot.png", {"bytes": PNG, "description": ""})
+        builder.set_datasets(datasets)
+        tiered.write_entry(key, builder)
+
+    write("grades", {"sandbox:/d/grades.csv": "v1"})
+    write("joined", {"sandbox:/d/grades.csv": "v1", "sandbox:/d/roster.csv": "r1"})
+    write("roster", {"sandbox:/d/roster.csv": "r1"})
+    # rewritten from new data before the restage is noticed
+    write("rewritten", {"sandbox:/d/grades.csv": "v1"})
+    write("rewritten", {"sandbox:/d/grades.csv": "v2"})
+
+    current = {"sandbox:/d/grades.csv": "v2", "sandbox:/d/roster.csv": "r1"}
+    assert len(tiered.invalidate_datasets(current)) == 2
+
+    assert tiered.get_or_none("grades") is None and tiered.get_or_none("joined") is None
+    assert tiered.get_or_none("roster") is not None and tiered.get_or_none("rewritten") is not None
+    assert [count for _, count in _blobs(engine)] == [2]
+    with Session(engine) as session:
+        assert sorted(session.query(ToolCacheDataset.key, ToolCacheDataset.dataset_hash)) == [
+            ("rewritten", "v2"), ("roster", "r1")
+        ]
+    # nothing is left to invalidate for the same versions
+    assert cache.invalidate_datasets(current) == []
+
+
+def test_dataset_index_handles_keys_longer_than_an_indexable_column():
+    cache, engine, _ = _cache()
+    datasets = {f"sandbox:/datasets/course_{i}/grades_{i}.csv": "v1" for i in range(8)}
+    key = json.dumps({"dataset": ["grades"], "analysis": ["mean"], "parameters": {}, "dataset_versions": datasets})
+    assert len(key) > 128
+
+    builder = CacheEntryBuilder()
+    builder.set_stdout("mean 3.2")
+    builder.set_datasets(datasets)
+    cache.write_entry(key, builder)
+
+    with Session(engine) as session:
+        rows = session.query(ToolCacheDataset.key_digest, ToolCacheDataset.key).all()
+    assert {len(digest) for digest, _ in rows} == {64}
+    assert {stored for _, stored in rows} == {key}
+
+    restaged = {**datasets, "sandbox:/datasets/course_0/grades_0.csv": "v2"}
+    assert len(cache.invalidate_datasets(restaged)) == 1
+    assert cache.get_or_none(key) is None
+    with Session(engine) as session:
+        assert session.query(ToolCacheDataset).count() == 0
+
+
+def test_hot_tier_forgets_entries_the_budgeted_database_evicts():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    backend = SqlToolCache(Session(engine), max_entries=2)
+    cache = TieredToolCache(backend, max_bytes=len(PNG) * 10)
+
+    _write(cache, "a", {"plot.png": PNG + b"a"})
+    _write(cache, "b", {"plot.png": PNG + b"b"})
+    # served from memory; the hit is not written back yet, so "a" is still the database's oldest row
+    assert cache.get_or_none("a") is not None
+
+    assert cache.write_entry("c", CacheEntryBuilder()) == ["a"]
+
+    assert cache.get_or_none("a") is None
+    assert not _cached(cache, "a")
+    assert cache.used_bytes == len(PNG) + 1
+    cache.flush()
+    assert sorted(entry["key"] for entry in cache.list_entries()) == ["b", "c"]
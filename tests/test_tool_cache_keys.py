@@ -0,0 +1,351 @@
+import asyncio
+import json
+import sys
+import time
+import types
+
+
+boto3_stub = types.ModuleType("boto3")
+boto3_stub.client = lambda *_args, **_kwargs: types.SimpleNamespace()
+sys.modules.setdefault("boto3", boto3_stub)
+
+botocore_stub = types.ModuleType("botocore")
+botocore_exceptions_stub = types.ModuleType("botocore.exceptions")
+
+
+class _ClientError(Exception):
+    pass
+
+
+botocore_exceptions_stub.ClientError = _ClientError
+botocore_stub.exceptions = botocore_exceptions_stub
+sys.modules.setdefault("botocore", botocore_stub)
+sys.modules.setdefault("botocore.exceptions", botocore_exceptions_stub)
+
+from src.armory.python_tools import PythonTools
+from src.armory.similarity_index import SimilarityIndex
+from src.armory.tool_cache import InMemoryToolCache, SemanticCacheKeyBuilder, canonical_code, exact_cache_key
+
+
+class _FakeResponses:
+    def __init__(self, latency: float):
+        self.calls = 0
+        self._latency = latency
+
+    async def create(self, **_kwargs):
+        self.calls += 1
+        await asyncio.sleep(self._latency)
+        key = {"dataset": ["Grades.csv"], "analysis": ["Mean"], "parameters": {"Column": "Score"}}
+        return types.SimpleNamespace(output_text=json.dumps(key))
+
+
+def _builder(latency: float = 0.0, memo_size: int = 1024):
+    responses = _FakeResponses(latency)
+    client = types.SimpleNamespace(responses=responses)
+    return SemanticCacheKeyBuilder(client, "prompt", memo_size=memo_size), responses
+
+
+def test_building_keys_does_not_block_the_event_loop():
+    async def scenario():
+        builder, responses = _builder(latency=0.2)
+        max_lag = 0.0
+        done = asyncio.Event()
+
+        async def probe():
+            nonlocal max_lag
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.01)
+                max_lag = max(max_lag, time.perf_counter() - start - 0.01)
+
+        probe_task = asyncio.create_task(probe())
+        keys = await asyncio.gather(*[builder.build_cache_key(f"intent {i}", "df.mean()") for i in range(5)])
+        done.set()
+        await probe_task
+        return keys, responses.calls, max_lag
+
+    keys, calls, max_lag = asyncio.run(scenario())
+
+    assert calls == 5
+    assert keys[0].dataset == ["grades.csv"]
+    assert keys[0].parameters == {"column": "score"}
+    assert max_lag < 0.1
+
+
+def test_repeated_requests_are_memoised_in_a_bounded_lru():
+    async def scenario():
+        builder, responses = _builder(memo_size=2)
+        first = await builder.build_cache_key("mean score", "df.score.mean()")
+        first.dataset.append("mutated")
+        again = await builder.build_cache_key("mean score", "df.score.mean()")
+        assert responses.calls == 1
+        assert again.dataset == ["grades.csv"]
+
+        await builder.build_cache_key("median score", "df.score.median()")
+        await builder.build_cache_key("mean score", "df.score.mean()")
+        await builder.build_cache_key("max score", "df.score.max()")
+        assert responses.calls == 3
+
+        # "median score" was least recently used, so it was evicted
+        await builder.build_cache_key("median score", "df.score.median()")
+        return responses.calls
+
+    assert asyncio.run(scenario()) == 4
+
+
+def test_canonical_code_ignores_comments_formatting_and_literal_spelling():
+    original = "import pandas as pd\ndf = pd.read_csv('grades.csv')\nprint(df['score'].mean())\n"
+    reformatted = (
+        "# load the grades\n"
+        "import pandas as pd\n\n"
+        "df = pd.read_csv(\"grades.csv\")   # comment\n"
+        "print( df[ \"score\" ].mean() )\n"
+    )
+
+    assert canonical_code(original) == canonical_code(reformatted)
+    assert canonical_code("x = 1_000") == canonical_code("x = 0x3e8")
+    assert canonical_code("print(df.mean()") is None
+
+    versions = {"/d/grades.csv": "abc"}
+    assert exact_cache_key(original, versions) == exact_cache_key(reformatted, versions)
+    assert exact_cache_key(original, versions) != exact_cache_key(original, {"/d/grades.csv": "def"})
+    assert exact_cache_key(original, versions) != exact_cache_key("print(df['score'].median())", versions)
+
+
+class _FakePool:
+    name = "sandbox"
+
+    def __init__(self):
+        self.runs = []
+
+    def get_dataset_versions(self):
+        return {"/d/grades.csv": "abc"}
+
+    async def run_code(self, code, flow=None, on_queued=None):
+        self.runs.append(code)
+        return {"exit_code": 0, "stdout": "85.5", "stderr": "", "files": {}}
+
+
+def test_exact_tier_is_checked_before_the_semantic_key_builder():
+    async def scenario():
+        builder, responses = _builder()
+        cache = InMemoryToolCache()
+        pool = _FakePool()
+        sent = []
+
+        async def send_message(channel_id, content=None, file=None):
+            sent.append(content)
+
+        tools = PythonTools(pool, send_message, cache, builder)
+        ctx = types.SimpleNamespace(thread_id=1, author_id=2, guild_id=3, parent_channel_id=4)
+
+        await tools.run_code(ctx, "print(df['score'].mean())", "mean score")
+        await tools.run_code(ctx, "print(df[\"score\"].mean())  # again", "average score please")
+        # different code with the same semantic key misses the exact tier only
+        await tools.run_code(ctx, "print(df.score.mean())", "mean score")
+        return pool.runs, responses.calls, cache.lookup_stats.snapshot(), sent
+
+    runs, calls, stats, sent = asyncio.run(scenario())
+
+    assert len(runs) == 1
+    assert calls == 2
+    assert stats == {"exact": {"hits": 1, "misses": 2}, "semantic": {"hits": 1, "misses": 1}}
+    assert sent == ["85.5"] * 3
+
+
+def test_similar_tier_serves_near_duplicates_on_the_same_datasets():
+    async def scenario():
+        builder, responses = _builder()
+        cache = InMemoryToolCache()
+        pool = _FakePool()
+
+        async def send_message(channel_id, content=None, file=None):
+            pass
+
+        tools = PythonTools(pool, send_message, cache, builder, similarity_index=SimilarityIndex(threshold=0.8))
+        ctx = types.SimpleNamespace(thread_id=1, author_id=2, guild_id=3, parent_channel_id=4)
+
+        await tools.run_code(ctx, "df = pd.read_csv('/d/grades.csv')\nprint(df['score'].mean())", "mean score")
+        await tools.run_code(ctx, "data = pd.read_csv('grades.csv')\nprint(data['score'].mean())", "the mean score?")
+        return pool.runs, responses.calls, cache.lookup_stats.snapshot()
+
+    runs, calls, stats = asyncio.run(scenario())
+
+    assert len(runs) == 1
+    assert calls == 1
+    assert stats["similar"] == {"hits": 1, "misses": 1}
+
+
+def test_restaged_datasets_change_the_semantic_key_and_invalidate_old_entries():
+    async def scenario():
+        builder, responses = _builder()
+        cache = InMemoryToolCache()
+        pool = _FakePool()
+        versions = {"/d/grades.csv": "abc"}
+        pool.get_dataset_versions = lambda: dict(versions)
+
+        async def send_message(channel_id, content=None, file=None):
+            pass
+
+        index = SimilarityIndex()
+        tools = PythonTools(pool, send_message, cache, builder, similarity_index=index)
+        ctx = types.SimpleNamespace(thread_id=1, author_id=2, guild_id=3, parent_channel_id=4)
+
+        await tools.run_code(ctx, "print(df['score'].mean())", "mean score")
+        versions["/d/grades.csv"] = "def"
+        await tools.run_code(ctx, "print(df['score'].mean())", "mean score")
+        before = cache.count_entries()
+        removed = tools.invalidate_stale_entries()
+        return pool.runs, before, removed, cache.count_entries(), cache.list_entries(), len(index)
+
+    runs, before, removed, after, entries, indexed = asyncio.run(scenario())
+
+    # the key model is memoised, but the restaged data still misses both tiers
+    assert len(runs) == 2
+    assert (before, removed, after) == (4, 2, 2)
+    # the old version's semantic key left the similarity index too
+    assert indexed == 1
+    assert all('"def"' in entry["key"] or entry["key"].startswith("exact:") for entry in entries)
+
+
+def test_keys_evicted_by_a_write_leave_the_similarity_index():
+    async def scenario():
+        builder, _ = _builder()
+        cache = InMemoryToolCache(max_entries=2)
+        pool = _FakePool()
+        versions = {"/d/grades.csv": "abc"}
+        pool.get_dataset_versions = lambda: dict(versions)
+
+        async def send_message(channel_id, content=None, file=None):
+            pass
+
+        index = SimilarityIndex()
+        tools = PythonTools(pool, send_message, cache, builder, similarity_index=index)
+        ctx = types.SimpleNamespace(thread_id=1, author_id=2, guild_id=3, parent_channel_id=4)
+
+        await tools.run_code(ctx, "print(df['score'].mean())", "mean score")
+        versions["/d/grades.csv"] = "def"
+        # the exact and semantic entries of this run evict both entries of the first
+        await tools.run_code(ctx, "print(df['score'].mean())", "mean score")
+        return cache.count_entries(), len(index)
+
+    assert asyncio.run(scenario()) == (2, 1)
+
+
+class _SlowPool(_FakePool):
+    async def run_code(self, code, flow=None, on_queued=None):
+        await asyncio.sleep(0.05)
+        return await super().run_code(code, flow, on_queued)
+
+
+def test_concurrent_identical_requests_share_one_execution():
+    async def scenario():
+        builder, responses = _builder(latency=0.01)
+        cache = InMemoryToolCache()
+        pool = _SlowPool()
+        sent = []
+
+        async def send_message(channel_id, content=None, file=None):
+            sent.append((channel_id, content))
+
+        tools = PythonTools(pool, send_message, cache, builder)
+        requests = [("print(df['score'].mean())", "mean score")] * 8
+        # different code with the same semantic key joins through the semantic tier
+        requests.append(("print(df.score.mean())", "mean score"))
+        await asyncio.gather(*(
+            tools.run_code(types.SimpleNamespace(thread_id=i, author_id=i, guild_id=0, parent_channel_id=0), code, intent)
+            for i, (code, intent) in enumerate(requests)
+        ))
+        return pool.runs, cache.lookup_stats.snapshot(), sent, tools._in_flight
+
+    runs, stats, sent, in_flight = asyncio.run(scenario())
+
+    assert len(runs) == 1
+    assert stats["coalesced"] == {"hits": 8, "misses": 0}
+    assert sorted(sent) == [(i, "85.5") for i in range(9)]
+    assert in_flight == {}
+
+
+class _SpeculativePool(_FakePool):
+    def __init__(self, events: list[str] | None = None, error: Exception | None = None):
+        super().__init__()
+        self.cancelled = 0
+        self.events = events if events is not None else []
+        self.error = error
+
+    def has_free_slot(self):
+        return True
+
+    async def run_code(self, code, flow=None, on_queued=None):
+        self.events.append("run started")
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error is not None:
+            raise self.error
+        return await super().run_code(code, flow, on_queued)
+
+
+def _logging_builder(events: list[str]):
+    builder, _ = _builder(latency=0.05)
+    build = builder.build_cache_key
+
+    async def build_cache_key(user_intent, code):
+        key = await build(user_intent, code)
+        events.append("key built")
+        return key
+
+    builder.build_cache_key = build_cache_key
+    return builder
+
+
+def test_speculative_runs_overlap_key_building_and_are_cancelled_on_hits():
+    events = []
+
+    async def scenario():
+        cache = InMemoryToolCache()
+        pool = _SpeculativePool(events)
+
+        async def send_message(channel_id, content=None, file=None):
+            pass
+
+        tools = PythonTools(pool, send_message, cache, _logging_builder(events), speculative=True)
+        ctx = types.SimpleNamespace(thread_id=1, author_id=2, guild_id=3, parent_channel_id=4)
+
+        miss = await tools.run_code(ctx, "print(df['score'].mean())", "mean score")
+        # different code, same semantic key: the speculative run is cancelled and the entry served
+        hit = await tools.run_code(ctx, "print(df.score.mean())", "mean score")
+        await asyncio.sleep(0)
+        return miss, hit, pool, cache.lookup_stats.snapshot()
+
+    miss, hit, pool, stats = asyncio.run(scenario())
+
+    assert miss.result["stdout"] == hit.result["stdout"] == "85.5"
+    # the run started before its key was built rather than after it
+    assert events[:2] == ["run started", "key built"]
+    assert len(pool.runs) == 1
+    assert pool.cancelled == 1
+    assert stats["speculative"] == {"hits": 1, "misses": 1}
+
+
+def test_a_failed_speculative_run_is_surfaced_and_counted_as_failed():
+    async def scenario():
+        cache = InMemoryToolCache()
+        pool = _SpeculativePool(error=RuntimeError("container died"))
+
+        async def send_message(channel_id, content=None, file=None):
+            pass
+
+        tools = PythonTools(pool, send_message, cache, _logging_builder([]), speculative=True)
+        ctx = types.SimpleNamespace(thread_id=1, author_id=2, guild_id=3, parent_channel_id=4)
+        try:
+            await tools.run_code(ctx, "print(df['score'].mean())", "mean score")
+        except RuntimeError as error:
+            return error, cache.lookup_stats.snapshot()
+
+    error, stats = asyncio.run(scenario())
+
+    assert str(error) == "container died"
+    assert stats["speculative"] == {"hits": 0, "misses": 0, "failed": 1}